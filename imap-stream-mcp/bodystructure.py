@@ -1,15 +1,23 @@
-"""Utilities for parsing IMAP BODYSTRUCTURE attachment metadata."""
+"""Utilities for parsing IMAP BODYSTRUCTURE attachment and body part metadata."""
 
 import base64
+import binascii
+import email.errors
+import email.header
 import logging
 import quopri
 import re
+from collections.abc import Iterator
 from html import unescape
 from html.parser import HTMLParser
+from urllib.parse import unquote_to_bytes
 
 logger = logging.getLogger(__name__)
 _short_tuple_warning_emitted = False
 
+SNIPPET_BYTES = 600  # Body prefix fetched per message for a preview snippet
+MULTI_SECTION_MAX_BYTES = SNIPPET_BYTES  # Larger prefixes are fetched one section at a time
+
 
 class _MLStripper(HTMLParser):
     """Minimal HTML tag stripper for snippet extraction."""
@@ -322,6 +330,67 @@ def get_body_peek(msg_data: dict, section: str) -> bytes | None:
     return None
 
 
+def find_snippet_part(body: tuple | None) -> tuple[str, bytes, bytes, bool] | None:
+    """Find the part a snippet is taken from: text/plain, else text/html.
+
+    Args:
+        body: BODYSTRUCTURE tuple (or None).
+
+    Returns:
+        (part_number, charset, transfer_encoding, is_html) or None.
+    """
+    part = find_text_part(body)
+    if part is not None:
+        return (*part, False)
+    part = find_html_part(body)
+    return (*part, True) if part is not None else None
+
+
+def fetch_snippets(fetch, structures: dict[int, tuple | None], max_bytes: int = SNIPPET_BYTES, max_chars: int = 100) -> dict[int, str]:
+    """Fetch and decode body snippets of several messages, usually in one FETCH.
+
+    For snippet-sized prefixes all distinct text sections are requested as
+    partial BODY.PEEK items of the same command, so mixed single-part and
+    multipart messages cost one round-trip (at most max_bytes per extra
+    section and message). Larger prefixes, and servers that reject a
+    section a message does not have, get one FETCH per section instead,
+    naming only the messages whose text is in that section.
+
+    Args:
+        fetch: IMAPClient.fetch-compatible callable with the folder selected
+        structures: UID -> BODYSTRUCTURE
+        max_bytes: Body prefix fetched per section
+        max_chars: Snippet truncation length
+
+    Returns:
+        UID -> snippet for every message with a text part ("" if undecodable)
+    """
+    parts = {uid: part for uid, body in structures.items() if (part := find_snippet_part(body)) is not None}
+    if not parts:
+        return {}
+    groups: dict[str, list[int]] = {}
+    for uid, part in parts.items():
+        groups.setdefault(part[0], []).append(uid)
+
+    data = None
+    if len(groups) > 1 and max_bytes <= MULTI_SECTION_MAX_BYTES:
+        try:
+            data = fetch(list(parts), [f"BODY.PEEK[{section}]<0.{max_bytes}>" for section in sorted(groups)])
+        except Exception as e:
+            logger.debug("Multi-section snippet FETCH rejected, fetching per section: %s", e)
+    if data is None:
+        data = {}
+        for section, uids in groups.items():
+            data.update(fetch(uids, [f"BODY.PEEK[{section}]<0.{max_bytes}>"]))
+
+    snippets = {}
+    for uid, (section, charset, encoding, is_html) in parts.items():
+        payload = data.get(uid)
+        raw = get_body_peek(payload, section) if isinstance(payload, dict) else None
+        snippets[uid] = extract_snippet(raw, charset, encoding, is_html, max_chars=max_chars) if raw else ""
+    return snippets
+
+
 def count_attachments(body: tuple | None) -> int:
     """Count attachments from IMAP BODYSTRUCTURE.
 
@@ -339,3 +408,204 @@ def count_attachments(body: tuple | None) -> int:
 
     disp = _get_disposition(body)
     return 1 if _is_attachment(body, disp) else 0
+
+
+def _is_message_rfc822(body: tuple) -> bool:
+    """Check for an encapsulated message/rfc822 part."""
+    return (
+        len(body) > 1
+        and isinstance(body[0], bytes)
+        and isinstance(body[1], bytes)
+        and body[0].lower() == b"message"
+        and body[1].lower() == b"rfc822"
+    )
+
+
+def walk_parts(body: tuple | None, prefix: str = "") -> Iterator[tuple[str, tuple]]:
+    """Yield every non-multipart part with its IMAP section number.
+
+    Order matches ``email.message.Message.walk()``: a message/rfc822 part is
+    yielded before the parts of the message it encapsulates.
+
+    Args:
+        body: BODYSTRUCTURE tuple (or None).
+        prefix: Part number prefix for recursion.
+
+    Yields:
+        (section, part) tuples, such as ("1", text_part) or ("2.1", nested_part).
+    """
+    if not isinstance(body, tuple) or not body:
+        return
+
+    if isinstance(body[0], list):
+        for index, part in enumerate(body[0], 1):
+            yield from walk_parts(part, f"{prefix}.{index}" if prefix else str(index))
+        return
+
+    section = prefix or "1"
+    yield section, body
+
+    if _is_message_rfc822(body) and len(body) > 8 and isinstance(body[8], tuple) and body[8]:
+        nested = body[8]
+        yield from walk_parts(nested, section if isinstance(nested[0], list) else f"{section}.1")
+
+
+def _find_param(params: tuple | None, name: bytes) -> bytes | str | None:
+    """Find parameter value by case-insensitive name in a flat (key, value, ...) tuple."""
+    if not isinstance(params, tuple):
+        return None
+    for index in range(0, len(params) - 1, 2):
+        key = params[index]
+        if isinstance(key, bytes) and key.lower() == name:
+            return params[index + 1]
+    return None
+
+
+def _decode_param(value: bytes | str, extended: bool) -> str:
+    """Decode a filename parameter (RFC 2231 for ``name*``, else RFC 2047 words)."""
+    text = value.decode("utf-8", errors="replace") if isinstance(value, bytes) else str(value)
+    if extended:
+        charset, _, encoded = text.split("'", 2) if text.count("'") >= 2 else ("", "", text)
+        try:
+            return unquote_to_bytes(encoded).decode(charset or "utf-8", errors="replace")
+        except LookupError:
+            return unquote_to_bytes(encoded).decode("utf-8", errors="replace")
+    try:
+        return str(email.header.make_header(email.header.decode_header(text)))
+    except (email.errors.HeaderParseError, LookupError, UnicodeDecodeError):
+        return text
+
+
+def _part_filename(body: tuple, disp: tuple | None) -> str | None:
+    """Get filename from disposition ``filename`` or Content-Type ``name`` parameter."""
+    disp_params = disp[1] if disp and len(disp) > 1 else None
+    ct_params = body[2] if len(body) > 2 else None
+    for params, name in ((disp_params, b"filename"), (ct_params, b"name")):
+        extended = _find_param(params, name + b"*")
+        if extended is not None:
+            return _decode_param(extended, extended=True)
+        plain = _find_param(params, name)
+        if plain is not None:
+            return _decode_param(plain, extended=False)
+    return None
+
+
+def _decoded_size(body: tuple) -> int:
+    """Estimate decoded size of a part from its encoded BODYSTRUCTURE size.
+
+    Base64 is assumed to use 76-character lines with CRLF.
+    """
+    size = body[6] if len(body) > 6 and isinstance(body[6], int) else 0
+    encoding = body[5] if len(body) > 5 and isinstance(body[5], bytes) else b""
+    if encoding.upper() == b"BASE64":
+        return (size - 2 * (size // 78)) * 3 // 4
+    return size
+
+
+def list_attachments(body: tuple | None) -> list[dict]:
+    """List attachments and inline files from BODYSTRUCTURE.
+
+    Uses the same predicate as count_attachments. ``index`` counts both kinds
+    in walk order, matching the attachment index used by download_attachment.
+
+    Args:
+        body: BODYSTRUCTURE tuple (or None).
+
+    Returns:
+        Dicts with index, section, filename (None when unnamed), content_type,
+        size (decoded, estimated for base64), encoding and inline.
+    """
+    attachments = []
+    for section, part in walk_parts(body):
+        disp = _get_disposition(part)
+        if not _is_attachment(part, disp):
+            continue
+        maintype = part[0].decode("ascii", errors="replace").lower()
+        subtype = part[1].decode("ascii", errors="replace").lower() if isinstance(part[1], bytes) else ""
+        encoding = part[5] if len(part) > 5 and isinstance(part[5], bytes) else b"7BIT"
+        attachments.append(
+            {
+                "index": len(attachments),
+                "section": section,
+                "filename": _part_filename(part, disp),
+                "content_type": f"{maintype}/{subtype}",
+                "size": _decoded_size(part),
+                "encoding": encoding.decode("ascii", errors="replace").upper(),
+                "inline": disp[0].lower() == b"inline",
+            }
+        )
+    return attachments
+
+
+def decode_body(raw_bytes: bytes, charset: bytes, encoding: bytes) -> str:
+    """Decode a fetched body section to text.
+
+    Args:
+        raw_bytes: Raw bytes from a BODY.PEEK[section] fetch.
+        charset: Character set from BODYSTRUCTURE.
+        encoding: Transfer encoding from BODYSTRUCTURE.
+
+    Returns:
+        Decoded text. Undecodable bytes are replaced.
+    """
+    try:
+        decoded = _decode_transfer_bytes(raw_bytes, encoding)
+    except (binascii.Error, ValueError):
+        decoded = None
+    if decoded is None:
+        decoded = raw_bytes
+
+    charset_text = charset.decode("ascii", errors="ignore") if isinstance(charset, bytes) else str(charset)
+    try:
+        return decoded.decode(charset_text or "utf-8", errors="replace")
+    except LookupError:
+        return decoded.decode("utf-8", errors="replace")
+
+
+class TransferDecoder:
+    """Incremental Content-Transfer-Encoding decoder for chunked section fetches.
+
+    Chunk boundaries may fall anywhere; undecodable tails are carried over to
+    the next ``feed()``. Unknown encodings pass through unchanged, like
+    ``Message.get_payload(decode=True)``.
+    """
+
+    def __init__(self, encoding: bytes | str):
+        """Initialize decoder for a BODYSTRUCTURE encoding token."""
+        token = encoding.decode("ascii", errors="ignore") if isinstance(encoding, bytes) else str(encoding)
+        self._encoding = token.upper()
+        self._pending = b""
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Decode as much of the buffered input as possible.
+
+        Args:
+            chunk: Next slice of the encoded section.
+
+        Returns:
+            Decoded bytes (possibly empty).
+        """
+        data = self._pending + chunk
+        if self._encoding == "BASE64":
+            data = re.sub(rb"[^A-Za-z0-9+/=]", b"", data)
+            usable = len(data) - (len(data) % 4)
+            self._pending = data[usable:]
+            return base64.b64decode(data[:usable]) if usable else b""
+        if self._encoding == "QUOTED-PRINTABLE":
+            # Escapes and soft breaks never span lines: decode whole lines only
+            cut = data.rfind(b"\n") + 1
+            self._pending = data[cut:]
+            return quopri.decodestring(data[:cut]) if cut else b""
+        return data
+
+    def flush(self) -> bytes:
+        """Decode whatever input is left at the end of the section."""
+        data, self._pending = self._pending, b""
+        if not data:
+            return b""
+        if self._encoding == "BASE64":
+            usable = len(data) - (len(data) % 4)
+            return base64.b64decode(data[:usable]) if usable else b""
+        if self._encoding == "QUOTED-PRINTABLE":
+            return quopri.decodestring(data)
+        return data
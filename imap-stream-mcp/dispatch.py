@@ -0,0 +1,123 @@
+"""Async dispatch of blocking IMAP calls.
+
+imapclient is synchronous. Running its calls directly inside the async MCP
+tool blocks the event loop, so one slow SEARCH stalls every other request.
+run_blocking() moves each call onto a bounded per-account thread pool and
+applies a timeout.
+"""
+
+import asyncio
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+import anyio
+from imap_client import IMAPError
+
+DISPATCH_WORKERS = 4  # Concurrent operations per account
+DISPATCH_TIMEOUT = 120  # Seconds before a dispatched call is abandoned
+
+_executors: dict[str | None, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(account: str | None = None) -> ThreadPoolExecutor:
+    """Get or create the worker pool for an account.
+
+    Args:
+        account: Account name. None is the default account.
+
+    Returns:
+        ThreadPoolExecutor bounded to DISPATCH_WORKERS threads.
+    """
+    with _executors_lock:
+        executor = _executors.get(account)
+        if executor is None:
+            prefix = f"imap-{account}" if account else "imap-default"
+            executor = ThreadPoolExecutor(max_workers=DISPATCH_WORKERS, thread_name_prefix=prefix)
+            _executors[account] = executor
+        return executor
+
+
+async def run_blocking(func: Callable[..., Any], *args, executor_account: str | None = None, timeout: float | None = None, **kwargs) -> Any:
+    """Run a blocking function on the account's worker pool.
+
+    Cancelling the awaiting task cancels the call if it has not started yet.
+    A call that is already running cannot be interrupted; its result is
+    discarded, and on timeout the error says that the operation (a move,
+    flag change or draft) may still complete, so it is not blindly retried.
+
+    Args:
+        func: Blocking callable (e.g. read_message).
+        *args: Positional arguments for func.
+        executor_account: Account whose pool runs the call. None uses default.
+            Named apart from func's own account argument.
+        timeout: Seconds to wait. None uses DISPATCH_TIMEOUT.
+        **kwargs: Keyword arguments for func.
+
+    Returns:
+        Return value of func.
+
+    Raises:
+        IMAPError: If the call does not finish within timeout.
+    """
+    if timeout is None:
+        timeout = DISPATCH_TIMEOUT
+
+    future = get_executor(executor_account).submit(func, *args, **kwargs)
+    try:
+        with anyio.fail_after(timeout):
+            return await _wait(future)
+    except TimeoutError as e:
+        name = getattr(func, "__name__", "IMAP operation")
+        if future.cancel():
+            raise IMAPError(f"{name} timed out after {timeout:g}s before it started; nothing was changed") from e
+        raise IMAPError(
+            f"{name} timed out after {timeout:g}s but is still running and may still complete; check the folder before retrying"
+        ) from e
+    except anyio.get_cancelled_exc_class():
+        future.cancel()
+        raise
+
+
+async def _wait(future: Future) -> Any:
+    """Await a pool future on the event loop, without a thread parked in future.result().
+
+    asyncio wraps the future; on trio the waiting task is woken from the
+    future's done-callback.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        return await asyncio.wrap_future(future)
+
+    import trio
+
+    token = trio.lowlevel.current_trio_token()
+    done = trio.Event()
+
+    def wake(_):
+        try:
+            token.run_sync_soon(done.set)
+        except trio.RunFinishedError:
+            pass  # The waiting run has ended
+
+    future.add_done_callback(wake)
+    await done.wait()
+    return future.result()
+
+
+def shutdown(wait: bool = False):
+    """Shut down all worker pools.
+
+    Args:
+        wait: Block until running calls finish.
+    """
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait, cancel_futures=True)
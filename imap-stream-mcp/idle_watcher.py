@@ -0,0 +1,272 @@
+"""Optional IMAP IDLE watcher that keeps cached message lists current.
+
+Without it every list sends a SELECT to validate the cached list. With
+IMAP_STREAM_IDLE=1 each account gets one background thread holding an IDLE
+connection per watched folder (IMAP_STREAM_IDLE_FOLDERS, comma separated,
+default INBOX). Server notifications are applied to the session caches as
+they arrive:
+- FETCH (flag change): update_cached_flags for the message
+- EXISTS, EXPUNGE, VANISHED: resync the list on the watcher's connection
+  (the same UIDNEXT/CHANGEDSINCE delta a list would run)
+
+While a folder's watch is live, AccountSession.get_messages answers from
+memory without network I/O. A half-open socket (NAT or firewall timeout)
+delivers nothing and raises nothing while in IDLE, so every IDLE_VERIFY
+seconds the watch leaves IDLE and sends a NOOP; a watch not verified within
+IDLE_LIVE_WINDOW, or dropped, stops counting as live, and lists fall back to
+SELECT validation until it reconnects.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from imapclient.exceptions import IMAPClientError
+from session import PooledConnection, _create_connection, _to_str, invalidate_message_cache, update_cached_flags
+
+logger = logging.getLogger(__name__)
+
+IDLE_VERIFY = 4 * 60  # Leave IDLE for a NOOP this often; also well inside the 30-minute logout (RFC 2177)
+IDLE_LIVE_WINDOW = IDLE_VERIFY + 60  # A watch not verified this recently no longer counts as live
+IDLE_POLL_INTERVAL = 5  # Seconds per round over all watched folders; bounds stop() latency
+IDLE_RETRY_DELAY = 60  # Seconds before reconnecting a dropped watch
+IDLE_LIST_SIZE = 20  # Messages fetched for a watched folder with no cached list
+IDLE_PREVIEW = True  # Fetch snippets for new mail so previews are served from memory too
+
+
+def idle_enabled() -> bool:
+    """Whether IDLE watching is switched on (IMAP_STREAM_IDLE=1)."""
+    return os.environ.get("IMAP_STREAM_IDLE", "0") == "1"
+
+
+def watched_folders() -> list[str]:
+    """Folders to watch from IMAP_STREAM_IDLE_FOLDERS (default INBOX)."""
+    folders = [name.strip() for name in os.environ.get("IMAP_STREAM_IDLE_FOLDERS", "INBOX").split(",")]
+    return list(dict.fromkeys(name for name in folders if name))
+
+
+def start_watcher(session) -> "IdleWatcher | None":
+    """Start a watcher for session when IDLE watching is enabled.
+
+    Args:
+        session: AccountSession whose caches the watcher keeps current
+
+    Returns:
+        Running IdleWatcher, or None when disabled
+    """
+    if not idle_enabled():
+        return None
+    watcher = IdleWatcher(session, watched_folders())
+    watcher.start()
+    return watcher
+
+
+class _Watch:
+    """IDLE connection state of one folder."""
+
+    __slots__ = ("folder", "pooled", "idle_since", "retry_at")
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.pooled: PooledConnection | None = None
+        self.idle_since = 0.0
+        self.retry_at = 0.0
+
+
+class IdleWatcher:
+    """Background IDLE on a set of folders of one account.
+
+    One thread serves all folders, polling each connection in turn with a
+    short idle_check timeout. Connection errors only drop that folder's
+    watch; it is reopened after IDLE_RETRY_DELAY.
+    """
+
+    def __init__(self, session, folders: list[str]):
+        self.session = session
+        self._watches = {folder: _Watch(folder) for folder in folders}
+        self._live: dict[str, float] = {}  # Folder -> monotonic time the watch was last verified
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        """Start the watcher thread."""
+        self._thread = threading.Thread(target=self._run, name=f"idle-{self.session.account}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread and log out of all watch connections."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=IDLE_POLL_INTERVAL + 5)
+        if self._thread is None or not self._thread.is_alive():
+            self._close_all()
+
+    def is_live(self, folder: str) -> bool:
+        """Whether folder's cached list is being kept current by IDLE.
+
+        A watch whose socket was not verified within IDLE_LIVE_WINDOW does not
+        count, even while its thread is still blocked on the dead socket.
+        """
+        verified = self._live.get(folder)
+        return verified is not None and time.monotonic() - verified < IDLE_LIVE_WINDOW
+
+    def _run(self):
+        """Thread body: poll watches until stopped."""
+        try:
+            while not self._stop.is_set():
+                self.poll(IDLE_POLL_INTERVAL)
+        finally:
+            self._close_all()
+
+    def poll(self, interval: float):
+        """Run one round: open due watches, then wait for notifications.
+
+        Args:
+            interval: Seconds to spend waiting, split across open watches
+        """
+        for watch in self._watches.values():
+            if watch.pooled is None and time.monotonic() >= watch.retry_at and not self._stop.is_set():
+                self._open(watch)
+
+        open_watches = [watch for watch in self._watches.values() if watch.pooled is not None]
+        if not open_watches:
+            self._stop.wait(interval)
+            return
+        for watch in open_watches:
+            if self._stop.is_set():
+                return
+            self._check(watch, interval / len(open_watches))
+
+    def _open(self, watch: _Watch):
+        """Connect, bring the folder's list up to date and enter IDLE."""
+        from imap_client import IMAPError
+
+        try:
+            client = _create_connection(self.session.account)
+        except (OSError, IMAPClientError, IMAPError) as e:
+            self._drop(watch, e)
+            return
+
+        if not client.has_capability("IDLE"):
+            logger.debug("Server has no IDLE, not watching %s", watch.folder)
+            watch.retry_at = float("inf")
+            try:
+                client.logout()
+            except Exception:
+                pass
+            return
+
+        watch.pooled = PooledConnection(
+            client=client, account=self.session.account, stats=self.session.stats, uidvalidities=self.session.uidvalidities
+        )
+        try:
+            self._refresh(watch)
+            client.idle()
+        except (OSError, IMAPClientError, IMAPError) as e:
+            self._drop(watch, e)
+            return
+        watch.idle_since = time.monotonic()
+        self._live[watch.folder] = watch.idle_since
+
+    def _check(self, watch: _Watch, timeout: float):
+        """Wait up to timeout for notifications and apply them.
+
+        Without notifications for IDLE_VERIFY seconds, leaves IDLE and sends a
+        NOOP: a half-open socket fails there instead of staying silent.
+        """
+        from imap_client import IMAPError
+
+        client = watch.pooled.client
+        try:
+            responses = client.idle_check(timeout=timeout)
+            verify = time.monotonic() - watch.idle_since >= IDLE_VERIFY
+            if not responses and not verify:
+                return
+            _, done = client.idle_done()
+            if verify:
+                _, noop = client.noop()
+                done = [*done, *noop]
+            self.apply(watch, [*responses, *done])
+            client.idle()
+            watch.idle_since = time.monotonic()
+            self._live[watch.folder] = watch.idle_since
+        except (OSError, IMAPClientError, IMAPError) as e:
+            self._drop(watch, e)
+
+    def apply(self, watch: _Watch, responses: list[tuple]):
+        """Apply untagged responses to the folder's caches.
+
+        Must run outside IDLE: a resync sends commands on the watch connection.
+
+        Args:
+            watch: Watch the responses arrived on
+            responses: Parsed untagged responses from idle_check/idle_done
+        """
+        resync = expunged = False
+        for response in responses:
+            if not response:
+                continue
+            if response[0] == b"VANISHED" or (len(response) >= 2 and response[1] == b"EXPUNGE"):
+                resync = expunged = True
+            elif len(response) >= 2 and response[1] == b"EXISTS":
+                resync = True
+            elif len(response) >= 3 and response[1] == b"FETCH":
+                # After an expunge sequence numbers no longer match the cached list;
+                # the resync (CHANGEDSINCE or full refetch) picks those flags up instead
+                self._apply_flags(watch.folder, response[0], response[2], by_sequence=not expunged)
+        if resync:
+            self._refresh(watch)
+
+    def _apply_flags(self, folder: str, seq: int, attributes: tuple, by_sequence: bool = True):
+        """Update cached flags from an unsolicited FETCH response."""
+        items = dict(zip(attributes[::2], attributes[1::2], strict=False))
+        if b"FLAGS" not in items:
+            return
+        uid = items.get(b"UID")
+        if uid is None:
+            if not by_sequence:
+                return
+            with self.session.lock:
+                cached = self.session.message_cache.get(folder)
+                # The cached window holds the newest messages: sequence n is messages[exists - n]
+                index = cached.exists - seq if cached and cached.exists is not None else -1
+                if not 0 <= index < len(cached.messages if cached else []):
+                    return
+                uid = cached.messages[index]["id"]
+        update_cached_flags(self.session.account, folder, uid, [_to_str(f).lstrip("\\") for f in items[b"FLAGS"]])
+
+    def _refresh(self, watch: _Watch):
+        """Resync the folder's cached list on the watch connection."""
+        from imap_client import IMAPError
+
+        with self.session.lock:
+            cached = self.session.message_cache.get(watch.folder)
+        limit = len(cached.messages) if cached and cached.messages else IDLE_LIST_SIZE
+        try:
+            self.session.refresh_list(watch.pooled, watch.folder, limit, IDLE_PREVIEW)
+        except IMAPError:
+            invalidate_message_cache(self.session.account, watch.folder)
+            raise
+
+    def _drop(self, watch: _Watch, error: Exception):
+        """Stop trusting a watch and schedule a reconnect."""
+        logger.debug("IDLE on %s dropped: %s", watch.folder, error)
+        self._live.pop(watch.folder, None)
+        if watch.pooled is not None:
+            watch.pooled.close()
+            watch.pooled = None
+        watch.retry_at = time.monotonic() + IDLE_RETRY_DELAY
+
+    def _close_all(self):
+        """Leave IDLE and log out of every watch connection."""
+        for watch in self._watches.values():
+            self._live.pop(watch.folder, None)
+            if watch.pooled is None:
+                continue
+            try:
+                watch.pooled.client.idle_done()
+            except Exception:
+                pass
+            watch.pooled.close()
+            watch.pooled = None
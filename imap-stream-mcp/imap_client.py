@@ -8,6 +8,8 @@ Credentials are fetched from macOS Keychain at connection time.
 import email
 import email.header
 import email.message
+import email.parser
+import email.policy
 import email.utils
 import json
 import mimetypes
@@ -15,20 +17,78 @@ import os
 import re
 import sys
 import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
 
 import html2text
 import keyring
-from bodystructure import count_attachments, extract_snippet, find_html_part, find_text_part, get_body_peek
+from bodystructure import (
+    TransferDecoder,
+    _strip_html_tags,
+    count_attachments,
+    decode_body,
+    fetch_snippets,
+    find_html_part,
+    find_text_part,
+    get_body_peek,
+    list_attachments,
+)
 from imapclient import IMAPClient
+from imapclient.exceptions import IMAPClientAbortError, IMAPClientError
 from markdown_utils import convert_body
+from search_index import get_search_index, start_crawler
+from search_query import compile_query, plan_query
+from summary_cache import accounts_stamp
+
+try:  # Same quoting as IMAPClient.search; private, so search_newest falls back to SEARCH without it
+    from imapclient.imapclient import _normalise_search_criteria
+except ImportError:
+    _normalise_search_criteria = None
 
 SERVICE_NAME = "imap-stream"
+ATTACHMENT_CHUNK_SIZE = 1024 * 1024  # Bytes per partial FETCH when downloading attachments
+UID_PAGE_SIZE = 500  # UIDs per STORE/MOVE command, keeps command lines well below server limits
+INDEX_BATCH_SIZE = 100  # Messages per search index FETCH batch
+INDEX_BODY_BYTES = 64 * 1024  # Text body prefix stored in the search index per message
+INDEX_INLINE_MAX = 50  # New messages a search indexes itself before falling back to the server
+CREDENTIALS_TTL = 300  # Seconds cached keyring lookups are trusted without a setup.py change
+DRAFT_BATCH_MAX = 100  # Drafts per create_drafts call
+DRAFT_FLAGS = [b"\\Draft", b"\\Seen"]  # Flags of appended drafts
+HTML_TEXT_MAX_CHARS = 256 * 1024  # HTML converted to text after the pre-pass; the rest is dropped
+HTML_TEXT_MODES = ("full", "fast")  # IMAP_STREAM_HTML_TEXT: html2text rendering, or tag stripping only
+
+# Keyring lookups: "accounts", "default_account" and account name -> (server, port, username, password)
+_credentials: dict = {}
+_credentials_lock = threading.Lock()
+_credentials_stamp: int | None = None  # Accounts stamp mtime the cache was loaded under
+_credentials_loaded = 0.0
 
 # Standard IMAP flags (RFC 3501)
 STANDARD_FLAGS = {"seen", "flagged", "answered", "deleted", "draft"}
 
+# Quoted-tail boundaries (split_quoted_tail)
+_OUTLOOK_SEPARATOR = re.compile(r"_{30,}")  # Whole stripped line
+_LOCALIZED_FIRST_LINE = re.compile(r"\w[\w\s]*:.*<[^>]+@[^>]+>")  # "Lähettäjä: Name <addr>"
+_LOCALIZED_HEADER_LINE = re.compile(r"\w[\w\s]*:.+")
+_CLASSIC_ATTRIBUTION = re.compile(r"\s*On .+wrote:\s*$", flags=re.IGNORECASE)
+_QUOTE_DEPTH = re.compile(r"\s*(>+)")
+_HTML_NOISE = re.compile(r"(?is)<(style|script)\b[^>]*>.*?</\1\s*>|<!--.*?-->")
+_HTML_TRACKING_PIXEL = re.compile(
+    r"""(?is)<img\b(?:(?=[^>]*\bwidth\s*[=:]\s*["']?\s*[01](?:px)?\b)(?=[^>]*\bheight\s*[=:]\s*["']?\s*[01](?:px)?\b)"""
+    r"""|(?=[^>]*\bdisplay\s*:\s*none))[^>]*>"""
+)
+_BLANK_LINES = re.compile(r"\s*\n\s*\n\s*")
+
+# Raw MIME entities (modify_draft attachment carry-over)
+_MIME_HEADER_END = re.compile(rb"\r?\n\r?\n")
+_BOUNDARY_PRECEDENCE = {"classic": 0, "localized": 1, "outlook": 2}  # Wins on the same line
+MIN_BOUNDARY_GAP = 3  # Non-blank lines required between kept boundaries
+
 
 def normalize_flag_output(flag: str) -> str:
     """Strip backslash from IMAP flags for display.
@@ -119,10 +179,35 @@ class IMAPError(Exception):
     pass
 
 
+def _keyring_cache() -> dict:
+    """Return the process-level cache of keyring lookups.
+
+    Emptied when setup.py touches the accounts stamp, after
+    CREDENTIALS_TTL, and by invalidate_credentials().
+    """
+    global _credentials_stamp, _credentials_loaded
+    try:
+        stamp = accounts_stamp().stat().st_mtime_ns
+    except OSError:
+        stamp = None
+    with _credentials_lock:
+        if stamp != _credentials_stamp or time.monotonic() - _credentials_loaded >= CREDENTIALS_TTL:
+            _credentials.clear()
+            _credentials_stamp = stamp
+            _credentials_loaded = time.monotonic()
+        return _credentials
+
+
+def invalidate_credentials():
+    """Forget cached accounts and credentials; the next lookup reads the keyring."""
+    with _credentials_lock:
+        _credentials.clear()
+
+
 def get_credentials(account: str | None = None) -> tuple[str, str, str, str]:
     """Fetch IMAP credentials from keychain or environment.
 
-    Primary: System keychain (cross-platform via keyring)
+    Primary: System keychain (cross-platform via keyring), cached per process
     Fallback: Environment variables (for automation/Docker/CI)
 
     Args:
@@ -143,6 +228,10 @@ def get_credentials(account: str | None = None) -> tuple[str, str, str, str]:
         if account not in accounts:
             raise IMAPError(f"Account '{account}' not found. Available: {', '.join(accounts)}")
 
+        cache = _keyring_cache()
+        if account in cache:
+            return cache[account]
+
         server = keyring.get_password(SERVICE_NAME, f"{account}:imap_server")
         port = keyring.get_password(SERVICE_NAME, f"{account}:imap_port")
         username = keyring.get_password(SERVICE_NAME, f"{account}:imap_username")
@@ -151,7 +240,8 @@ def get_credentials(account: str | None = None) -> tuple[str, str, str, str]:
         if not all([server, username, password]):
             raise IMAPError(f"Account '{account}' credentials incomplete.")
 
-        return server, port or "993", username, password
+        cache[account] = (server, port or "993", username, password)
+        return cache[account]
 
     # Fallback: Environment variables (automation/Docker)
     server = os.environ.get("IMAP_STREAM_SERVER")
@@ -171,10 +261,11 @@ def list_accounts() -> list[str]:
     Returns:
         List of account names, empty if none configured
     """
-    accounts_json = keyring.get_password(SERVICE_NAME, "accounts")
-    if accounts_json:
-        return json.loads(accounts_json)
-    return []
+    cache = _keyring_cache()
+    if "accounts" not in cache:
+        accounts_json = keyring.get_password(SERVICE_NAME, "accounts")
+        cache["accounts"] = json.loads(accounts_json) if accounts_json else []
+    return list(cache["accounts"])
 
 
 def get_default_account() -> str | None:
@@ -188,7 +279,10 @@ def get_default_account() -> str | None:
         return None
 
     # Check for explicit default
-    default = keyring.get_password(SERVICE_NAME, "default_account")
+    cache = _keyring_cache()
+    if "default_account" not in cache:
+        cache["default_account"] = keyring.get_password(SERVICE_NAME, "default_account")
+    default = cache["default_account"]
     if default and default in accounts:
         return default
 
@@ -320,7 +414,7 @@ def list_folders(account: str = None) -> list[dict]:
     return session.get_folders()
 
 
-def list_messages(folder: str, limit: int = 20, account: str = None, preview: bool = False) -> list[dict]:
+def list_messages(folder: str, limit: int = 20, account: str = None, preview: bool = False, before_uid: int | None = None) -> list[dict]:
     """List messages in a folder.
 
     Args:
@@ -328,6 +422,7 @@ def list_messages(folder: str, limit: int = 20, account: str = None, preview: bo
         limit: Maximum messages to return (newest first)
         account: Account name. None uses default.
         preview: Include body snippet (~100 chars) per message.
+        before_uid: Page cursor: only messages with ID below this (oldest ID of previous page)
 
     Returns:
         List of message summaries
@@ -335,7 +430,7 @@ def list_messages(folder: str, limit: int = 20, account: str = None, preview: bo
     from session import get_session
 
     session = get_session(account)
-    return session.get_messages(folder, limit, preview=preview)
+    return session.get_messages(folder, limit, preview=preview, before_uid=before_uid)
 
 
 def _is_quote_line(line: str) -> bool:
@@ -365,7 +460,7 @@ def _estimate_quoted_message_count(lines: list[str]) -> int:
 
     max_depth = 0
     for line in lines:
-        match = re.match(r"^\s*(>+)", line)
+        match = _QUOTE_DEPTH.match(line)
         if match:
             max_depth = max(max_depth, len(match.group(1)))
 
@@ -422,6 +517,15 @@ def _find_tail_quote_boundary(lines: list[str]) -> int | None:
 def _find_all_boundaries(lines: list[str]) -> list[int]:
     """Find all forward-scan quote boundaries for depth-aware truncation.
 
+    One pass over the lines recognizes three boundary kinds:
+    - Outlook: underscore separator whose next non-blank line starts with ``From:``
+    - Localized: ``Name: ... <addr@host>`` line heading 3+ consecutive header lines
+    - Classic: ``On ... wrote:`` whose next non-blank line is quoted
+
+    Lookahead conditions are resolved when the scan reaches the line they
+    depend on, and the non-blank line count at each candidate replaces
+    re-counting the lines between candidates.
+
     Args:
         lines: Message body lines.
 
@@ -432,84 +536,86 @@ def _find_all_boundaries(lines: list[str]) -> list[int]:
     if not lines:
         return []
 
-    outlook_candidates: list[int] = []
-    for idx in range(len(lines) - 1):
-        if not re.match(r"^_{30,}\s*$", lines[idx].strip()):
-            continue
-        next_idx = _find_next_non_blank_line(lines, idx + 1)
-        if next_idx is not None and lines[next_idx].lstrip().startswith("From:"):
-            outlook_candidates.append(idx)
+    best_by_index: dict[int, str] = {}
+    non_blank_before: dict[int, int] = {}  # Candidate index -> non-blank lines above it
+    outlook_set: set[int] = set()
+    classic_candidates: list[int] = []
+    pending_outlook: int | None = None  # Separator waiting for its next non-blank line
+    pending_classic: int | None = None  # Attribution waiting for its next non-blank line
+    header_firsts: list[int] = []  # Localized first lines in the current header run
+    non_blank = 0
+
+    def add(idx: int, kind: str):
+        existing = best_by_index.get(idx)
+        if existing is None or _BOUNDARY_PRECEDENCE[kind] > _BOUNDARY_PRECEDENCE[existing]:
+            best_by_index[idx] = kind
+
+    def close_header_run(end: int):
+        for first in header_firsts:
+            if end - first >= 3:
+                add(first, "localized")
+        header_firsts.clear()
 
-    localized_candidates: list[int] = []
-    localized_first_line = re.compile(r"^\w[\w\s]*:.*<[^>]+@[^>]+>")
-    localized_header_line = re.compile(r"^\w[\w\s]*:.+")
     for idx, line in enumerate(lines):
-        if not localized_first_line.match(line.strip()):
+        stripped = line.strip()
+        if not stripped:
+            if header_firsts:
+                close_header_run(idx)
             continue
 
-        header_lines = 1
-        next_idx = idx + 1
-        while next_idx < len(lines):
-            next_line = lines[next_idx].strip()
-            if not next_line or not localized_header_line.match(next_line):
-                break
-            header_lines += 1
-            next_idx += 1
-
-        if header_lines >= 3:
-            localized_candidates.append(idx)
-
-    classic_candidates: list[int] = []
-    classic_pattern = re.compile(r"^\s*On .+wrote:\s*$", flags=re.IGNORECASE)
-    for idx, line in enumerate(lines):
-        if not classic_pattern.match(line):
-            continue
-        next_idx = _find_next_non_blank_line(lines, idx + 1)
-        if next_idx is not None and _is_quote_line(lines[next_idx]):
-            classic_candidates.append(idx)
-
-    outlook_set = set(outlook_candidates)
-    precedence = {"classic": 0, "localized": 1, "outlook": 2}
-    candidates: list[tuple[int, str]] = [(idx, "outlook") for idx in outlook_candidates]
-    candidates.extend((idx, "localized") for idx in localized_candidates)
-    candidates.extend((idx, "classic") for idx in classic_candidates if idx + 1 not in outlook_set)
-
-    if candidates:
-        best_by_index: dict[int, str] = {}
-        for idx, kind in candidates:
-            existing = best_by_index.get(idx)
-            if existing is None or precedence[kind] > precedence[existing]:
-                best_by_index[idx] = kind
-
-        merged: list[tuple[int, str]] = []
-        for idx in sorted(best_by_index):
-            kind = best_by_index[idx]
-            if not merged:
-                merged.append((idx, kind))
-                continue
+        if pending_outlook is not None:
+            if stripped.startswith("From:"):
+                outlook_set.add(pending_outlook)
+                add(pending_outlook, "outlook")
+            pending_outlook = None
+        if pending_classic is not None:
+            if stripped.startswith(">"):
+                classic_candidates.append(pending_classic)
+            pending_classic = None
+
+        if ":" in stripped and _LOCALIZED_HEADER_LINE.match(stripped):
+            if "@" in stripped and _LOCALIZED_FIRST_LINE.match(stripped):
+                header_firsts.append(idx)
+                non_blank_before[idx] = non_blank
+        elif header_firsts:
+            close_header_run(idx)
+
+        if stripped[0] == "_" and _OUTLOOK_SEPARATOR.fullmatch(stripped):
+            pending_outlook = idx
+            non_blank_before[idx] = non_blank
+        elif stripped[:3].lower() == "on " and _CLASSIC_ATTRIBUTION.match(line):
+            pending_classic = idx
+            non_blank_before[idx] = non_blank
+
+        non_blank += 1
+
+    if header_firsts:
+        close_header_run(len(lines))
+    for idx in classic_candidates:
+        if idx + 1 not in outlook_set:
+            add(idx, "classic")
+
+    if not best_by_index:
+        fallback = _find_tail_quote_boundary(lines)
+        return [] if fallback is None else [fallback]
+
+    merged: list[tuple[int, str]] = []
+    for idx in sorted(best_by_index):
+        kind = best_by_index[idx]
+        if merged:
             prev_idx, prev_kind = merged[-1]
             if idx - prev_idx <= 1 and {prev_kind, kind} == {"outlook", "localized"}:
-                if precedence[kind] > precedence[prev_kind]:
+                if _BOUNDARY_PRECEDENCE[kind] > _BOUNDARY_PRECEDENCE[prev_kind]:
                     merged[-1] = (idx, kind)
                 continue
-            merged.append((idx, kind))
+        merged.append((idx, kind))
 
-        filtered: list[int] = []
-        for idx, _ in merged:
-            if not filtered:
-                filtered.append(idx)
-                continue
-            prev_idx = filtered[-1]
-            non_blank_gap = sum(1 for line in lines[prev_idx + 1 : idx] if line.strip())
-            if non_blank_gap >= 3:
-                filtered.append(idx)
-
-        return filtered
-
-    fallback = _find_tail_quote_boundary(lines)
-    if fallback is None:
-        return []
-    return [fallback]
+    filtered: list[int] = []
+    for idx, _ in merged:
+        # Candidate lines are non-blank, so the gap excludes the previous one itself
+        if not filtered or non_blank_before[idx] - non_blank_before[filtered[-1]] - 1 >= MIN_BOUNDARY_GAP:
+            filtered.append(idx)
+    return filtered
 
 
 def split_quoted_tail(body: str, depth: int = 0) -> tuple[str, str | None, int]:
@@ -548,6 +654,154 @@ def split_quoted_tail(body: str, depth: int = 0) -> tuple[str, str | None, int]:
     return primary, quoted_tail, _estimate_quoted_message_count(quoted_tail.splitlines())
 
 
+def _fetch_body_parts(session, folder: str, message_id: int, bodystructure: tuple | None) -> tuple | None:
+    """Fetch only the text/plain and text/html sections named by BODYSTRUCTURE.
+
+    Args:
+        session: AccountSession whose parsed-message cache serves the sections
+        folder: Folder path
+        message_id: Message ID (UID)
+        bodystructure: BODYSTRUCTURE from the server
+
+    Returns:
+        (body_text, body_html, attachments, inline_images), or None when the
+        structure is missing or the message must be parsed in full
+    """
+    if not isinstance(bodystructure, tuple) or not bodystructure:
+        return None
+
+    text_part = find_text_part(bodystructure)
+    html_part = find_html_part(bodystructure)
+    if text_part is None and html_part is None and not isinstance(bodystructure[0], list):
+        return None  # Single non-text part: legacy parse shows it as body text
+
+    bodies = {}
+    wanted = [part for part in (text_part, html_part) if part]
+    if wanted:
+        fetched = session.fetch_message(folder, message_id, [f"BODY.PEEK[{section}]" for section, _, _ in wanted]) or {}
+        for section, charset, encoding in wanted:
+            raw = get_body_peek(fetched, section)
+            if raw is None:
+                return None
+            bodies[section] = decode_body(raw, charset, encoding)
+
+    attachments = []
+    inline_images = []
+    for item in list_attachments(bodystructure):
+        entry = {key: item[key] for key in ("filename", "content_type", "size", "index")}
+        entry["filename"] = entry["filename"] or "unnamed"
+        (inline_images if item["inline"] else attachments).append(entry)
+
+    body_text = bodies[text_part[0]] if text_part else ""
+    body_html = bodies[html_part[0]] if html_part else ""
+    return body_text, body_html, attachments, inline_images
+
+
+def _parse_body_parts(raw_email: bytes) -> tuple[str, str, list, list]:
+    """Extract bodies and attachment metadata from a full RFC822 message.
+
+    Args:
+        raw_email: Complete message bytes
+
+    Returns:
+        (body_text, body_html, attachments, inline_images)
+    """
+    msg = email.message_from_bytes(raw_email)
+
+    body_text = ""
+    body_html = ""
+    attachments = []
+    inline_images = []
+
+    if msg.is_multipart():
+        attachment_index = 0
+        for part in msg.walk():
+            content_type = part.get_content_type()
+            disposition = part.get_content_disposition()
+
+            # Attachments and inline images with filename, preserving walk-order index
+            if disposition == "attachment" or (disposition == "inline" and part.get_filename()):
+                payload = part.get_payload(decode=True)
+                item = {
+                    "filename": part.get_filename() or "unnamed",
+                    "content_type": content_type,
+                    "size": len(payload) if payload else 0,
+                    "index": attachment_index,
+                }
+                if disposition == "attachment":
+                    attachments.append(item)
+                else:
+                    inline_images.append(item)
+                attachment_index += 1
+            # Body text
+            elif content_type == "text/plain" and not body_text:
+                payload = part.get_payload(decode=True)
+                charset = part.get_content_charset() or "utf-8"
+                body_text = payload.decode(charset, errors="replace")
+            # Body HTML
+            elif content_type == "text/html" and not body_html:
+                payload = part.get_payload(decode=True)
+                charset = part.get_content_charset() or "utf-8"
+                body_html = payload.decode(charset, errors="replace")
+    else:
+        payload = msg.get_payload(decode=True)
+        charset = msg.get_content_charset() or "utf-8"
+        if msg.get_content_type() == "text/html":
+            body_html = payload.decode(charset, errors="replace")
+        else:
+            body_text = payload.decode(charset, errors="replace")
+
+    return body_text, body_html, attachments, inline_images
+
+
+def html_text_mode() -> str:
+    """HTML-to-text mode from IMAP_STREAM_HTML_TEXT (default full)."""
+    mode = os.environ.get("IMAP_STREAM_HTML_TEXT", "full")
+    return mode if mode in HTML_TEXT_MODES else "full"
+
+
+def _prepare_html(html: str) -> str:
+    """Drop style/script blocks, comments and tracking pixels, then cap the size.
+
+    Args:
+        html: HTML body
+
+    Returns:
+        HTML of at most HTML_TEXT_MAX_CHARS characters, cut before a tag
+    """
+    html = _HTML_TRACKING_PIXEL.sub("", _HTML_NOISE.sub(" ", html))
+    if len(html) > HTML_TEXT_MAX_CHARS:
+        cut = html.rfind("<", 0, HTML_TEXT_MAX_CHARS)
+        html = html[: cut if cut > 0 else HTML_TEXT_MAX_CHARS]
+    return html
+
+
+def html_to_text(html: str, mode: str = "full") -> str:
+    """Convert an HTML body to plain text.
+
+    Args:
+        html: HTML body
+        mode: "full" renders Markdown-style text with links (html2text);
+            "fast" only strips tags, enough for summaries and indexing
+
+    Returns:
+        Plain text
+    """
+    html = _prepare_html(html)
+    if mode == "fast":
+        return _BLANK_LINES.sub("\n\n", _strip_html_tags(html)).strip()
+    h = html2text.HTML2Text()
+    h.ignore_links = False
+    h.body_width = 0  # No wrapping
+    return h.handle(html)
+
+
+def _html_text(session, folder: str, message_id: int, html: str, mode: str | None = None) -> str:
+    """Convert a message's HTML body once per mode, cached with the fetched message."""
+    mode = mode or html_text_mode()
+    return session.cached_text(folder, message_id, f"html:{mode}", lambda: html_to_text(html, mode))
+
+
 def read_message(folder: str, message_id: int, account: str = None, full: bool = False, depth: int = 0) -> dict:
     """Read a specific message.
 
@@ -559,110 +813,65 @@ def read_message(folder: str, message_id: int, account: str = None, full: bool =
         depth: Quoted depth level to include when ``full`` is False.
 
     Returns:
-        Full message data including body
+        Full message data including body; body_text of HTML-only mail is the
+        converted HTML, quote-truncated like a text/plain body unless full
+        (IMAP_STREAM_HTML_TEXT=fast keeps no "> " markers, so its blockquotes
+        are not cut)
     """
     from session import get_session
 
     session = get_session(account)
-    with session.connection_ctx() as client:
-        try:
-            client.select_folder(folder, readonly=True)
-        except Exception as e:
-            raise IMAPError(f"Cannot open folder '{folder}': {e}") from e
+    # Structure first: attachment bytes are never transferred for a read
+    data = session.fetch_message(folder, message_id, ["ENVELOPE", "FLAGS", "BODYSTRUCTURE"])
 
-        # Fetch full message
-        messages = client.fetch([message_id], ["RFC822", "ENVELOPE", "FLAGS"])
+    if data is None:
+        raise IMAPError(f"Message {message_id} not found in '{folder}'")
 
-        if message_id not in messages:
-            raise IMAPError(f"Message {message_id} not found in '{folder}'")
-
-        data = messages[message_id]
-        envelope = data[b"ENVELOPE"]
-        raw_email = data[b"RFC822"]
-
-        # Parse email
-        msg = email.message_from_bytes(raw_email)
-
-        # Extract body and attachments
-        body_text = ""
-        body_html = ""
-        attachments = []
-        inline_images = []
-
-        if msg.is_multipart():
-            attachment_index = 0
-            for part in msg.walk():
-                content_type = part.get_content_type()
-                disposition = part.get_content_disposition()
-
-                # Attachments and inline images with filename, preserving walk-order index
-                if disposition == "attachment" or (disposition == "inline" and part.get_filename()):
-                    payload = part.get_payload(decode=True)
-                    item = {
-                        "filename": part.get_filename() or "unnamed",
-                        "content_type": content_type,
-                        "size": len(payload) if payload else 0,
-                        "index": attachment_index,
-                    }
-                    if disposition == "attachment":
-                        attachments.append(item)
-                    else:
-                        inline_images.append(item)
-                    attachment_index += 1
-                # Body text
-                elif content_type == "text/plain" and not body_text:
-                    payload = part.get_payload(decode=True)
-                    charset = part.get_content_charset() or "utf-8"
-                    body_text = payload.decode(charset, errors="replace")
-                # Body HTML
-                elif content_type == "text/html" and not body_html:
-                    payload = part.get_payload(decode=True)
-                    charset = part.get_content_charset() or "utf-8"
-                    body_html = payload.decode(charset, errors="replace")
-        else:
-            payload = msg.get_payload(decode=True)
-            charset = msg.get_content_charset() or "utf-8"
-            if msg.get_content_type() == "text/html":
-                body_html = payload.decode(charset, errors="replace")
-            else:
-                body_text = payload.decode(charset, errors="replace")
+    envelope = data[b"ENVELOPE"]
 
-        quoted_truncated = False
-        quoted_message_count = 0
-        quoted_chars_truncated = 0
-
-        if not full:
-            if not body_text and body_html:
-                h = html2text.HTML2Text()
-                h.ignore_links = False
-                h.body_width = 0
-                body_text = h.handle(body_html)
-
-            primary, quoted_tail, estimated_count = split_quoted_tail(body_text, depth=depth)
-            if quoted_tail is not None:
-                body_text = primary
-                quoted_truncated = True
-                quoted_message_count = estimated_count
-                quoted_chars_truncated = len(quoted_tail)
-
-        return {
-            "id": message_id,
-            "subject": decode_header_value(envelope.subject) if envelope.subject else "",
-            "from": format_address_list(envelope.from_),
-            "to": format_address_list(envelope.to),
-            "cc": format_address_list(envelope.cc),
-            "date": str(envelope.date) if envelope.date else "",
-            "message_id": to_str(envelope.message_id) if envelope.message_id else "",
-            "in_reply_to": to_str(envelope.in_reply_to) if envelope.in_reply_to else "",
-            "body_text": body_text,
-            "body_html": body_html,
-            "attachments": attachments,
-            "inline_images": inline_images,
-            "flags": [normalize_flag_output(to_str(f)) for f in data.get(b"FLAGS", [])],
-            "quoted_truncated": quoted_truncated,
-            "quoted_message_count": quoted_message_count,
-            "quoted_chars_truncated": quoted_chars_truncated,
-        }
+    parts = _fetch_body_parts(session, folder, message_id, data.get(b"BODYSTRUCTURE"))
+    if parts is None:
+        # No usable structure: fall back to the full message
+        raw = (session.fetch_message(folder, message_id, ["RFC822"]) or {}).get(b"RFC822")
+        if raw is None:
+            raise IMAPError(f"Message {message_id} not found in '{folder}'")
+        parts = _parse_body_parts(raw)
+    body_text, body_html, attachments, inline_images = parts
+    _index_read(session, folder, message_id, envelope, body_text, body_html)
+
+    quoted_truncated = False
+    quoted_message_count = 0
+    quoted_chars_truncated = 0
+
+    if not body_text and body_html:
+        body_text = _html_text(session, folder, message_id, body_html)
+
+    if not full:
+        primary, quoted_tail, estimated_count = split_quoted_tail(body_text, depth=depth)
+        if quoted_tail is not None:
+            body_text = primary
+            quoted_truncated = True
+            quoted_message_count = estimated_count
+            quoted_chars_truncated = len(quoted_tail)
+
+    return {
+        "id": message_id,
+        "subject": decode_header_value(envelope.subject) if envelope.subject else "",
+        "from": format_address_list(envelope.from_),
+        "to": format_address_list(envelope.to),
+        "cc": format_address_list(envelope.cc),
+        "date": str(envelope.date) if envelope.date else "",
+        "message_id": to_str(envelope.message_id) if envelope.message_id else "",
+        "in_reply_to": to_str(envelope.in_reply_to) if envelope.in_reply_to else "",
+        "body_text": body_text,
+        "body_html": body_html,
+        "attachments": attachments,
+        "inline_images": inline_images,
+        "flags": [normalize_flag_output(to_str(f)) for f in data.get(b"FLAGS", [])],
+        "quoted_truncated": quoted_truncated,
+        "quoted_message_count": quoted_message_count,
+        "quoted_chars_truncated": quoted_chars_truncated,
+    }
 
 
 def download_attachment(folder: str, message_id: int, attachment_index: int, account: str = None) -> dict:
@@ -680,57 +889,131 @@ def download_attachment(folder: str, message_id: int, attachment_index: int, acc
     from session import get_session
 
     session = get_session(account)
-    with session.connection_ctx() as client:
-        try:
-            client.select_folder(folder, readonly=True)
-        except Exception as e:
-            raise IMAPError(f"Cannot open folder '{folder}': {e}") from e
+    data = session.fetch_message(folder, message_id, ["BODYSTRUCTURE"])
 
-        messages = client.fetch([message_id], ["RFC822"])
+    if data is None:
+        raise IMAPError(f"Message {message_id} not found in '{folder}'")
 
-        if message_id not in messages:
-            raise IMAPError(f"Message {message_id} not found in '{folder}'")
+    bodystructure = data.get(b"BODYSTRUCTURE")
+    if not isinstance(bodystructure, tuple) or not bodystructure:
+        return _download_attachment_rfc822(session, folder, message_id, attachment_index)
 
-        raw_email = messages[message_id][b"RFC822"]
-        msg = email.message_from_bytes(raw_email)
-
-        # Find attachments
-        attachments = []
-        for part in msg.walk():
-            disposition = part.get_content_disposition()
-            if disposition == "attachment" or (disposition == "inline" and part.get_filename()):
-                attachments.append(part)
-
-        if not attachments:
-            raise IMAPError(f"Message {message_id} has no attachments")
-
-        if attachment_index < 0 or attachment_index >= len(attachments):
-            raise IMAPError(f"Attachment index {attachment_index} out of range (0-{len(attachments) - 1})")
-
-        part = attachments[attachment_index]
-        filename = part.get_filename() or f"attachment_{attachment_index}"
-        content_type = part.get_content_type()
-        payload = part.get_payload(decode=True)
-
-        # Save to temp directory
-        temp_dir = Path(tempfile.gettempdir()) / "streammail"
-        temp_dir.mkdir(exist_ok=True)
-
-        # Sanitize filename, avoid collision with existing files
-        safe_filename = re.sub(r"[^\w\-_\.]", "_", filename)
-        file_path = temp_dir / safe_filename
-        if file_path.exists():
-            stem = file_path.stem
-            suffix = file_path.suffix
-            counter = 1
-            while file_path.exists():
-                file_path = temp_dir / f"{stem}_{counter}{suffix}"
-                counter += 1
+    attachments = list_attachments(bodystructure)
+    _check_attachment_index(message_id, attachment_index, len(attachments))
 
+    item = attachments[attachment_index]
+    filename = item["filename"] or f"attachment_{attachment_index}"
+    file_path = _attachment_path(filename)
+    try:
         with open(file_path, "wb") as f:
-            f.write(payload)
+            if item["size"] <= ATTACHMENT_CHUNK_SIZE // 2:
+                # Fits one chunk even base64-encoded: fetch whole, through the message cache
+                section = session.fetch_message(folder, message_id, [f"BODY.PEEK[{item['section']}]"]) or {}
+                raw = get_body_peek(section, item["section"])
+                size = None if raw is None else _write_decoded([raw], item["encoding"], f)
+            else:
+                with session.connection_ctx(folder) as client:
+                    size = _stream_section(client, message_id, item["section"], item["encoding"], f)
+    except BaseException:
+        file_path.unlink(missing_ok=True)
+        raise
+
+    if size is None:
+        file_path.unlink(missing_ok=True)
+        return _download_attachment_rfc822(session, folder, message_id, attachment_index)
 
-        return {"saved_to": str(file_path), "filename": filename, "content_type": content_type, "size": len(payload)}
+    return {"saved_to": str(file_path), "filename": filename, "content_type": item["content_type"], "size": size}
+
+
+def _write_decoded(chunks, encoding: str, out) -> int:
+    """Decode transfer-encoded chunks into a file, returning decoded bytes written."""
+    decoder = TransferDecoder(encoding)
+    written = sum(out.write(decoder.feed(chunk)) for chunk in chunks)
+    return written + out.write(decoder.flush())
+
+
+def _stream_section(client: IMAPClient, message_id: int, section: str, encoding: str, out) -> int | None:
+    """Fetch one body section in partial chunks and decode it into a file.
+
+    Only one chunk is held in memory at a time.
+
+    Args:
+        client: Connected client with the folder selected
+        message_id: Message ID (UID)
+        section: IMAP section number from BODYSTRUCTURE
+        encoding: Content-Transfer-Encoding of the section
+        out: Binary file object to write decoded bytes to
+
+    Returns:
+        Decoded bytes written, or None if the server returned no section data
+    """
+    decoder = TransferDecoder(encoding)
+    written = 0
+    offset = 0
+    while True:
+        fetched = client.fetch([message_id], [f"BODY.PEEK[{section}]<{offset}.{ATTACHMENT_CHUNK_SIZE}>"])
+        chunk = get_body_peek(fetched.get(message_id, {}), section)
+        if chunk is None:
+            return None if offset == 0 else written + out.write(decoder.flush())
+        written += out.write(decoder.feed(chunk))
+        offset += len(chunk)
+        if len(chunk) < ATTACHMENT_CHUNK_SIZE:
+            return written + out.write(decoder.flush())
+
+
+def _check_attachment_index(message_id: int, attachment_index: int, count: int):
+    """Raise IMAPError unless attachment_index addresses one of count attachments."""
+    if not count:
+        raise IMAPError(f"Message {message_id} has no attachments")
+    if attachment_index < 0 or attachment_index >= count:
+        raise IMAPError(f"Attachment index {attachment_index} out of range (0-{count - 1})")
+
+
+def _attachment_path(filename: str) -> Path:
+    """Pick a non-colliding path for an attachment in the download directory."""
+    temp_dir = Path(tempfile.gettempdir()) / "streammail"
+    temp_dir.mkdir(exist_ok=True)
+
+    # Sanitize filename, avoid collision with existing files
+    safe_filename = re.sub(r"[^\w\-_\.]", "_", filename)
+    file_path = temp_dir / safe_filename
+    if file_path.exists():
+        stem = file_path.stem
+        suffix = file_path.suffix
+        counter = 1
+        while file_path.exists():
+            file_path = temp_dir / f"{stem}_{counter}{suffix}"
+            counter += 1
+    return file_path
+
+
+def _download_attachment_rfc822(session, folder: str, message_id: int, attachment_index: int) -> dict:
+    """Download an attachment by parsing the full message (no usable BODYSTRUCTURE)."""
+    fetched = session.parsed_message(folder, message_id)
+
+    if fetched is None:
+        raise IMAPError(f"Message {message_id} not found in '{folder}'")
+
+    _, msg = fetched
+
+    # Find attachments
+    attachments = []
+    for part in msg.walk():
+        disposition = part.get_content_disposition()
+        if disposition == "attachment" or (disposition == "inline" and part.get_filename()):
+            attachments.append(part)
+
+    _check_attachment_index(message_id, attachment_index, len(attachments))
+
+    part = attachments[attachment_index]
+    filename = part.get_filename() or f"attachment_{attachment_index}"
+    payload = part.get_payload(decode=True) or b""
+
+    file_path = _attachment_path(filename)
+    with open(file_path, "wb") as f:
+        f.write(payload)
+
+    return {"saved_to": str(file_path), "filename": filename, "content_type": part.get_content_type(), "size": len(payload)}
 
 
 def cleanup_attachments() -> dict:
@@ -752,19 +1035,108 @@ def cleanup_attachments() -> dict:
     return {"deleted": deleted, "freed_bytes": freed_bytes}
 
 
+def search_newest(client: IMAPClient, criteria: list, limit: int) -> list[int]:
+    """Search the selected folder for the newest matching UIDs.
+
+    With ESEARCH the server returns a compact UID set instead of every
+    matching UID; with PARTIAL (RFC 9394) it returns only the last `limit`
+    hits. Other servers get a plain SEARCH and the hit list is sliced here,
+    as does an imapclient without the private helpers ESEARCH RETURN needs
+    (``_raw_command_untagged``, ``_normalise_search_criteria``).
+
+    Args:
+        client: Connection with the folder selected
+        criteria: imapclient search criteria
+        limit: Maximum UIDs to return
+
+    Returns:
+        Up to `limit` UIDs, newest first
+    """
+    if _esearch_supported(client) and client.has_capability("ESEARCH"):
+        returns = f"(PARTIAL -1:-{limit})" if client.has_capability("PARTIAL") else "(ALL)"
+        try:
+            data = client._raw_command_untagged(
+                b"SEARCH", [b"RETURN", returns.encode(), *_normalise_search_criteria(criteria, None)], response_name="ESEARCH"
+            )
+            return _newest_from_ranges(_parse_esearch(data), limit)
+        except IMAPClientAbortError:
+            raise
+        except (IMAPClientError, ValueError):
+            pass  # Server advertised ESEARCH but rejected RETURN; plain SEARCH below
+
+    message_ids = client.search(criteria)
+    return list(reversed(sorted(message_ids)[-limit:]))
+
+
+def _esearch_supported(client: IMAPClient) -> bool:
+    """Whether this imapclient still has the internals search_newest sends ESEARCH with."""
+    return _normalise_search_criteria is not None and callable(getattr(client, "_raw_command_untagged", None))
+
+
+def _parse_esearch(data: list) -> list[tuple[int, int]]:
+    """Parse UID ranges from an ESEARCH response (ALL or PARTIAL result).
+
+    Args:
+        data: Untagged ESEARCH response lines, e.g. b'(TAG "A1") UID PARTIAL (-1:-20 400:419)'
+
+    Returns:
+        List of (low, high) UID ranges
+    """
+    text = " ".join(d.decode() if isinstance(d, bytes) else str(d) for d in data if d)
+    match = re.search(r"\bPARTIAL \(\S+ ([^)]*)\)", text, re.IGNORECASE) or re.search(r"\bALL (\S+)", text, re.IGNORECASE)
+    if not match or match.group(1).upper() == "NIL":
+        return []
+
+    ranges = []
+    for part in match.group(1).split(","):
+        low, _, high = part.partition(":")
+        low, high = int(low), int(high or low)
+        ranges.append((min(low, high), max(low, high)))
+    return ranges
+
+
+def _newest_from_ranges(ranges: list[tuple[int, int]], limit: int) -> list[int]:
+    """Take the highest `limit` UIDs from ranges without expanding all of them."""
+    uids: list[int] = []
+    for low, high in sorted(ranges, reverse=True):
+        for uid in range(high, low - 1, -1):
+            if len(uids) >= limit:
+                return uids
+            uids.append(uid)
+    return uids
+
+
+def build_search_criteria(query: str) -> list:
+    """Translate a search query into IMAP SEARCH criteria.
+
+    Args:
+        query: Search query (see search_messages)
+
+    Returns:
+        Criteria list for IMAPClient.search
+
+    Raises:
+        IMAPError: If the query is malformed
+    """
+    try:
+        return compile_query(query)
+    except ValueError as e:
+        raise IMAPError(f"Invalid search query: {e}") from e
+
+
 def search_messages(folder: str, query: str, limit: int = 20, account: str = None, preview: bool = False) -> list[dict]:
     """Search messages in a folder.
 
     Args:
         folder: Folder path
-        query: Search query. Supports:
-            - Simple text: searches subject and body
-            - from:address
-            - subject:text
-            - since:YYYY-MM-DD
-            - before:YYYY-MM-DD
+        query: Search query. Terms are ANDed; supports:
+            - Simple text or "quoted phrase": searches subject and body
+            - from:, to:, cc:, bcc:, subject:, body:, text: prefixes
+            - since:YYYY-MM-DD, before:YYYY-MM-DD, on:YYYY-MM-DD
+            - size>N, size<N (k/M/G suffixes), has:attachment
             - Flag queries: flagged, unread, seen, answered, deleted
               Also: is:flagged, flagged:yes, flagged:no, starred, etc.
+            - OR, NOT (or -term) and parentheses for grouping
         limit: Maximum results
         account: Account name. None uses default.
         preview: Include body snippet (~100 chars) per message.
@@ -775,81 +1147,31 @@ def search_messages(folder: str, query: str, limit: int = 20, account: str = Non
     from session import get_session
 
     session = get_session(account)
-    with session.connection_ctx() as client:
-        try:
-            client.select_folder(folder, readonly=True)
-        except Exception as e:
-            raise IMAPError(f"Cannot open folder '{folder}': {e}") from e
-
-        # Build IMAP search criteria
-        query_lower = query.lower().strip()
-
-        # Try flag-based query first
-        flag_criterion = parse_flag_query(query)
-        if flag_criterion:
-            criteria = [flag_criterion]
-        elif query_lower.startswith("from:"):
-            criteria = ["FROM", query[5:].strip()]
-        elif query_lower.startswith("subject:"):
-            criteria = ["SUBJECT", query[8:].strip()]
-        elif query_lower.startswith("since:"):
-            criteria = ["SINCE", query[6:].strip()]
-        elif query_lower.startswith("before:"):
-            criteria = ["BEFORE", query[7:].strip()]
+    index = get_search_index()
+    with session.connection_ctx(folder) as client:
+        planned = _search_index(session, client, folder, query, index) if index else None
+        if planned is None:
+            criteria = build_search_criteria(query)
         else:
-            # General text search - search subject OR body
-            criteria = ["OR", "SUBJECT", query, "BODY", query]
+            hits, rest = planned
+            if not hits:
+                return []
+            # Server confirms the hits still exist and checks flags/dates; no BODY scan
+            criteria = ["UID", _uid_set(hits), *rest]
 
-        # Execute search
-        message_ids = client.search(criteria)
+        # Execute search, newest matches only
+        selected_ids = search_newest(client, criteria, limit)
 
-        if not message_ids:
+        if not selected_ids:
             return []
 
-        # Get newest matches
-        selected_ids = message_ids[-limit:] if len(message_ids) > limit else message_ids
-        selected_ids = list(reversed(selected_ids))
-
         # Fetch summaries
         messages = client.fetch(selected_ids, ["ENVELOPE", "FLAGS", "BODYSTRUCTURE"])
 
         snippets: dict[int, str] = {}
         if preview:
-            try:
-                snippet_info: dict[int, tuple[str, bytes, bytes, bool]] = {}
-                for msg_id in selected_ids:
-                    msg_data = messages.get(msg_id)
-                    if not msg_data:
-                        continue
-                    bodystructure = msg_data.get(b"BODYSTRUCTURE")
-                    part = find_text_part(bodystructure)
-                    is_html = False
-                    if part is None:
-                        part = find_html_part(bodystructure)
-                        is_html = part is not None
-                    if part:
-                        section, charset, encoding = part
-                        snippet_info[msg_id] = (section, charset, encoding, is_html)
-
-                snippet_raw: dict[int, dict] = {}
-                section_groups: dict[str, list[int]] = {}
-                for msg_id, (section, _, _, _) in snippet_info.items():
-                    section_groups.setdefault(section, []).append(msg_id)
-
-                for section, group_ids in section_groups.items():
-                    try:
-                        group_data = client.fetch(group_ids, [f"BODY.PEEK[{section}]<0.600>"])
-                    except Exception:
-                        continue
-                    for msg_id, payload in group_data.items():
-                        if isinstance(payload, dict):
-                            snippet_raw[msg_id] = payload
-
-                for msg_id, (section, charset, encoding, is_html) in snippet_info.items():
-                    raw = get_body_peek(snippet_raw.get(msg_id, {}), section)
-                    snippets[msg_id] = extract_snippet(raw, charset, encoding, is_html) if raw else ""
-            except Exception:
-                snippets = {}
+            structures = {uid: messages[uid].get(b"BODYSTRUCTURE") for uid in selected_ids if uid in messages}
+            snippets = session.load_snippets(client, folder, structures)
 
         results = []
         for msg_id, data in messages.items():
@@ -872,6 +1194,224 @@ def search_messages(folder: str, query: str, limit: int = 20, account: str = Non
         return results
 
 
+def search_folders(
+    query: str, folders: str | list[str], accounts: str | list[str] | None = None, limit: int = 20, preview: bool = False
+) -> dict:
+    """Search several folders, optionally across accounts, concurrently.
+
+    Each folder is searched with search_messages on the account's pooled
+    connections, at most pool_size folders per account at a time. Every
+    folder returns its newest `limit` hits and all folders are waited for:
+    any of them may hold newer mail than the others, so the newest-first
+    merge is only cut to `limit` once each has answered.
+
+    Args:
+        query: Search query (see search_messages)
+        folders: Folder paths, or "*" for every selectable folder (INBOX first)
+        accounts: Account names, "*" for all configured accounts, None for the default account
+        limit: Maximum results overall
+        preview: Include body snippet per message
+
+    Returns:
+        Dict with messages (newest first by date, each with account and
+        folder), searched (folders completed), total (folders targeted)
+        and errors (per folder)
+    """
+    from session import get_session
+
+    build_search_criteria(query)  # Reject malformed queries once, before fanning out
+
+    if accounts == "*":
+        account_names = list_accounts() or [None]
+    elif accounts is None:
+        account_names = [None]
+    else:
+        account_names = list(accounts)
+
+    targets = []
+    for account in account_names:
+        names = _searchable_folders(account) if folders == "*" else list(folders)
+        targets += [(account, name) for name in names]
+    if not targets:
+        return {"messages": [], "searched": 0, "total": 0, "errors": []}
+
+    workers = sum(get_session(account).pool_size for account in account_names)
+    hits: list[dict] = []
+    errors: list[dict] = []
+    searched = 0
+    with ThreadPoolExecutor(max_workers=min(len(targets), workers), thread_name_prefix="imap-search") as executor:
+        futures = {
+            executor.submit(search_messages, folder, query, limit=limit, account=account, preview=preview): (account, folder)
+            for account, folder in targets
+        }
+        for future in as_completed(futures):
+            account, folder = futures[future]
+            try:
+                messages = future.result()
+            except Exception as e:
+                errors.append({"account": account, "folder": folder, "error": str(e)})
+                continue
+            searched += 1
+            hits += [{**msg, "account": account, "folder": folder} for msg in messages]
+
+    hits.sort(key=_date_sort_key, reverse=True)
+    return {"messages": hits[:limit], "searched": searched, "total": len(targets), "errors": errors}
+
+
+def _searchable_folders(account: str | None) -> list[str]:
+    """Names of the account's selectable folders, INBOX first."""
+    names = [
+        folder["name"]
+        for folder in list_folders(account)
+        if not {flag.lower() for flag in folder["flags"]} & {"\\noselect", "\\nonexistent"}
+    ]
+    return sorted(names, key=lambda name: name.upper() != "INBOX")
+
+
+def _date_sort_key(msg: dict) -> datetime:
+    """Sort key for a message's date string; undated messages sort last."""
+    try:
+        parsed = datetime.fromisoformat(msg.get("date", ""))
+    except ValueError:
+        return datetime.min
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _search_index(session, client: IMAPClient, folder: str, query: str, index) -> tuple[list[int], list] | None:
+    """Resolve the text terms of a query from the local search index.
+
+    A few new messages are indexed inline; a folder that is further behind
+    (or was never indexed) gets a background crawler and this search goes
+    to the server.
+
+    Args:
+        session: AccountSession
+        client: Connection with the folder selected
+        folder: Folder path
+        query: Search query
+        index: SearchIndex
+
+    Returns:
+        Tuple of (matching UIDs, remaining server criteria), or None when the
+        index cannot answer the query
+    """
+    try:
+        expression, rest = plan_query(query)
+    except ValueError as e:
+        raise IMAPError(f"Invalid search query: {e}") from e
+    if expression is None:
+        return None
+
+    status = client.select_folder(folder, readonly=True)  # Fresh UIDNEXT for the coverage check
+    uidvalidity, uidnext = status.get(b"UIDVALIDITY"), status.get(b"UIDNEXT")
+    state = index.state(session.account, folder)
+    if state and uidnext and state.uidvalidity == uidvalidity and 0 < uidnext - state.indexed_uidnext <= INDEX_INLINE_MAX:
+        uids = [uid for uid in client.search(["UID", f"{state.indexed_uidnext}:*"]) if state.indexed_uidnext <= uid < uidnext]
+        _index_batch(client, index, session.account, folder, uidvalidity, uids)
+        index.advance(session.account, folder, uidvalidity, uidnext)
+
+    if not index.covers(session.account, folder, uidvalidity, uidnext):
+        start_crawler(session.account, folder)
+        return None
+    hits = index.search(session.account, folder, uidvalidity, expression)
+    return None if hits is None else (hits, rest)
+
+
+def index_folder(folder: str, account: str = None) -> dict:
+    """Bring the local search index of a folder up to date.
+
+    Indexes every message from the folder's indexed UIDNEXT up to the current
+    UIDNEXT in INDEX_BATCH_SIZE batches. The connection is released between
+    batches so foreground operations are not starved, and coverage is saved
+    after each batch so an interrupted crawl resumes where it stopped. A
+    changed UIDVALIDITY restarts the folder from scratch.
+
+    Args:
+        folder: Folder path
+        account: Account name. None uses default.
+
+    Returns:
+        Dict with indexed (messages added) and uidnext
+
+    Raises:
+        IMAPError: If the search index is not enabled
+    """
+    from session import get_session
+
+    index = get_search_index()
+    if index is None:
+        raise IMAPError("Search index is disabled. Set IMAP_STREAM_SEARCH_INDEX=1 to enable it.")
+
+    session = get_session(account)
+    with session.connection_ctx(folder) as client:
+        status = client.select_folder(folder, readonly=True)
+        uidvalidity, uidnext = status.get(b"UIDVALIDITY"), status.get(b"UIDNEXT")
+        if uidvalidity is None or uidnext is None:
+            raise IMAPError(f"Cannot index '{folder}': server did not report UIDVALIDITY/UIDNEXT")
+        state = index.state(session.account, folder)
+        if state is None or state.uidvalidity != uidvalidity:
+            index.reset(session.account, folder, uidvalidity)
+            start = 1
+        else:
+            start = state.indexed_uidnext
+        uids = [uid for uid in client.search(["UID", f"{start}:*"]) if start <= uid < uidnext] if start < uidnext else []
+
+    indexed = 0
+    for offset in range(0, len(uids), INDEX_BATCH_SIZE):
+        batch = uids[offset : offset + INDEX_BATCH_SIZE]
+        with session.connection_ctx(folder) as client:
+            indexed += _index_batch(client, index, session.account, folder, uidvalidity, batch)
+        index.advance(session.account, folder, uidvalidity, batch[-1] + 1)
+    index.advance(session.account, folder, uidvalidity, uidnext)
+    return {"indexed": indexed, "uidnext": uidnext}
+
+
+def _index_batch(client: IMAPClient, index, account: str | None, folder: str, uidvalidity: int, uids: list[int]) -> int:
+    """Fetch and index the messages of uids that are not indexed yet.
+
+    One FETCH for envelopes and structures, then one partial FETCH per text
+    section, each naming only the messages whose text is in that section.
+
+    Returns:
+        Number of messages added
+    """
+    done = index.indexed_uids(account, folder, uidvalidity, uids)
+    uids = [uid for uid in uids if uid not in done]
+    if not uids:
+        return 0
+    data = client.fetch(uids, ["ENVELOPE", "BODYSTRUCTURE"])
+    structures = {uid: msg_data.get(b"BODYSTRUCTURE") for uid, msg_data in data.items()}
+    bodies = fetch_snippets(client.fetch, structures, max_bytes=INDEX_BODY_BYTES, max_chars=INDEX_BODY_BYTES)
+
+    docs = [_index_document(uid, msg_data[b"ENVELOPE"], bodies.get(uid, "")) for uid, msg_data in data.items() if b"ENVELOPE" in msg_data]
+    index.add(account, folder, uidvalidity, docs)
+    return len(docs)
+
+
+def _index_document(uid: int, envelope, body: str) -> dict:
+    """Build a search index document from an envelope and body text."""
+    recipients = [*format_address_list(envelope.to), *format_address_list(envelope.cc), *format_address_list(envelope.bcc)]
+    return {
+        "id": uid,
+        "subject": decode_header_value(envelope.subject) if envelope.subject else "",
+        "sender": ", ".join(format_address_list(envelope.from_)),
+        "recipients": ", ".join(recipients),
+        "body": body,
+    }
+
+
+def _index_read(session, folder: str, message_id: int, envelope, body_text: str, body_html: str):
+    """Add a message that was just read to the search index, if enabled."""
+    index = get_search_index()
+    uidvalidity = session.uidvalidities.get(folder)
+    if index is None or uidvalidity is None:
+        return
+    body = body_text or (_html_text(session, folder, message_id, body_html, mode="fast") if body_html else "")
+    index.add(session.account, folder, uidvalidity, [_index_document(message_id, envelope, body[:INDEX_BODY_BYTES])])
+
+
 MAX_ATTACHMENT_SIZE = 25 * 1024 * 1024  # 25 MB
 
 # Sensitive paths blocked from attachment (security: prevent data exfiltration)
@@ -1031,73 +1571,202 @@ def create_draft(
     Returns:
         Info about created draft
     """
-    from session import get_session
+    from session import get_session, invalidate_message_cache
 
     session = get_session(account)
+    drafts_folder = _drafts_folder(session)
+
+    # Get username for From header
+    _, _, username, _ = get_credentials(session.account)
+    msg, att_info = _build_draft(username, to, subject, body, in_reply_to, cc, html, attachments)
+
     with session.connection_ctx() as client:
-        # Build email message
-        msg = email.message.EmailMessage()
+        # Append to Drafts with \Draft flag: the only round-trip once the role map is cached
+        try:
+            client.append(drafts_folder, msg.as_bytes(), flags=DRAFT_FLAGS)
+        except IMAPClientError:
+            session.forget_folders()  # Folder may have been renamed
+            raise
 
-        # Get username for From header
-        _, _, username, _ = get_credentials()
-        msg["From"] = username
-        msg["To"] = to
-        msg["Subject"] = subject
-        msg["Date"] = email.utils.formatdate(localtime=True)
-        msg["Message-ID"] = email.utils.make_msgid()
+    # Invalidate cache for drafts folder
+    invalidate_message_cache(session.account, drafts_folder)
 
-        if cc:
-            msg["Cc"] = cc
+    response = {"status": "created", "folder": drafts_folder, "to": to, "subject": subject, "message_id": msg["Message-ID"]}
+    if att_info:
+        response["attachments"] = att_info
+    return response
 
-        if in_reply_to:
-            msg["In-Reply-To"] = in_reply_to
-            msg["References"] = in_reply_to
 
-        # Set body - plain text, optionally with HTML alternative
-        msg.set_content(body)
-        if html:
-            msg.add_alternative(html, subtype="html")
+def create_drafts(folder: str, drafts: list[dict], account: str = None) -> dict:
+    """Create several drafts with one Drafts lookup and one connection.
 
-        # Attach files (validates all paths before modifying message)
-        att_info = []
-        if attachments:
-            att_info = _attach_files(msg, attachments)
+    Every message is built before the upload. With MULTIAPPEND (RFC 3502) all
+    drafts go up in one APPEND; otherwise, or when the server rejects the
+    batch, they are appended one after another on the same connection.
+
+    Args:
+        folder: Currently active folder (for context)
+        drafts: Drafts with create_draft's fields: to, subject, body (required),
+            in_reply_to, cc, html, attachments (optional)
+        account: Account name. None uses default.
 
-        # Find Drafts folder
-        folders = client.list_folders()
-        drafts_folder = None
+    Returns:
+        Dict with folder, created count, and drafts: one entry per input draft,
+        in order, with status "created" and message_id, or status "error" and error
 
-        for flags, _delimiter, folder_name in folders:
-            # Look for Drafts folder by flag or name
-            if b"\\Drafts" in flags or folder_name.lower() in ["drafts", "draft", "luonnokset"]:
-                drafts_folder = folder_name
-                break
+    Raises:
+        IMAPError: If the batch is empty or too large, or Drafts cannot be found
+    """
+    from session import get_session, invalidate_message_cache
 
-        if not drafts_folder:
-            # Try common names
-            for name in ["Drafts", "INBOX.Drafts", "Draft"]:
-                try:
-                    client.select_folder(name)
-                    drafts_folder = name
-                    break
-                except Exception:
-                    continue
+    if not drafts:
+        raise IMAPError("No drafts given")
+    if len(drafts) > DRAFT_BATCH_MAX:
+        raise IMAPError(f"Too many drafts: {len(drafts)} (max {DRAFT_BATCH_MAX} per call)")
 
-        if not drafts_folder:
-            raise IMAPError("Cannot find Drafts folder. Available folders: " + ", ".join(f[2] for f in folders))
+    session = get_session(account)
+    drafts_folder = _drafts_folder(session)
+    _, _, username, _ = get_credentials(session.account)
+
+    results = []
+    built = []  # (result entry, message bytes) of drafts ready to upload
+    for fields in drafts:
+        entry = {"to": fields.get("to", ""), "subject": fields.get("subject", "")}
+        results.append(entry)
+        try:
+            msg, att_info = _build_draft(
+                username,
+                fields["to"],
+                fields["subject"],
+                fields["body"],
+                fields.get("in_reply_to"),
+                fields.get("cc"),
+                fields.get("html"),
+                fields.get("attachments"),
+            )
+        except KeyError as e:
+            entry.update(status="error", error=f"Missing required field: {e.args[0]}")
+            continue
+        except IMAPError as e:
+            entry.update(status="error", error=str(e))
+            continue
+        entry.update(status="created", message_id=msg["Message-ID"])
+        if att_info:
+            entry["attachments"] = att_info
+        built.append((entry, msg.as_bytes()))
+
+    if built:
+        with session.connection_ctx() as client:
+            _append_drafts(client, drafts_folder, built)
+        created = sum(1 for entry, _ in built if entry["status"] == "created")
+        if created:
+            invalidate_message_cache(session.account, drafts_folder)
+        else:
+            session.forget_folders()  # Folder may have been renamed
 
-        # Append to Drafts with \Draft flag
-        client.append(drafts_folder, msg.as_bytes(), flags=[b"\\Draft", b"\\Seen"])
+    return {"folder": drafts_folder, "created": sum(1 for r in results if r["status"] == "created"), "drafts": results}
 
-        # Invalidate cache for drafts folder
-        from session import invalidate_message_cache
 
-        invalidate_message_cache(session.account, drafts_folder)
+def _drafts_folder(session) -> str:
+    """Resolve the Drafts folder of session's account.
 
-        response = {"status": "created", "folder": drafts_folder, "to": to, "subject": subject, "message_id": msg["Message-ID"]}
-        if att_info:
-            response["attachments"] = att_info
-        return response
+    Raises:
+        IMAPError: If no folder has the drafts role
+    """
+    drafts_folder = session.get_folder_role("drafts")
+    if not drafts_folder:
+        raise IMAPError("Cannot find Drafts folder. Available folders: " + ", ".join(f["name"] for f in session.get_folders()))
+    return drafts_folder
+
+
+def _build_draft(
+    username: str,
+    to: str,
+    subject: str,
+    body: str,
+    in_reply_to: str | None = None,
+    cc: str | None = None,
+    html: str | None = None,
+    attachments: list[str] | None = None,
+) -> tuple[email.message.EmailMessage, list[dict]]:
+    """Build a new draft message.
+
+    Args:
+        username: Sender address for the From header
+        to: Recipient address
+        subject: Message subject
+        body: Message body (plain text)
+        in_reply_to: Message-ID to reply to
+        cc: CC addresses (comma-separated)
+        html: HTML body (if provided, creates multipart/alternative)
+        attachments: List of absolute file paths to attach.
+
+    Returns:
+        (message, attachment info from _attach_files)
+
+    Raises:
+        IMAPError: On an invalid attachment path
+    """
+    msg = email.message.EmailMessage()
+    msg["From"] = username
+    msg["To"] = to
+    msg["Subject"] = subject
+    msg["Date"] = email.utils.formatdate(localtime=True)
+    msg["Message-ID"] = email.utils.make_msgid()
+
+    if cc:
+        msg["Cc"] = cc
+
+    if in_reply_to:
+        msg["In-Reply-To"] = in_reply_to
+        msg["References"] = in_reply_to
+
+    # Set body - plain text, optionally with HTML alternative
+    msg.set_content(body)
+    if html:
+        msg.add_alternative(html, subtype="html")
+
+    # Attach files (validates all paths before modifying message)
+    att_info = []
+    if attachments:
+        att_info = _attach_files(msg, attachments)
+    return msg, att_info
+
+
+def _append_drafts(client: IMAPClient, drafts_folder: str, built: list[tuple[dict, bytes]]):
+    """Upload built drafts, recording failures on their result entries.
+
+    Args:
+        client: Connected client
+        drafts_folder: Drafts folder path
+        built: (result entry, message bytes) per draft
+    """
+    if len(built) > 1 and client.has_capability("MULTIAPPEND"):
+        try:
+            client.multiappend(drafts_folder, [{"msg": data, "flags": DRAFT_FLAGS} for _, data in built])
+            return
+        except IMAPClientAbortError as e:
+            _fail_drafts([entry for entry, _ in built], e)  # Connection is gone, retrying cannot help
+            return
+        except IMAPClientError:
+            pass  # MULTIAPPEND is all or nothing: append one by one to find the failing drafts
+
+    for index, (entry, data) in enumerate(built):
+        try:
+            client.append(drafts_folder, data, flags=DRAFT_FLAGS)
+        except IMAPClientAbortError as e:
+            _fail_drafts([rest for rest, _ in built[index:]], e)
+            break
+        except IMAPClientError as e:
+            _fail_drafts([entry], e)
+
+
+def _fail_drafts(entries: list[dict], error: Exception):
+    """Mark draft result entries as not uploaded."""
+    for entry in entries:
+        entry.pop("message_id", None)
+        entry.pop("attachments", None)
+        entry.update(status="error", error=str(error))
 
 
 def modify_draft(
@@ -1110,7 +1779,6 @@ def modify_draft(
     html: str | None = None,
     attachments: list[str] | None = None,
     account: str = None,
-    prefetched_draft: tuple[object, email.message.Message] | None = None,
 ) -> dict:
     """Modify an existing draft message.
 
@@ -1127,8 +1795,6 @@ def modify_draft(
         html: HTML body (if provided, creates multipart/alternative)
         attachments: List of absolute file paths to attach.
         account: Account name. None uses default.
-        prefetched_draft: Optional (envelope, parsed_message) tuple from earlier fetch.
-            Used by edit_draft to avoid a second fetch.
 
     Returns:
         Info about the modified draft
@@ -1136,34 +1802,26 @@ def modify_draft(
     from session import get_session
 
     session = get_session(account)
-    with session.connection_ctx() as client:
-        # Select folder
-        try:
-            client.select_folder(folder, readonly=False)
-        except Exception as e:
-            raise IMAPError(f"Cannot open folder '{folder}': {e}") from e
-
-        if prefetched_draft is None:
-            # Fetch original draft
-            messages = client.fetch([message_id], ["RFC822", "ENVELOPE", "FLAGS"])
+    drafts_folder = session.get_folder_role("drafts") or folder  # Use current folder as fallback
+    with session.connection_ctx(folder, readonly=False) as client:
+        # Fetch original draft (edit_draft has usually just cached its content);
+        # FLAGS come live from this read-write connection, so a draft sent or
+        # expunged by another client is caught before delete+expunge
+        fetched = session.parsed_message(folder, message_id, client=client)
+
+        if fetched is None:
+            raise IMAPError(f"Message {message_id} not found in '{folder}'")
 
-            if message_id not in messages:
-                raise IMAPError(f"Message {message_id} not found in '{folder}'")
+        data, original_msg = fetched
+        envelope = data[b"ENVELOPE"]
 
-            data = messages[message_id]
-            envelope = data[b"ENVELOPE"]
-            raw_email = data[b"RFC822"]
-            original_msg = email.message_from_bytes(raw_email)
-
-            # Safety: verify message has \Draft flag before allowing delete+expunge
-            msg_flags = [to_str(f).lower() for f in data.get(b"FLAGS", [])]
-            if "\\draft" not in msg_flags:
-                raise IMAPError(
-                    f"Message {message_id} does not have \\Draft flag — refusing to modify. "
-                    "Only draft messages can be modified (delete+replace)."
-                )
-        else:
-            envelope, original_msg = prefetched_draft
+        # Safety: verify message has \Draft flag before allowing delete+expunge
+        msg_flags = [to_str(f).lower() for f in data.get(b"FLAGS", [])]
+        if "\\draft" not in msg_flags:
+            raise IMAPError(
+                f"Message {message_id} does not have \\Draft flag — refusing to modify. "
+                "Only draft messages can be modified (delete+replace)."
+            )
 
         # Extract original values
         original_subject = decode_header_value(envelope.subject) if envelope.subject else ""
@@ -1188,10 +1846,10 @@ def modify_draft(
         if references:
             references = decode_header_value(references).replace("\n", "").replace("\r", "").strip()
 
-        # Build new message
+        # Build new message headers; the body is assembled from raw parts below
         new_msg = email.message.EmailMessage()
 
-        _, _, username, _ = get_credentials()
+        _, _, username, _ = get_credentials(session.account)
         new_msg["From"] = username
         new_msg["To"] = to if to else ", ".join(original_to)
         new_msg["Subject"] = subject if subject else original_subject
@@ -1209,52 +1867,30 @@ def modify_draft(
         if references:
             new_msg["References"] = references
 
-        # Set body - plain text, optionally with HTML alternative
-        new_msg.set_content(body)
-        if html:
-            new_msg.add_alternative(html, subtype="html")
+        # Existing attachments and multipart/related resources are carried over as
+        # the original, still-encoded bytes; only the new body and files are encoded
+        raw = data[b"RFC822"]
+        policy = email.policy.SMTP if b"\r\n" in raw[:1024] else email.policy.default
+        related, carried, preserved_att_info = _carry_over_parts(raw)
 
-        # Preserve existing attachments from original draft
-        preserved_att_info = []
-        for part in original_msg.walk():
-            disposition = part.get_content_disposition()
-            filename = part.get_filename()
-            if disposition == "attachment" or (disposition == "inline" and filename):
-                payload = part.get_payload(decode=True)
-                if payload is not None:
-                    content_type = part.get_content_type()
-                    maintype, subtype = content_type.split("/", 1)
-                    new_msg.add_attachment(
-                        payload,
-                        maintype=maintype,
-                        subtype=subtype,
-                        filename=filename or "unnamed",
-                    )
-                    preserved_att_info.append(
-                        {
-                            "name": filename or "unnamed",
-                            "size": len(payload),
-                        }
-                    )
+        body_part = email.message.EmailMessage(policy=policy)
+        body_part.set_content(body)
+        if html:
+            body_part.add_alternative(html, subtype="html")
 
         # Attach new files
         att_info = []
         if attachments:
-            att_info = _attach_files(new_msg, attachments)
-
-        # Find Drafts folder for appending
-        folders = client.list_folders()
-        drafts_folder = None
-        for flags, _, folder_name in folders:
-            if b"\\Drafts" in flags or folder_name.lower() in ["drafts", "draft", "luonnokset"]:
-                drafts_folder = folder_name
-                break
-
-        if not drafts_folder:
-            drafts_folder = folder  # Use current folder as fallback
+            new_files = email.message.EmailMessage(policy=policy)
+            att_info = _attach_files(new_files, attachments)
+            carried.extend(_part_bytes(part, policy) for part in new_files.iter_attachments())
 
         # Append-before-delete: append new draft first, then delete old
-        client.append(drafts_folder, new_msg.as_bytes(), flags=[b"\\Draft", b"\\Seen"])
+        try:
+            client.append(drafts_folder, _assemble_draft(new_msg, body_part, related, carried, policy), flags=DRAFT_FLAGS)
+        except IMAPClientError:
+            session.forget_folders()  # Folder may have been renamed
+            raise
 
         client.delete_messages([message_id])
         client.expunge()
@@ -1280,6 +1916,155 @@ def modify_draft(
         return response
 
 
+def _carry_over_parts(raw: bytes) -> tuple[list[memoryview], list[memoryview], list[dict]]:
+    """Find the parts of a draft that modify_draft keeps, as undecoded bytes.
+
+    Args:
+        raw: Complete draft (RFC822)
+
+    Returns:
+        (resources of a multipart/related body other than its root, attachments
+        and inline parts with a filename, {name, size} per kept part with a filename)
+    """
+    related: list[memoryview] = []
+    attachments: list[memoryview] = []
+    info: list[dict] = []
+
+    def keep(target: list, entity: memoryview, headers: email.message.Message, body: memoryview):
+        target.append(entity)
+        filename = headers.get_filename()
+        if filename or target is attachments:
+            info.append({"name": filename or "unnamed", "size": _decoded_size(body, headers.get("Content-Transfer-Encoding", ""))})
+
+    def walk(entity: memoryview, root: bool = False):
+        headers, body = _split_entity(entity)
+        if headers.get_content_maintype() == "multipart":
+            children = _split_multipart(body, headers.get_boundary())
+            if headers.get_content_subtype() == "related" and children:
+                start = _related_root(children, headers.get_param("start"))
+                walk(children[start])  # The body being replaced; attachments may still sit below it
+                for index, child in enumerate(children):
+                    if index != start:
+                        keep(related, child, *_split_entity(child))
+                return
+            for child in children:
+                walk(child)
+            return
+        disposition = headers.get_content_disposition()
+        if not root and (disposition == "attachment" or (disposition == "inline" and headers.get_filename())):
+            keep(attachments, entity, headers, body)
+
+    walk(memoryview(raw), root=True)
+    return related, attachments, info
+
+
+def _split_entity(entity: memoryview) -> tuple[email.message.Message, memoryview]:
+    """Split a raw MIME entity into its parsed headers and undecoded body."""
+    if entity[:1] == b"\n" or entity[:2] == b"\r\n":
+        return email.message.Message(), entity[1 if entity[:1] == b"\n" else 2 :]
+    match = _MIME_HEADER_END.search(entity)
+    if match is None:
+        return email.parser.BytesHeaderParser().parsebytes(bytes(entity)), entity[len(entity) :]
+    headers = email.parser.BytesHeaderParser().parsebytes(bytes(entity[: match.start()]))
+    return headers, entity[match.end() :]
+
+
+def _split_multipart(body: memoryview, boundary: str | None) -> list[memoryview]:
+    """Split a raw multipart body into its child entities (preamble and epilogue dropped)."""
+    if not boundary:
+        return []
+    marker = b"--" + boundary.encode("ascii", errors="replace")
+    tail = rb"(--)?[ \t]*\r?(?=\n|\Z)"
+    # Delimiters follow a line break; the literal "\n--" prefix keeps the scan a fast substring search
+    first = re.compile(re.escape(marker) + tail).match(body)
+    delimiters = re.compile(rb"\n" + re.escape(marker) + tail).finditer(body)
+    children = []
+    start = None
+    for match in ([first] if first else []) + list(delimiters):
+        if start is not None:
+            end = match.start() - (1 if match.start() > 0 and body[match.start() - 1] == 13 else 0)  # Drop "\r"
+            children.append(body[start : max(start, end)])
+        if match.group(1):
+            break
+        start = match.end() + 1  # Past the delimiter line's "\n"
+    return children
+
+
+def _related_root(children: list[memoryview], start: str | None) -> int:
+    """Index of the root part of a multipart/related (its start parameter, else the first)."""
+    if start:
+        for index, child in enumerate(children):
+            if _split_entity(child)[0].get("Content-ID", "").strip() == start.strip():
+                return index
+    return 0
+
+
+def _decoded_size(body: memoryview, encoding: str) -> int:
+    """Size of a part's content after transfer decoding, without decoding it."""
+    if encoding.strip().lower() != "base64":
+        return len(body)
+    data = body.tobytes()
+    encoded = len(data) - data.count(b"\n") - data.count(b"\r") - data.count(b" ")
+    return max(0, encoded * 3 // 4 - data.rstrip()[-2:].count(b"="))
+
+
+def _part_bytes(part: email.message.EmailMessage, policy: email.policy.Policy) -> bytes:
+    """Serialize a generated MIME part for inclusion in a multipart body."""
+    del part["MIME-Version"]
+    return part.as_bytes(policy=policy)
+
+
+def _assemble_draft(
+    headers: email.message.EmailMessage,
+    body_part: email.message.EmailMessage,
+    related: list[memoryview],
+    attachments: list,
+    policy: email.policy.Policy,
+) -> bytes:
+    """Write a draft from its headers, new body and raw parts in one pass.
+
+    Raw parts are copied once, into the returned bytes; nothing is decoded
+    or re-encoded.
+
+    Args:
+        headers: Top-level headers (no content)
+        body_part: New text body (text/plain or multipart/alternative)
+        related: Resources of the original multipart/related body
+        attachments: Raw attachment entities, carried over and new
+        policy: Line ending and header folding of the draft
+
+    Returns:
+        Complete message
+    """
+    linesep = policy.linesep.encode()
+    top = [policy.fold_binary(name, value) for name, value in headers.items()]
+    top += [b"MIME-Version: 1.0", linesep]
+    content = _part_bytes(body_part, policy)
+    if not related and not attachments:
+        return b"".join([*top, content])  # The body part's own headers complete the header block
+
+    def multipart(subtype: str, parts: list, extra: str = "") -> tuple[bytes, list]:
+        boundary = f"=_{uuid.uuid4().hex}"  # "=_" never occurs in base64 or quoted-printable content
+        chunks = []
+        for part in parts:
+            chunks += [b"--", boundary.encode(), linesep, part, linesep]
+        chunks += [b"--", boundary.encode(), b"--", linesep]
+        return f'multipart/{subtype}; boundary="{boundary}"{extra}'.encode(), chunks
+
+    content_type = None
+    if related:
+        content_type, chunks = multipart("related", [content, *related], f'; type="{body_part.get_content_type()}"')
+        content = b"".join(chunks)
+    if attachments:
+        if content_type is not None:
+            content = b"Content-Type: " + content_type + linesep + linesep + content
+        content_type, chunks = multipart("mixed", [content, *attachments])
+    else:
+        chunks = [content]
+
+    return b"".join([*top, b"Content-Type: ", content_type, linesep, linesep, *chunks])
+
+
 def _extract_draft_bodies(msg: email.message.Message) -> tuple[str, str | None]:
     """Extract plain and HTML body from draft message.
 
@@ -1358,27 +2143,18 @@ def edit_draft(folder: str, message_id: int, replacements: list[dict], account:
     from session import get_session
 
     session = get_session(account)
-    with session.connection_ctx() as client:
-        try:
-            client.select_folder(folder, readonly=True)
-        except Exception as e:
-            raise IMAPError(f"Cannot open folder '{folder}': {e}") from e
-
-        messages = client.fetch([message_id], ["RFC822", "ENVELOPE", "FLAGS"])
-        if message_id not in messages:
-            raise IMAPError(f"Message {message_id} not found in '{folder}'")
+    fetched = session.parsed_message(folder, message_id)
+    if fetched is None:
+        raise IMAPError(f"Message {message_id} not found in '{folder}'")
 
-        data = messages[message_id]
-        envelope = data[b"ENVELOPE"]
-        raw_email = data[b"RFC822"]
-        original_msg = email.message_from_bytes(raw_email)
+    data, original_msg = fetched
 
-        # Safety: verify message has \Draft flag before allowing edit (which deletes+replaces)
-        msg_flags = [to_str(f).lower() for f in data.get(b"FLAGS", [])]
-        if "\\draft" not in msg_flags:
-            raise IMAPError(f"Message {message_id} does not have \\Draft flag — refusing to edit. Only draft messages can be edited.")
+    # Safety: verify message has \Draft flag before allowing edit (which deletes+replaces)
+    msg_flags = [to_str(f).lower() for f in data.get(b"FLAGS", [])]
+    if "\\draft" not in msg_flags:
+        raise IMAPError(f"Message {message_id} does not have \\Draft flag — refusing to edit. Only draft messages can be edited.")
 
-        plain_body, html_body = _extract_draft_bodies(original_msg)
+    plain_body, html_body = _extract_draft_bodies(original_msg)
 
     for idx, repl in enumerate(replacements):
         if not isinstance(repl, dict) or "old" not in repl or "new" not in repl:
@@ -1412,7 +2188,6 @@ def edit_draft(folder: str, message_id: int, replacements: list[dict], account:
         body=plain_body,
         html=new_html,
         account=account,
-        prefetched_draft=(envelope, original_msg),
     )
     result["changes"] = [{"old": r["old"], "new": r["new"]} for r in replacements]
     return result
@@ -1440,57 +2215,222 @@ def modify_flags(folder: str, message_ids: list[int], add_flags: list[str], remo
     if not message_ids:
         return result
 
-    with session.connection_ctx() as client:
-        try:
-            client.select_folder(folder, readonly=False)
-        except Exception as e:
-            raise IMAPError(f"Cannot open folder '{folder}': {e}") from e
+    with session.connection_ctx(folder, readonly=False) as client:
+        pending = _existing_uids(client, message_ids, result["failed"])
+        current_flags = _apply_flags(client, pending, add_flags, remove_flags, result)
 
-        for msg_id in message_ids:
-            try:
-                # Verify message exists
-                exists = client.search(["UID", msg_id])
-                if not exists:
-                    result["failed"].append({"id": msg_id, "error": "Message not found"})
-                    continue
-
-                # Add flags
-                if add_flags:
-                    imap_flags = [normalize_flag_input(f).encode() for f in add_flags]
-                    try:
-                        client.add_flags([msg_id], imap_flags)
-                    except Exception as e:
-                        result["failed"].append({"id": msg_id, "operation": "add_flags", "flags": add_flags, "error": str(e)})
-                        continue
-
-                # Remove flags
-                if remove_flags:
-                    imap_flags = [normalize_flag_input(f).encode() for f in remove_flags]
-                    try:
-                        client.remove_flags([msg_id], imap_flags)
-                    except Exception as e:
-                        result["failed"].append({"id": msg_id, "operation": "remove_flags", "flags": remove_flags, "error": str(e)})
-                        continue
-
-                result["modified"] += 1
-
-                # Update cache for successfully modified message
-                try:
-                    msg_data = client.fetch([msg_id], ["FLAGS"])
-                    if msg_id in msg_data:
-                        current_flags = [normalize_flag_output(to_str(f)) for f in msg_data[msg_id].get(b"FLAGS", [])]
-                        from session import update_cached_flags
-
-                        update_cached_flags(session.account, folder, msg_id, current_flags)
-                except Exception:
-                    pass  # Cache update failure is not critical
+    _update_flag_caches(session.account, folder, current_flags)
+    return result
+
+
+def modify_flags_by_query(folder: str, query: str, add_flags: list[str], remove_flags: list[str], account: str = None) -> dict:
+    """Add or remove flags on every message matching a search query.
+
+    The whole server-side result set is changed with one UID STORE per flag
+    set (per UID_PAGE_SIZE UIDs); no IDs pass through the caller.
+
+    Args:
+        folder: IMAP folder path
+        query: Search query (see search_messages)
+        add_flags: Flags to add (user format)
+        remove_flags: Flags to remove
+        account: Account name. None uses default.
 
+    Returns:
+        Dict like modify_flags plus matched count
+    """
+    from session import get_session
+
+    session = get_session(account)
+    result = {"matched": 0, "modified": 0, "flags_added": list(set(add_flags)), "flags_removed": list(set(remove_flags)), "failed": []}
+
+    with session.connection_ctx(folder, readonly=False) as client:
+        uids = client.search(build_search_criteria(query))
+        result["matched"] = len(uids)
+        current_flags = _apply_flags(client, sorted(uids), add_flags, remove_flags, result)
+
+    _update_flag_caches(session.account, folder, current_flags)
+    return result
+
+
+def move_messages(folder: str, target: str, message_ids: list[int] | None = None, query: str | None = None, account: str = None) -> dict:
+    """Move messages to another folder, by ID list or search query.
+
+    Uses MOVE when the server supports it, else COPY + \\Deleted + UID EXPUNGE.
+    Without UIDPLUS the originals are copied and marked \\Deleted but not
+    expunged, since a plain EXPUNGE would also remove unrelated messages.
+    UIDs are sent in pages of UID_PAGE_SIZE.
+
+    Args:
+        folder: Source folder
+        target: Destination folder
+        message_ids: Message IDs to move
+        query: Search query selecting messages to move (instead of message_ids)
+        account: Account name. None uses default.
+
+    Returns:
+        Dict with moved count, matched count, target, method, expunged and failed list
+    """
+    from session import get_session, invalidate_message_cache, remove_cached_messages
+
+    if (message_ids is None) == (query is None):
+        raise IMAPError("Provide either message IDs or a search query to move")
+    if target == folder:
+        raise IMAPError(f"Source and target folder are the same: '{folder}'")
+
+    session = get_session(account)
+    result = {"matched": 0, "moved": 0, "target": target, "method": "", "expunged": True, "failed": []}
+
+    with session.connection_ctx(folder, readonly=False) as client:
+        if query is not None:
+            uids = sorted(client.search(build_search_criteria(query)))
+        else:
+            uids = _existing_uids(client, message_ids, result["failed"])
+        result["matched"] = len(uids)
+
+        use_move = client.has_capability("MOVE")
+        result["method"] = "MOVE" if use_move else "COPY"
+        if not use_move and not client.has_capability("UIDPLUS"):
+            result["expunged"] = False
+
+        moved = []
+        for start in range(0, len(uids), UID_PAGE_SIZE):
+            page = uids[start : start + UID_PAGE_SIZE]
+            try:
+                if use_move:
+                    client.move(page, target)
+                else:
+                    client.copy(page, target)
+                    client.add_flags(page, [b"\\Deleted"], silent=True)
+                    if result["expunged"]:
+                        client.expunge(page)
+            except IMAPClientAbortError as e:
+                result["failed"].extend({"id": uid, "error": str(e)} for uid in uids[start:])
+                break
             except Exception as e:
-                result["failed"].append({"id": msg_id, "error": str(e)})
+                result["failed"].extend({"id": uid, "error": str(e)} for uid in page)
+                continue
+            moved.extend(page)
 
+    result["moved"] = len(moved)
+    if moved:
+        if result["expunged"]:
+            remove_cached_messages(session.account, folder, moved)
+        else:
+            invalidate_message_cache(session.account, folder)  # Originals remain, now \\Deleted
     return result
 
 
+def _existing_uids(client: IMAPClient, message_ids: list[int], failed: list) -> list[int]:
+    """Return the message_ids that exist, checked with one UID SEARCH.
+
+    Missing IDs (or all, if the SEARCH fails) are appended to failed.
+    """
+    try:
+        found = set(client.search(["UID", _uid_set(message_ids)]))
+    except Exception as e:
+        failed.extend({"id": msg_id, "error": str(e)} for msg_id in message_ids)
+        return []
+
+    existing = []
+    for msg_id in dict.fromkeys(message_ids):
+        if msg_id in found:
+            existing.append(msg_id)
+        else:
+            failed.append({"id": msg_id, "error": "Message not found"})
+    return existing
+
+
+def _apply_flags(client: IMAPClient, uids: list[int], add_flags: list[str], remove_flags: list[str], result: dict) -> dict:
+    """STORE flag changes on uids, one command per flag set and page.
+
+    Updates result["modified"] and result["failed"].
+
+    Returns:
+        Current flags by UID for the modified messages
+    """
+    pending = list(uids)
+    current_flags = {}
+    for operation, flags in (("add_flags", add_flags), ("remove_flags", remove_flags)):
+        if not flags or not pending:
+            continue
+        imap_flags = [normalize_flag_input(f).encode() for f in flags]
+        errors = {}
+        for start in range(0, len(pending), UID_PAGE_SIZE):
+            # The untagged FETCH replies of the STORE carry the new flags
+            stored, page_errors = _store_flags(client, operation, pending[start : start + UID_PAGE_SIZE], imap_flags)
+            current_flags.update(stored)
+            errors.update(page_errors)
+        for msg_id, error in errors.items():
+            result["failed"].append({"id": msg_id, "operation": operation, "flags": flags, "error": error})
+        pending = [msg_id for msg_id in pending if msg_id not in errors]
+
+    result["modified"] = len(pending)
+
+    # Servers may omit FETCH replies (or send them unsolicited later): fetch the rest at once
+    missing = [msg_id for msg_id in pending if msg_id not in current_flags]
+    if missing:
+        try:
+            current_flags.update({msg_id: data.get(b"FLAGS", ()) for msg_id, data in client.fetch(missing, ["FLAGS"]).items()})
+        except Exception:
+            pass  # Cache update failure is not critical
+
+    return {msg_id: current_flags[msg_id] for msg_id in pending if msg_id in current_flags}
+
+
+def _update_flag_caches(account: str, folder: str, current_flags: dict):
+    """Push flags from STORE/FETCH replies into the session caches."""
+    from session import update_cached_flags
+
+    for msg_id, flags in current_flags.items():
+        update_cached_flags(account, folder, msg_id, [normalize_flag_output(to_str(f)) for f in flags])
+
+
+def _uid_set(uids: list[int]) -> str:
+    """Format UIDs as a compact IMAP sequence set, such as ``1:3,7``."""
+    ranges = []
+    for uid in sorted(set(uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(str(lo) if lo == hi else f"{lo}:{hi}" for lo, hi in ranges)
+
+
+def _store_flags(client: IMAPClient, operation: str, uids: list[int], imap_flags: list[bytes]) -> tuple[dict, dict]:
+    """Run one UID STORE for all uids, retrying per UID only if the batch fails.
+
+    Args:
+        client: Connected client with the folder selected read-write
+        operation: ``add_flags`` or ``remove_flags``
+        uids: Message UIDs
+        imap_flags: Flags in IMAP form
+
+    Returns:
+        (flags by UID from the untagged FETCH replies, error text by failed UID)
+    """
+    store = getattr(client, operation)
+    try:
+        return store(uids, imap_flags) or {}, {}
+    except IMAPClientAbortError as e:
+        return {}, {uid: str(e) for uid in uids}  # Connection is gone, retrying cannot help
+    except Exception as e:
+        if len(uids) == 1:
+            return {}, {uids[0]: str(e)}
+
+    # Batch rejected: isolate the failing messages
+    stored, errors = {}, {}
+    for index, uid in enumerate(uids):
+        try:
+            stored.update(store([uid], imap_flags) or {})
+        except IMAPClientAbortError as e:
+            errors.update({rest: str(e) for rest in uids[index:]})
+            break
+        except Exception as e:
+            errors[uid] = str(e)
+    return stored, errors
+
+
 def test_connection():
     """Test IMAP connection with stored credentials."""
     try:
@@ -7,6 +7,7 @@ Pure functions for:
 """
 
 import re
+import threading
 
 import markdown
 from pymdownx import emoji
@@ -33,6 +34,28 @@ VALID_FORMATS = {"markdown", "plain"}
 # Negative lookbehind: skip URLs already in href="..."
 URL_PATTERN = re.compile(r'(?<!href=")(https?://[^\s<>"]+)')
 
+ORDERED_ITEM_PATTERN = re.compile(r"\d+\. ")  # "1. " at line start (after strip)
+
+# markdown_to_plain rewrites, applied in order
+PLAIN_REWRITES = [
+    (re.compile(r"\*\*(.+?)\*\*"), r"*\1*"),  # **bold** -> *bold*
+    (re.compile(r"__(.+?)__"), r"*\1*"),  # __bold__ -> *bold*
+    (re.compile(r"\[([^\]]+)\]\(([^)]+)\)"), r"\1 <\2>"),  # [text](url) -> text <url>
+    (re.compile(r"~~(.+?)~~"), r"\1"),  # ~~strike~~ -> plain (screen readers would say "tilde tilde")
+    (re.compile(r"==(.+?)=="), r"\1"),  # ==highlight== -> plain (screen readers would say "equals equals")
+]
+
+# One converter per thread: building it registers every extension (emoji tables included)
+_local = threading.local()
+
+
+def _markdown() -> markdown.Markdown:
+    """Return this thread's Markdown converter, reset for a new document."""
+    converter = getattr(_local, "converter", None)
+    if converter is None:
+        converter = _local.converter = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS, extension_configs=MARKDOWN_EXTENSION_CONFIGS)
+    return converter.reset()
+
 
 def autolink_urls(html: str) -> str:
     """Convert bare URLs to links in HTML, skip already linked URLs."""
@@ -71,7 +94,10 @@ def preprocess_markdown(text: str) -> str:
 
         # Check if line is a list item
         is_list_item = (
-            stripped.startswith("- ") or stripped.startswith("* ") or stripped.startswith("+ ") or bool(re.match(r"^\d+\. ", stripped))
+            stripped.startswith("- ")
+            or stripped.startswith("* ")
+            or stripped.startswith("+ ")
+            or bool(ORDERED_ITEM_PATTERN.match(stripped))
         )
 
         # Check if line starts other block elements (not list items)
@@ -120,19 +146,8 @@ def markdown_to_plain(text: str) -> str:
     if not text:
         return text
 
-    # **bold** or __bold__ -> *bold*
-    text = re.sub(r"\*\*(.+?)\*\*", r"*\1*", text)
-    text = re.sub(r"__(.+?)__", r"*\1*", text)
-
-    # [text](url) -> text <url>
-    text = re.sub(r"\[([^\]]+)\]\(([^)]+)\)", r"\1 <\2>", text)
-
-    # ~~strike~~ -> plain (accessibility: screen readers would say "tilde tilde")
-    text = re.sub(r"~~(.+?)~~", r"\1", text)
-
-    # ==highlight== -> plain (accessibility: screen readers would say "equals equals")
-    text = re.sub(r"==(.+?)==", r"\1", text)
-
+    for pattern, replacement in PLAIN_REWRITES:
+        text = pattern.sub(replacement, text)
     return text
 
 
@@ -158,7 +173,7 @@ def convert_body(body: str, format_type: str = "markdown") -> tuple[str | None,
 
     if format_type == "markdown":
         preprocessed = preprocess_markdown(body)
-        html_body = markdown.markdown(preprocessed, extensions=MARKDOWN_EXTENSIONS, extension_configs=MARKDOWN_EXTENSION_CONFIGS)
+        html_body = _markdown().convert(preprocessed)
         html_body = autolink_urls(html_body)
         plain_body = markdown_to_plain(body)
         return html_body, plain_body
@@ -0,0 +1,273 @@
+"""Opt-in local full-text index for repeat searches.
+
+Server-side BODY search scans every message on servers without their own
+full-text index. SearchIndex keeps subjects, addresses and decoded text
+bodies in an SQLite FTS5 table (trigram tokenizer, so matching is
+case-insensitive substring like IMAP SEARCH), keyed by (account, folder,
+UIDVALIDITY, UID).
+
+Coverage is tracked per folder as the UIDNEXT up to which every message has
+been indexed. search_messages uses the index only when that equals the
+folder's current UIDNEXT under the same UIDVALIDITY; otherwise it searches
+on the server and starts a background crawler (imap_client.index_folder).
+IMAP messages never change under a UID, so indexed rows are never updated;
+expunged messages are filtered out by the UID SEARCH that verifies hits.
+
+Enable with IMAP_STREAM_SEARCH_INDEX=1. Stored next to the summary cache.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+from summary_cache import cache_dir
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+INDEX_FILENAME = "search.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folder_index (
+    account TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    indexed_uidnext INTEGER NOT NULL,
+    PRIMARY KEY (account, folder)
+);
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    account TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    uid INTEGER NOT NULL,
+    UNIQUE (account, folder, uidvalidity, uid)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(subject, sender, recipients, body, tokenize='trigram');
+"""
+
+
+class IndexState(NamedTuple):
+    """Folder coverage: every UID below indexed_uidnext is indexed."""
+
+    uidvalidity: int
+    indexed_uidnext: int
+
+
+_indexes: dict[Path, "SearchIndex"] = {}
+_indexes_lock = threading.Lock()
+_crawlers: dict[tuple[str | None, str], threading.Thread] = {}
+_crawlers_lock = threading.Lock()
+
+
+def get_search_index() -> "SearchIndex | None":
+    """Get the shared SearchIndex for the configured location.
+
+    Returns:
+        SearchIndex, or None when not enabled or the index cannot be opened
+    """
+    if os.environ.get("IMAP_STREAM_SEARCH_INDEX", "0") != "1":
+        return None
+
+    path = cache_dir() / INDEX_FILENAME
+    with _indexes_lock:
+        if path not in _indexes:
+            try:
+                _indexes[path] = SearchIndex(path)
+            except (OSError, sqlite3.Error) as e:
+                logger.debug("Search index disabled, cannot open %s: %s", path, e)
+                return None
+        return _indexes[path]
+
+
+def start_crawler(account: str | None, folder: str) -> threading.Thread | None:
+    """Index a folder in a background thread unless one is already running.
+
+    Args:
+        account: Account name
+        folder: Folder path
+
+    Returns:
+        The new thread, or None if a crawler for the folder is still running
+    """
+    key = (account, folder)
+    with _crawlers_lock:
+        running = _crawlers.get(key)
+        if running is not None and running.is_alive():
+            return None
+        thread = threading.Thread(target=_crawl, args=(account, folder), name=f"index-{account}-{folder}", daemon=True)
+        _crawlers[key] = thread
+        thread.start()
+        return thread
+
+
+def _crawl(account: str | None, folder: str):
+    """Crawler thread body; errors only stop the crawl."""
+    from imap_client import index_folder
+
+    try:
+        index_folder(folder, account=account)
+    except Exception as e:
+        logger.debug("Indexing %s/%s stopped: %s", account, folder, e)
+
+
+class SearchIndex:
+    """SQLite FTS5 index of message text with per-folder coverage.
+
+    Reads and writes swallow sqlite errors: a broken index behaves like one
+    that covers nothing, so searches go to the server.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        try:
+            os.chmod(path, 0o600)  # Message bodies are private
+        except OSError:
+            pass
+        self._db.execute("PRAGMA journal_mode=WAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._db.executescript("DROP TABLE IF EXISTS folder_index; DROP TABLE IF EXISTS docs; DROP TABLE IF EXISTS docs_fts;")
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.executescript(_SCHEMA)
+
+    def state(self, account: str | None, folder: str) -> IndexState | None:
+        """Return the folder's coverage, or None if it was never indexed."""
+        account = account or ""
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT uidvalidity, indexed_uidnext FROM folder_index WHERE account = ? AND folder = ?", (account, folder)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug("Search index state failed for %s: %s", folder, e)
+            return None
+        return IndexState(*row) if row else None
+
+    def covers(self, account: str | None, folder: str, uidvalidity: int | None, uidnext: int | None) -> bool:
+        """Whether every message below uidnext is indexed under uidvalidity."""
+        state = self.state(account, folder)
+        return state is not None and uidnext is not None and state == (uidvalidity, uidnext)
+
+    def reset(self, account: str | None, folder: str, uidvalidity: int):
+        """Drop a folder's documents and restart its coverage under uidvalidity."""
+        account = account or ""
+        try:
+            with self._lock, self._db:
+                self._db.execute("BEGIN")
+                self._db.execute(
+                    "DELETE FROM docs_fts WHERE rowid IN (SELECT id FROM docs WHERE account = ? AND folder = ?)", (account, folder)
+                )
+                self._db.execute("DELETE FROM docs WHERE account = ? AND folder = ?", (account, folder))
+                self._db.execute("INSERT OR REPLACE INTO folder_index VALUES (?, ?, ?, ?)", (account, folder, uidvalidity, 1))
+        except sqlite3.Error as e:
+            logger.debug("Search index reset failed for %s: %s", folder, e)
+
+    def add(self, account: str | None, folder: str, uidvalidity: int, docs: list[dict]):
+        """Index messages. UIDs already indexed are skipped.
+
+        Args:
+            account: Account name
+            folder: Folder path
+            uidvalidity: UIDVALIDITY the UIDs belong to
+            docs: Dicts with id, subject, sender, recipients, body
+        """
+        account = account or ""
+        try:
+            with self._lock, self._db:
+                self._db.execute("BEGIN")
+                for doc in docs:
+                    cursor = self._db.execute(
+                        "INSERT OR IGNORE INTO docs (account, folder, uidvalidity, uid) VALUES (?, ?, ?, ?)",
+                        (account, folder, uidvalidity, doc["id"]),
+                    )
+                    if cursor.rowcount:
+                        self._db.execute(
+                            "INSERT INTO docs_fts (rowid, subject, sender, recipients, body) VALUES (?, ?, ?, ?, ?)",
+                            (
+                                cursor.lastrowid,
+                                doc.get("subject", ""),
+                                doc.get("sender", ""),
+                                doc.get("recipients", ""),
+                                doc.get("body", ""),
+                            ),
+                        )
+        except sqlite3.Error as e:
+            logger.debug("Search index add failed for %s: %s", folder, e)
+
+    def advance(self, account: str | None, folder: str, uidvalidity: int, indexed_uidnext: int):
+        """Record that every UID below indexed_uidnext is indexed.
+
+        Ignored if the folder was reset to another UIDVALIDITY meanwhile;
+        coverage never moves backwards.
+        """
+        account = account or ""
+        try:
+            with self._lock:
+                self._db.execute(
+                    "UPDATE folder_index SET indexed_uidnext = MAX(indexed_uidnext, ?) WHERE account = ? AND folder = ? AND uidvalidity = ?",
+                    (indexed_uidnext, account, folder, uidvalidity),
+                )
+        except sqlite3.Error as e:
+            logger.debug("Search index advance failed for %s: %s", folder, e)
+
+    def search(self, account: str | None, folder: str, uidvalidity: int, expression: str) -> list[int] | None:
+        """Match an FTS5 expression within a folder.
+
+        Args:
+            account: Account name
+            folder: Folder path
+            uidvalidity: Current UIDVALIDITY
+            expression: FTS5 query from search_query.plan_query
+
+        Returns:
+            Matching UIDs ascending, or None if the query failed
+        """
+        account = account or ""
+        try:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT d.uid FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid"
+                    " WHERE docs_fts MATCH ? AND d.account = ? AND d.folder = ? AND d.uidvalidity = ? ORDER BY d.uid",
+                    (expression, account, folder, uidvalidity),
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.debug("Search index query failed for %s: %s", folder, e)
+            return None
+        return [row[0] for row in rows]
+
+    def indexed_uids(self, account: str | None, folder: str, uidvalidity: int, uids: list[int]) -> set[int]:
+        """Return which of uids are already indexed."""
+        account = account or ""
+        if not uids:
+            return set()
+        try:
+            with self._lock:
+                rows = self._db.execute(
+                    f"SELECT uid FROM docs WHERE account = ? AND folder = ? AND uidvalidity = ? AND uid IN ({','.join('?' * len(uids))})",
+                    (account, folder, uidvalidity, *uids),
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.debug("Search index lookup failed for %s: %s", folder, e)
+            return set()
+        return {row[0] for row in rows}
+
+    def clear(self):
+        """Remove all indexed data."""
+        try:
+            with self._lock:
+                self._db.execute("DELETE FROM folder_index")
+                self._db.execute("DELETE FROM docs")
+                self._db.execute("DELETE FROM docs_fts")
+        except sqlite3.Error as e:
+            logger.debug("Search index clear failed: %s", e)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,332 @@
+"""Search query compiler.
+
+Turns a Gmail-like query string into one imapclient SEARCH criteria list:
+- Implicit AND between terms, explicit OR and NOT (or a leading -)
+- Parentheses for grouping, double quotes for phrases
+- key:value terms (from:, to:, cc:, subject:, body:, since:, before:, on:)
+- size>N / size<N (k/M/G suffixes), has:attachment, flags (is:unread, seen:no, ...)
+
+A bare flag word (unread, read, flagged, ...) is a flag only when it is the
+whole query; inside a longer query it is searched as text, so "please read
+this" does not turn into a SEEN filter.
+
+Within each AND group the cheap keys (flags, then dates and sizes, then
+headers) are emitted before BODY/TEXT scans, so servers that evaluate
+left to right narrow the candidate set before reading message bodies.
+
+plan_query() additionally splits off the text terms that the local search
+index (search_index.py) can answer as an FTS5 expression.
+"""
+
+import re
+from datetime import date, datetime
+
+# key:value prefixes -> IMAP search key
+_TEXT_KEYS = {
+    "from": "FROM",
+    "to": "TO",
+    "cc": "CC",
+    "bcc": "BCC",
+    "subject": "SUBJECT",
+    "body": "BODY",
+    "text": "TEXT",
+}
+_DATE_KEYS = {"since": "SINCE", "before": "BEFORE", "on": "ON"}
+
+# Text keys -> local index columns (None: any column)
+_FTS_COLUMNS = {
+    "FROM": "sender",
+    "TO": "recipients",
+    "CC": "recipients",
+    "BCC": "recipients",
+    "SUBJECT": "subject",
+    "BODY": "body",
+    "TEXT": None,
+}
+FTS_MIN_CHARS = 3  # Trigram index cannot match shorter substrings
+
+# Evaluation cost tiers used to order AND terms (lower runs first)
+COST_FLAG = 0
+COST_DATE = 1  # dates and sizes: internal metadata, no message parsing
+COST_HEADER = 2
+COST_BODY = 3
+
+_SIZE_RE = re.compile(r"size([<>])(\d+)([kmg]?)b?", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+_OPERATORS = {"AND", "OR", "NOT"}
+
+# has:attachment has no IMAP SEARCH key; multipart/mixed is the server-side approximation
+_ATTACHMENT_CRITERIA = ["HEADER", "Content-Type", "multipart/mixed"]
+
+
+class _Term:
+    """Compiled query node.
+
+    Holds the criteria items, number of search keys and cost tier, plus the
+    equivalent FTS5 expression when the node is answerable by the local index.
+    For a NOT node, fts is the expression being negated.
+    """
+
+    __slots__ = ("items", "keys", "cost", "fts", "negated", "operands")
+
+    def __init__(self, items: list, keys: int, cost: int, fts: str | None = None, negated: bool = False, operands: list | None = None):
+        self.items = items
+        self.keys = keys
+        self.cost = cost
+        self.fts = fts
+        self.negated = negated
+        self.operands = operands
+
+    def as_key(self) -> list:
+        """Items forming exactly one search key (parenthesized if needed)."""
+        return self.items if self.keys == 1 else [self.items]
+
+
+def tokenize(query: str) -> list[tuple[str, bool]]:
+    """Split a query into (token, quoted) pairs.
+
+    Parentheses are separate tokens. A quoted section extends the word it is
+    attached to, so `subject:"weekly report"` is one token. A key followed
+    by whitespace (`from: alice`) is joined with the next word.
+
+    Raises:
+        ValueError: On an unterminated quote
+    """
+    tokens: list[tuple[str, bool]] = []
+    i = 0
+    length = len(query)
+    while i < length:
+        char = query[i]
+        if char.isspace():
+            i += 1
+            continue
+        if char in "()":
+            tokens.append((char, False))
+            i += 1
+            continue
+
+        if char == "-" and i + 1 < length and not query[i + 1].isspace():
+            tokens.append(("NOT", False))  # -term is shorthand for NOT term
+            i += 1
+            continue
+
+        word = []
+        quoted = False
+        while i < length and not query[i].isspace() and query[i] not in "()":
+            if query[i] == '"':
+                end = query.find('"', i + 1)
+                if end == -1:
+                    raise ValueError("Unterminated quote")
+                word.append(query[i + 1 : end])
+                quoted = True
+                i = end + 1
+            else:
+                word.append(query[i])
+                i += 1
+        token = "".join(word)
+
+        key = token[:-1].lower()
+        if not quoted and token.endswith(":") and (key in _TEXT_KEYS or key in _DATE_KEYS):
+            rest = tokenize(query[i:])
+            if rest and rest[0][0] not in "()":
+                next_token, next_quoted = rest[0]
+                return [*tokens, (token + next_token, next_quoted), *rest[1:]]
+        tokens.append((token, quoted))
+    return tokens
+
+
+def _parse_date(key: str, value: str) -> date:
+    """Parse YYYY-MM-DD (or IMAP DD-Mon-YYYY) for a date key."""
+    for fmt in ("%Y-%m-%d", "%d-%b-%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date for {key}: '{value}' (use YYYY-MM-DD)")
+
+
+def _fts_phrase(column: str | None, value: str) -> str | None:
+    """FTS5 phrase query for a substring, restricted to column."""
+    if len(value.strip()) < FTS_MIN_CHARS:
+        return None
+    phrase = '"' + value.replace('"', '""') + '"'
+    return f"{column} : {phrase}" if column else phrase
+
+
+def _fts_and(terms: list[_Term]) -> str | None:
+    """Combine local terms into one FTS5 AND/NOT expression (needs a positive term)."""
+    positives = [term.fts for term in terms if not term.negated]
+    if not positives or any(term.fts is None for term in terms):
+        return None
+    expr = " AND ".join(f"({fts})" for fts in positives)
+    for term in terms:
+        if term.negated:
+            expr = f"({expr}) NOT ({term.fts})"
+    return expr
+
+
+def _compile_word(token: str, quoted: bool, bare_flags: bool = False) -> _Term:
+    """Compile a single word or key:value token.
+
+    Flag words without a key (``read``) are flags only when bare_flags is set.
+    """
+    from imap_client import parse_flag_query
+
+    if not quoted:
+        flag = parse_flag_query(token) if ":" in token or bare_flags else None
+        if flag:
+            return _Term([flag], 1, COST_FLAG)
+        size = _SIZE_RE.fullmatch(token)
+        if size:
+            op, number, unit = size.groups()
+            return _Term(["LARGER" if op == ">" else "SMALLER", int(number) * _SIZE_UNITS[unit.lower()]], 1, COST_DATE)
+        if token.lower() == "has:attachment":
+            return _Term(list(_ATTACHMENT_CRITERIA), 1, COST_HEADER)
+
+    key, sep, value = token.partition(":")
+    key = key.lower()
+    if sep and (key in _TEXT_KEYS or key in _DATE_KEYS):
+        if not value:
+            raise ValueError(f"Missing value for {key}:")
+        if key in _DATE_KEYS:
+            return _Term([_DATE_KEYS[key], _parse_date(key, value)], 1, COST_DATE)
+        cost = COST_BODY if key in ("body", "text") else COST_HEADER
+        imap_key = _TEXT_KEYS[key]
+        return _Term([imap_key, value], 1, cost, fts=_fts_phrase(_FTS_COLUMNS[imap_key], value))
+
+    return _Term(["OR", "SUBJECT", token, "BODY", token], 1, COST_BODY, fts=_fts_phrase("{subject body}", token))
+
+
+class _Parser:
+    """Recursive-descent parser over tokens.
+
+    Grammar:
+        or_expr  := and_expr ("OR" and_expr)*
+        and_expr := unary ("AND"? unary)*
+        unary    := "NOT" unary | "(" or_expr ")" | word
+
+    A leading - is tokenized as NOT.
+    """
+
+    def __init__(self, tokens: list[tuple[str, bool]]):
+        self.tokens = tokens
+        self.pos = 0
+        self.bare_flags = len(tokens) == 1  # "unread" alone is a flag, "please read this" is text
+
+    def _peek(self) -> tuple[str, bool] | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _is_operator(self, name: str) -> bool:
+        token = self._peek()
+        return token is not None and not token[1] and token[0] == name
+
+    def parse(self) -> _Term:
+        term = self._or_expr()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected '{self._peek()[0]}'")
+        return term
+
+    def _or_expr(self) -> _Term:
+        operands = [self._and_expr()]
+        while self._is_operator("OR"):
+            self.pos += 1
+            operands.append(self._and_expr())
+        if len(operands) == 1:
+            return operands[0]
+        # OR is binary in IMAP: a OR b OR c -> OR a (OR b c)
+        result = operands[-1]
+        for operand in reversed(operands[:-1]):
+            fts = None
+            if operand.fts and result.fts and not operand.negated and not result.negated:
+                fts = f"({operand.fts}) OR ({result.fts})"
+            result = _Term(["OR", *operand.as_key(), *result.as_key()], 1, max(operand.cost, result.cost), fts=fts)
+        return result
+
+    def _and_expr(self) -> _Term:
+        operands = []
+        while True:
+            if self._is_operator("AND"):
+                self.pos += 1
+                continue
+            token = self._peek()
+            if token is None or (not token[1] and token[0] in (")", "OR")):
+                break
+            operands.append(self._unary())
+        if not operands:
+            raise ValueError("Expected a search term")
+        if len(operands) == 1:
+            return operands[0]
+        operands.sort(key=lambda term: term.cost)  # stable: keeps user order within a tier
+        items = [item for term in operands for item in term.items]
+        return _Term(items, sum(term.keys for term in operands), operands[-1].cost, fts=_fts_and(operands), operands=operands)
+
+    def _unary(self) -> _Term:
+        token, quoted = self._peek()
+        if not quoted and token == "NOT":
+            self.pos += 1
+            if self._peek() is None:
+                raise ValueError("NOT needs a search term")
+            operand = self._unary()
+            fts = None if operand.negated else operand.fts
+            return _Term(["NOT", *operand.as_key()], 1, operand.cost, fts=fts, negated=fts is not None)
+        if not quoted and token == "(":
+            self.pos += 1
+            term = self._or_expr()
+            if not self._is_operator(")"):
+                raise ValueError("Missing ')'")
+            self.pos += 1
+            return term
+        if not quoted and token in (")", *_OPERATORS):
+            raise ValueError(f"Unexpected '{token}'")
+        self.pos += 1
+        return _compile_word(token, quoted, self.bare_flags)
+
+
+def compile_query(query: str) -> list:
+    """Compile a search query into imapclient SEARCH criteria.
+
+    Args:
+        query: Query string, e.g. 'from:alice since:2026-01-01 is:unread (invoice OR receipt)'
+
+    Returns:
+        Criteria list for IMAPClient.search (nested lists are parenthesized groups)
+
+    Raises:
+        ValueError: If the query is empty or malformed
+    """
+    return _parse(query).items
+
+
+def plan_query(query: str) -> tuple[str | None, list]:
+    """Split a query into a local index part and server criteria.
+
+    Top-level AND terms made only of text keys become one FTS5 expression;
+    flag, date and size terms (and text terms the index cannot answer)
+    remain as IMAP criteria to be checked by the server.
+
+    Args:
+        query: Query string
+
+    Returns:
+        Tuple of (FTS5 expression or None, remaining criteria). With no
+        usable text terms the expression is None and the criteria are
+        those of compile_query().
+
+    Raises:
+        ValueError: If the query is empty or malformed
+    """
+    root = _parse(query)
+    operands = root.operands or [root]
+    local = [term for term in operands if term.fts is not None]
+    expr = _fts_and(local)
+    if expr is None:
+        return None, root.items
+    return expr, [item for term in operands if term.fts is None for item in term.items]
+
+
+def _parse(query: str) -> _Term:
+    """Tokenize and parse a query into its root node."""
+    tokens = tokenize(query)
+    if not tokens:
+        raise ValueError("Empty search query")
+    return _Parser(tokens).parse()
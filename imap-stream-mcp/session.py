@@ -1,18 +1,68 @@
 """IMAP session management with caching.
 
-Provides AccountSession for connection keepalive and folder/message caching.
+Provides AccountSession for pooled connections and folder/message caching.
 """
 
+import email
+import email.message
 import threading
 import time
+from collections import OrderedDict
+from collections.abc import Callable
 from contextlib import contextmanager
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING
 
-from bodystructure import count_attachments, extract_snippet, find_html_part, find_text_part, get_body_peek
+from bodystructure import count_attachments, fetch_snippets
 from imapclient import IMAPClient
-from imapclient.exceptions import IMAPClientError
-
-CONNECTION_IDLE_TIMEOUT = 300  # 5 minutes
+from imapclient.exceptions import IMAPClientAbortError, IMAPClientError
+from summary_cache import SummaryCache, get_summary_cache
+
+if TYPE_CHECKING:
+    from idle_watcher import IdleWatcher
+
+CONNECTION_IDLE_TIMEOUT = 300  # 5 minutes, idle pooled connections are reaped after this
+POOL_SIZE = 3  # Authenticated connections per account
+POOL_WAIT_TIMEOUT = 60  # Seconds to wait for a free pooled connection
+HEALTH_CHECK = True  # NOOP before reusing a connection idle longer than LIVENESS_WINDOW
+LIVENESS_WINDOW = 30  # Seconds a recently used connection is trusted without NOOP
+CACHE_WINDOW_MAX = 500  # Messages a cached list may grow to when paging with before_uid
+PARSED_CACHE_BYTES = 64 * 1024 * 1024  # Byte budget of the per-account parsed-message LRU
+PARSED_CACHE_ENTRY_MAX = 16 * 1024 * 1024  # Messages larger than this are fetched but not cached
+UNCACHED_FETCH_ITEMS = frozenset({b"FLAGS"})  # Other clients change these; always fetched live
+FOLDER_ROLES_TTL = 3600  # Seconds a resolved special-folder role map is trusted
+
+# RFC 6154 SPECIAL-USE attributes -> folder role
+SPECIAL_USE_ROLES = {"\\drafts": "drafts", "\\sent": "sent", "\\trash": "trash", "\\junk": "junk", "\\archive": "archive"}
+# Common (and localized) names for servers that mark no folder with the role
+_ROLE_NAMES = {
+    "drafts": ("drafts", "draft", "luonnokset"),
+    "sent": ("sent", "sent items", "sent messages", "lähetetyt"),
+    "trash": ("trash", "deleted items", "deleted messages", "roskakori"),
+    "junk": ("junk", "spam", "junk e-mail", "roskaposti"),
+    "archive": ("archive", "arkisto"),
+}
+
+# Errors meaning the socket is gone, as opposed to a NO/BAD reply on a live connection
+_DEAD_SOCKET_ERRORS = (OSError, IMAPClientAbortError)
+
+# Commands safe to send twice: a replay after the server already ran one of
+# these cannot duplicate a draft or apply a STORE/MOVE/EXPUNGE again
+REPLAYABLE_METHODS = frozenset(
+    {
+        "noop",
+        "capabilities",
+        "has_capability",
+        "select_folder",
+        "search",
+        "fetch",
+        "list_folders",
+        "list_sub_folders",
+        "folder_status",
+        "folder_exists",
+        "namespace",
+    }
+)
 
 _sessions: dict[str, "AccountSession"] = {}
 _sessions_lock = threading.Lock()
@@ -39,7 +89,10 @@ def get_session(account: str | None = None) -> "AccountSession":
 
     with _sessions_lock:
         if account not in _sessions:
-            _sessions[account] = AccountSession(account)
+            from idle_watcher import start_watcher
+
+            session = _sessions[account] = AccountSession(account, summary_cache=get_summary_cache())
+            session.watcher = start_watcher(session)
         return _sessions[account]
 
 
@@ -57,6 +110,9 @@ def invalidate_message_cache(account: str, folder: str):
     if session:
         with session.lock:
             session.message_cache.pop(folder, None)
+            session.parsed_messages.drop_folder(folder)
+        if session.summary_cache:
+            session.summary_cache.invalidate(account, folder)
 
 
 def update_cached_flags(account: str, folder: str, message_id: int, new_flags: list[str]):
@@ -75,6 +131,9 @@ def update_cached_flags(account: str, folder: str, message_id: int, new_flags: l
     if not session:
         return
 
+    if session.summary_cache:
+        session.summary_cache.update_flags(account, folder, message_id, new_flags)
+
     with session.lock:
         cache = session.message_cache.get(folder)
         if not cache:
@@ -86,16 +145,71 @@ def update_cached_flags(account: str, folder: str, message_id: int, new_flags: l
                 break
 
 
+def remove_cached_messages(account: str, folder: str, message_ids: list[int]):
+    """Drop messages that left a folder (moved or expunged by us) from its caches.
+
+    The cached list stays valid: EXISTS shrinks by the removed count, so the
+    next SELECT matches without a refetch. The target folder needs no update,
+    its new messages arrive through the UIDNEXT delta on the next list.
+
+    Args:
+        account: Account name
+        folder: Folder the messages were removed from
+        message_ids: Removed message IDs
+    """
+    with _sessions_lock:
+        session = _sessions.get(account)
+    if not session:
+        return
+
+    removed = set(message_ids)
+    with session.lock:
+        for uid in removed:
+            session.parsed_messages.drop_message(folder, uid)
+        cache = session.message_cache.get(folder)
+        if not cache:
+            return
+        session.message_cache[folder] = cache = MessageListCache(
+            messages=[msg for msg in cache.messages if msg.get("id") not in removed],
+            uidvalidity=cache.uidvalidity,
+            uidnext=cache.uidnext,
+            exists=max(0, cache.exists - len(removed)),
+            highestmodseq=cache.highestmodseq,
+        )
+    if session.summary_cache:
+        session.summary_cache.store(account, folder, cache.uidvalidity, cache.uidnext, cache.exists, cache.messages, cache.highestmodseq)
+
+
 def _create_connection(account: str) -> IMAPClient:
     """Create new IMAP connection for account."""
-    from imap_client import get_credentials
+    from imap_client import get_credentials, invalidate_credentials
 
     server, port, username, password = get_credentials(account)
     client = IMAPClient(server, port=int(port), ssl=True, timeout=30)
-    client.login(username, password)
+    try:
+        client.login(username, password)
+    except IMAPClientError:
+        invalidate_credentials()  # Password may have changed in the keychain
+        raise
+    _enable_resync(client)
     return client
 
 
+def _enable_resync(client: IMAPClient):
+    """ENABLE QRESYNC (or plain CONDSTORE) so SELECT reports HIGHESTMODSEQ.
+
+    QRESYNC implies CONDSTORE. Servers without either are left untouched.
+    """
+    for extension in ("QRESYNC", "CONDSTORE"):
+        if not client.has_capability(extension):
+            continue
+        try:
+            client.enable(extension)
+            return
+        except IMAPClientError:
+            continue
+
+
 @dataclass
 class FolderCache:
     """Cached folder listing."""
@@ -104,72 +218,487 @@ class FolderCache:
     fetched_at: float
 
 
+@dataclass
+class FolderRoles:
+    """Special folder role map (drafts, sent, trash, junk, archive -> folder)."""
+
+    roles: dict[str, str]
+    fetched_at: float
+
+
 @dataclass
 class MessageListCache:
-    """Cached message list with validation metadata."""
+    """Cached message list with validation metadata.
+
+    Coverage window: messages holds the newest len(messages) messages of the folder.
+    """
 
     messages: list[dict]
     uidvalidity: int
     uidnext: int
     exists: int
+    highestmodseq: int | None = None  # Set on CONDSTORE servers
+
+    def covers(self, count: int) -> bool:
+        """Whether the list holds the newest `count` messages (or the whole folder)."""
+        return len(self.messages) >= count or (self.exists is not None and len(self.messages) >= self.exists)
+
+
+@dataclass
+class CachedMessage:
+    """FETCH response items of one message, plus its parsed form once built."""
+
+    items: dict[bytes, object]
+    size: int = 0
+    parsed: email.message.Message | None = None
+    texts: dict[str, str] = field(default_factory=dict)  # Derived text, such as HTML converted per mode
+
+
+class ParsedMessageCache:
+    """Byte-bounded LRU of fetched messages, keyed by (folder, UIDVALIDITY, UID).
+
+    The owning AccountSession supplies the account. Message content never
+    changes for a UID within one UIDVALIDITY; FLAGS do, also by other clients,
+    so they are never stored (UNCACHED_FETCH_ITEMS). Expunges made here go
+    through invalidate_message_cache, which drops the folder. Caller holds
+    the session lock.
+    """
+
+    def __init__(self, max_bytes: int = PARSED_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[tuple, CachedMessage] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> CachedMessage | None:
+        """Get entry and mark it most recently used."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, items: dict, parsed: email.message.Message | None = None) -> CachedMessage:
+        """Merge FETCH items into the entry for key and evict down to max_bytes.
+
+        Returns:
+            The merged entry; not retained when it exceeds PARSED_CACHE_ENTRY_MAX
+        """
+        entry = self._entries.pop(key, None) or CachedMessage({})
+        self.size -= entry.size
+        entry.items.update(items)
+        entry.parsed = parsed or entry.parsed
+        entry.size = _entry_size(entry)
+        if entry.size > min(self.max_bytes, PARSED_CACHE_ENTRY_MAX):
+            return entry
+        self._entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+        return entry
+
+    def put_text(self, key: tuple, name: str, text: str):
+        """Attach derived text to a retained entry and evict down to max_bytes."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        self.size -= entry.size
+        entry.texts[name] = text
+        entry.size = _entry_size(entry)
+        self.size += entry.size
+        self._entries.move_to_end(key)
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+
+    def drop_folder(self, folder: str):
+        """Forget every message of folder."""
+        for key in [k for k in self._entries if k[0] == folder]:
+            self.size -= self._entries.pop(key).size
+
+    def drop_message(self, folder: str, uid: int):
+        """Forget one message of folder, under any UIDVALIDITY."""
+        for key in [k for k in self._entries if k[0] == folder and k[2] == uid]:
+            self.size -= self._entries.pop(key).size
+
+
+def _entry_size(entry: CachedMessage) -> int:
+    """Approximate memory held by an entry: payload bytes, doubled once parsed, plus derived text."""
+    size = 256 + sum(len(v) for v in entry.items.values() if isinstance(v, bytes))
+    size += sum(len(text) for text in entry.texts.values())
+    if entry.parsed is not None:
+        size += len(entry.items.get(b"RFC822", b""))
+    return size
+
+
+def _response_key(item: str) -> bytes:
+    """FETCH response key for a requested item (BODY.PEEK[1] answers as BODY[1])."""
+    return item.upper().replace("BODY.PEEK[", "BODY[").encode()
+
+
+@dataclass
+class RoundTripStats:
+    """Round-trip accounting for an account's connections.
+
+    NOOPs and SELECTs that were skipped are the saved round-trips; min_rtt
+    (fastest command seen) estimates what each one would have cost.
+    """
+
+    commands: int = 0
+    noops: int = 0
+    noops_skipped: int = 0
+    selects_skipped: int = 0
+    reconnects: int = 0
+    replays: int = 0
+    fetches_cached: int = 0
+    lists_from_idle: int = 0  # Lists of IDLE-watched folders answered without a SELECT
+    min_rtt: float | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, duration: float):
+        """Record one completed command."""
+        with self.lock:
+            self.commands += 1
+            if self.min_rtt is None or duration < self.min_rtt:
+                self.min_rtt = duration
+
+    def count(self, name: str):
+        """Increment a counter field by name."""
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @property
+    def saved_round_trips(self) -> int:
+        """Round-trips avoided by liveness trust, folder routing and the message cache."""
+        return self.noops_skipped + self.selects_skipped + self.fetches_cached + self.lists_from_idle
+
+    def summary(self) -> dict:
+        """Return counters with saved round-trips and estimated saved time."""
+        with self.lock:
+            return {
+                "commands": self.commands,
+                "noops": self.noops,
+                "noops_skipped": self.noops_skipped,
+                "selects_skipped": self.selects_skipped,
+                "reconnects": self.reconnects,
+                "replays": self.replays,
+                "fetches_cached": self.fetches_cached,
+                "lists_from_idle": self.lists_from_idle,
+                "saved_round_trips": self.saved_round_trips,
+                "min_rtt_ms": round(self.min_rtt * 1000, 1) if self.min_rtt is not None else None,
+                "saved_ms_estimate": round(self.saved_round_trips * self.min_rtt * 1000, 1) if self.min_rtt is not None else None,
+            }
+
+
+@dataclass
+class PooledConnection:
+    """Authenticated connection that remembers its selected folder."""
+
+    client: IMAPClient | None = None
+    selected_folder: str | None = None
+    readonly: bool = True
+    last_activity: float = 0.0
+    in_use: bool = False
+    verified: bool = False  # A command succeeded during this checkout, so the socket is alive
+    trusted: bool = False  # Used within the liveness window before this checkout
+    account: str = ""
+    stats: RoundTripStats = field(default_factory=RoundTripStats)
+    uidvalidities: dict[str, int] = field(default_factory=dict)  # Shared with the session, last SELECT per folder
+
+    def call(self, method: str, *args, **kwargs):
+        """Run an IMAPClient method, replaying it once if the socket was dead.
+
+        A connection trusted without NOOP may have been dropped by the server.
+        When the first command of a checkout fails with a socket error, the
+        connection is re-established, the folder re-selected and the command
+        sent again. Only REPLAYABLE_METHODS are sent again: the server may have
+        run the command before the socket died. Other commands (APPEND, STORE,
+        MOVE, EXPUNGE) go out directly on a trusted connection, where a dead
+        socket surfaces as their error. On a connection neither trusted nor
+        verified (health check disabled) they are preceded by a NOOP, which
+        recovers a dead socket before they are sent. Their own socket errors,
+        and any failure after a successful command, are raised as-is.
+
+        Args:
+            method: IMAPClient method name
+            *args: Positional arguments for the method.
+            **kwargs: Keyword arguments for the method.
+
+        Returns:
+            Method return value
+        """
+        if method not in REPLAYABLE_METHODS and not (self.verified or self.trusted):
+            self.call("noop")
+        try:
+            return self._timed(method, *args, **kwargs)
+        except _DEAD_SOCKET_ERRORS as e:
+            if self.verified or isinstance(e, TimeoutError) or method not in REPLAYABLE_METHODS:
+                raise
+        self._reconnect()
+        self.stats.count("replays")
+        return self._timed(method, *args, **kwargs)
+
+    def _timed(self, method: str, *args, **kwargs):
+        """Run method on client and record its duration."""
+        started = time.monotonic()
+        result = getattr(self.client, method)(*args, **kwargs)
+        self.stats.record(time.monotonic() - started)
+        self.verified = True
+        self.last_activity = time.time()
+        return result
+
+    def _reconnect(self):
+        """Replace client with a fresh login, restoring the selected folder."""
+        folder, readonly = self.selected_folder, self.readonly
+        self.close()
+        self.client = _create_connection(self.account)
+        self.stats.count("reconnects")
+        if folder is not None:
+            self._note_uidvalidity(folder, self._timed("select_folder", folder, readonly=readonly))
+            self.selected_folder = folder
+            self.readonly = readonly
+
+    def select(self, folder: str, readonly: bool = True, force: bool = False) -> dict | None:
+        """Select folder unless it is already selected in the same mode.
+
+        Args:
+            folder: Folder path
+            readonly: Open with EXAMINE (True) or SELECT (False)
+            force: Always send SELECT, e.g. to get fresh UIDNEXT/EXISTS
+
+        Returns:
+            SELECT response, or None when the round-trip was skipped
+        """
+        if not force and self.selected_folder == folder and self.readonly == readonly:
+            self.stats.count("selects_skipped")
+            return None
+        self.selected_folder = None  # Unknown until SELECT succeeds
+        response = self.call("select_folder", folder, readonly=readonly)
+        self._note_uidvalidity(folder, response)
+        self.selected_folder = folder
+        self.readonly = readonly
+        return response
+
+    def _note_uidvalidity(self, folder: str, response):
+        """Remember UIDVALIDITY from a SELECT response."""
+        if isinstance(response, dict) and response.get(b"UIDVALIDITY") is not None:
+            self.uidvalidities[folder] = response[b"UIDVALIDITY"]
+
+    def close(self):
+        """Log out, ignoring errors."""
+        if self.client:
+            try:
+                self.client.logout()
+            except Exception:
+                pass
+        self.client = None
+        self.selected_folder = None
+
+
+class ReplayingClient:
+    """IMAPClient stand-in that sends every command through PooledConnection.call."""
+
+    def __init__(self, pooled: PooledConnection):
+        self._pooled = pooled
+
+    @property
+    def selected_folder(self) -> str | None:
+        """Folder selected on the pooled connection."""
+        return self._pooled.selected_folder
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._pooled.client, name)
+        if not callable(attr):
+            return attr
+
+        def command(*args, **kwargs):
+            return self._pooled.call(name, *args, **kwargs)
+
+        return command
 
 
 @dataclass
 class AccountSession:
-    """IMAP session with connection keepalive and caching."""
+    """IMAP session with a small connection pool and caching."""
 
     account: str
-    connection: IMAPClient | None = None
-    last_activity: float = 0.0
+    pool_size: int = POOL_SIZE
+    idle_timeout: float = CONNECTION_IDLE_TIMEOUT
+    health_check: bool = HEALTH_CHECK
+    liveness_window: float = LIVENESS_WINDOW
+    pool: list[PooledConnection] = field(default_factory=list)
+    stats: RoundTripStats = field(default_factory=RoundTripStats)
     folder_cache: FolderCache | None = None
+    folder_roles: FolderRoles | None = None  # Expires after FOLDER_ROLES_TTL
     message_cache: dict[str, MessageListCache] = field(default_factory=dict)
+    summary_cache: SummaryCache | None = None
+    parsed_messages: ParsedMessageCache = field(default_factory=ParsedMessageCache)
+    uidvalidities: dict[str, int] = field(default_factory=dict)  # UIDVALIDITY from the latest SELECT per folder
+    watcher: "IdleWatcher | None" = None  # Keeps watched folders' lists current (idle_watcher.py)
     lock: threading.RLock = field(default_factory=threading.RLock)
+    pool_available: threading.Condition = field(init=False, repr=False)
 
-    def get_connection(self) -> IMAPClient:
-        """Get or create IMAP connection."""
-        now = time.time()
+    def __post_init__(self):
+        self.pool_available = threading.Condition(self.lock)
 
-        if self.connection:
-            if now - self.last_activity > CONNECTION_IDLE_TIMEOUT:
-                self._close_connection()
-            else:
-                try:
-                    self.connection.noop()
-                except Exception:
-                    self._close_connection()
+    def _acquire(self, folder: str | None = None, readonly: bool = True) -> PooledConnection:
+        """Check out a connection, preferring one with folder already selected.
 
-        if not self.connection:
-            try:
-                self.connection = _create_connection(self.account)
-            except Exception:
-                self.connection = None
-                raise
+        Waits up to POOL_WAIT_TIMEOUT when all pool_size connections are busy.
+        A connection used within liveness_window is trusted without NOOP; a
+        dead socket is then caught by the replay in PooledConnection.call,
+        or raised by a mutating command.
 
-        self.last_activity = now
-        return self.connection
+        Args:
+            folder: Folder the caller will work in (routing hint)
+            readonly: Mode the caller will select folder in
 
-    def _close_connection(self):
-        """Close connection without clearing caches."""
-        if self.connection:
-            try:
-                self.connection.logout()
-            except Exception:
-                pass
-            self.connection = None
+        Returns:
+            PooledConnection marked in use, with a live client
+        """
+        deadline = time.time() + POOL_WAIT_TIMEOUT
+        with self.pool_available:
+            while True:
+                stale = self._take_stale()
+                idle = [c for c in self.pool if not c.in_use]
+                matching = [c for c in idle if folder is not None and c.selected_folder == folder and c.readonly == readonly]
+                if matching or idle:
+                    # Most recently used is most likely still trusted; older ones age out
+                    pooled = max(matching or idle, key=lambda c: c.last_activity)
+                    break
+                if len(self.pool) < self.pool_size:
+                    pooled = PooledConnection(account=self.account, stats=self.stats, uidvalidities=self.uidvalidities)
+                    self.pool.append(pooled)
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    from imap_client import IMAPError
+
+                    raise IMAPError(f"All {self.pool_size} connections for '{self.account}' are busy. Try again shortly.")
+                self.pool_available.wait(remaining)
+            pooled.in_use = True
+
+        for conn in stale:
+            conn.close()
+
+        pooled.verified = False
+        pooled.trusted = time.time() - pooled.last_activity <= self.liveness_window
+        try:
+            if pooled.client is not None:
+                if self.health_check and not pooled.trusted:
+                    self.stats.count("noops")
+                    try:
+                        pooled._timed("noop")
+                    except Exception:
+                        pooled.close()
+                else:
+                    self.stats.count("noops_skipped")
+            if pooled.client is None:
+                pooled.client = _create_connection(self.account)
+                pooled.verified = True  # Just logged in
+        except Exception:
+            self._release(pooled, broken=True)
+            raise
+
+        pooled.last_activity = time.time()
+        return pooled
+
+    def _take_stale(self) -> list[PooledConnection]:
+        """Remove idle connections unused for longer than idle_timeout.
+
+        Caller holds lock. Returned connections are closed outside the lock.
+        """
+        cutoff = time.time() - self.idle_timeout
+        stale = [c for c in self.pool if not c.in_use and c.last_activity < cutoff]
+        for conn in stale:
+            self.pool.remove(conn)
+        return stale
+
+    def _release(self, pooled: PooledConnection, broken: bool = False):
+        """Return connection to the pool, or drop it when broken."""
+        with self.pool_available:
+            pooled.in_use = False
+            if broken or pooled.client is None:
+                if pooled in self.pool:
+                    self.pool.remove(pooled)
+            else:
+                pooled.last_activity = time.time()
+            self.pool_available.notify()
+        if broken:
+            pooled.close()
+
+    def reap_idle(self) -> int:
+        """Close idle connections unused for longer than idle_timeout.
+
+        Returns:
+            Number of connections closed
+        """
+        with self.lock:
+            stale = self._take_stale()
+        for conn in stale:
+            conn.close()
+        return len(stale)
+
+    def close(self):
+        """Stop the IDLE watcher and close all idle connections. Caches are kept."""
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+        with self.lock:
+            idle = [c for c in self.pool if not c.in_use]
+            for conn in idle:
+                self.pool.remove(conn)
+        for conn in idle:
+            conn.close()
 
     @contextmanager
-    def connection_ctx(self):
-        """Context manager for IMAP operations.
+    def _pooled_ctx(self, folder: str | None = None, readonly: bool = True):
+        """Check out a PooledConnection for the duration of the block.
 
-        Yields connection for use. On error, closes connection but preserves caches.
+        On connection errors the connection is dropped from the pool; caches are kept.
         """
+        pooled = self._acquire(folder, readonly)
+        broken = False
         try:
-            conn = self.get_connection()
-            yield conn
-            self.last_activity = time.time()
+            yield pooled
         except (OSError, IMAPClientError, ConnectionError):
-            self._close_connection()
+            broken = True
             raise
+        finally:
+            self._release(pooled, broken)
+
+    @contextmanager
+    def connection_ctx(self, folder: str | None = None, readonly: bool = True):
+        """Context manager for IMAP operations.
+
+        Yields a pooled connection for exclusive use. When folder is given it is
+        selected first, skipping the SELECT if that connection already has it open.
+        Callers that pass folder must not select other folders on the client.
+        Without folder, the caller may select anything, so the remembered
+        selection is dropped afterwards.
+
+        Args:
+            folder: Folder to select before yielding
+            readonly: Select folder read-only (EXAMINE)
+
+        Raises:
+            IMAPError: If folder cannot be opened
+        """
+        with self._pooled_ctx(folder, readonly) as pooled:
+            if folder is not None:
+                try:
+                    pooled.select(folder, readonly=readonly)
+                except Exception as e:
+                    from imap_client import IMAPError
+
+                    raise IMAPError(f"Cannot open folder '{folder}': {e}") from e
+            try:
+                yield ReplayingClient(pooled)
+            finally:
+                if folder is None:
+                    pooled.selected_folder = None
 
     def get_folders(self) -> list[dict]:
         """Get folder list, using cache if available.
@@ -180,30 +709,237 @@ class AccountSession:
         if self.folder_cache:
             return self.folder_cache.folders
 
-        conn = self.get_connection()
-        folders = conn.list_folders()
+        with self._pooled_ctx() as pooled:
+            folders = pooled.call("list_folders")
 
-        self.folder_cache = FolderCache(
-            folders=[{"name": _to_str(name), "flags": [_to_str(f) for f in flags]} for flags, _, name in folders], fetched_at=time.time()
-        )
-        return self.folder_cache.folders
+        with self.lock:
+            self.folder_cache = FolderCache(
+                folders=[{"name": _to_str(name), "flags": [_to_str(f) for f in flags]} for flags, _, name in folders],
+                fetched_at=time.time(),
+            )
+            return self.folder_cache.folders
+
+    def get_folder_role(self, role: str) -> str | None:
+        """Resolve a special folder by role.
+
+        The role map is resolved once per FOLDER_ROLES_TTL from the special-use
+        flags (RFC 6154) of the cached folder list; roles no folder is flagged
+        for fall back to common names. Callers that find the folder gone
+        should call forget_folders().
 
-    def get_messages(self, folder: str, limit: int = 20, preview: bool = False) -> list[dict]:
+        Args:
+            role: One of drafts, sent, trash, junk, archive
+
+        Returns:
+            Folder name, or None if the account has no such folder
+        """
+        with self.lock:
+            cached = self.folder_roles
+        if cached is None or time.time() - cached.fetched_at >= FOLDER_ROLES_TTL:
+            cached = FolderRoles(roles=self._resolve_folder_roles(), fetched_at=time.time())
+            with self.lock:
+                self.folder_roles = cached
+        return cached.roles.get(role)
+
+    def _resolve_folder_roles(self) -> dict[str, str]:
+        """Build the role map from special-use flags, else folder names.
+
+        SPECIAL-USE servers return \\Drafts, \\Sent, ... in a plain LIST, so
+        get_folders() carries them; a listing older than FOLDER_ROLES_TTL is
+        fetched again first.
+        """
+        with self.lock:
+            if self.folder_cache and time.time() - self.folder_cache.fetched_at >= FOLDER_ROLES_TTL:
+                self.folder_cache = None
+        return _folder_roles(self.get_folders(), by_name=True)
+
+    def forget_folders(self):
+        """Drop the folder list and role map, e.g. after a folder was renamed; both are listed again next time."""
+        with self.lock:
+            self.folder_roles = self.folder_cache = None
+
+    def fetch_message(self, folder: str, uid: int, items: list[str], client=None, readonly: bool = True) -> dict | None:
+        """FETCH items of one message through the parsed-message LRU.
+
+        Items already cached for (folder, UIDVALIDITY, uid) cost no round-trip;
+        when everything is cached no connection is checked out either.
+        Partial fetches (``<offset.length>``) and UNCACHED_FETCH_ITEMS are
+        not cached: a FLAGS request always reaches the server, and a message
+        expunged by another client then reads as missing.
+
+        Args:
+            folder: Folder path
+            uid: Message UID
+            items: FETCH items, such as ``ENVELOPE`` or ``BODY.PEEK[1]``
+            client: Connection with folder selected; None checks one out on a miss
+            readonly: Select mode when a connection is checked out
+
+        Returns:
+            Response dict keyed like IMAPClient.fetch (b"ENVELOPE", b"BODY[1]"),
+            or None when the message does not exist
+        """
+        wanted = {item: _response_key(item) for item in items}
+        with self.lock:
+            uidvalidity = self.uidvalidities.get(folder)
+            entry = self.parsed_messages.get((folder, uidvalidity, uid)) if uidvalidity is not None else None
+            cached = dict(entry.items) if entry else {}
+        missing = [item for item, key in wanted.items() if key not in cached or key in UNCACHED_FETCH_ITEMS]
+        if not missing:
+            self.stats.count("fetches_cached")
+            return {key: cached[key] for key in wanted.values()}
+
+        if client is None:
+            with self.connection_ctx(folder, readonly=readonly) as conn:
+                return self.fetch_message(folder, uid, items, client=conn)
+
+        response = client.fetch([uid], missing).get(uid)
+        if response is None:
+            return None
+        fetched = {key: value for key, value in response.items() if key in wanted.values()}
+        live = {key: fetched.pop(key) for key in UNCACHED_FETCH_ITEMS if key in fetched}
+        with self.lock:
+            current = self.uidvalidities.get(folder)
+            if current is None:
+                merged = {**cached, **fetched}
+            elif current == uidvalidity or not cached:
+                merged = dict(self.parsed_messages.put((folder, current, uid), fetched).items)
+            else:
+                merged = None
+        if merged is None:
+            # UIDVALIDITY changed since the lookup: cached items belong to another message
+            return self.fetch_message(folder, uid, items, client=client)
+        merged.update(live)
+        return {key: merged[key] for key in wanted.values() if key in merged}
+
+    def parsed_message(self, folder: str, uid: int, client=None, readonly: bool = True) -> tuple[dict, email.message.Message] | None:
+        """Fetch RFC822, ENVELOPE and FLAGS of a message and its parsed form.
+
+        RFC822, ENVELOPE and the parsed form are cached; FLAGS are fetched
+        live, so a \\Draft check on the result reflects the server.
+
+        The parsed message is shared between callers and must not be modified.
+
+        Returns:
+            (response dict, parsed message), or None when the message does not exist
+        """
+        data = self.fetch_message(folder, uid, ["RFC822", "ENVELOPE", "FLAGS"], client=client, readonly=readonly)
+        if data is None or b"RFC822" not in data:
+            return None
+        with self.lock:
+            uidvalidity = self.uidvalidities.get(folder)
+            entry = self.parsed_messages.get((folder, uidvalidity, uid))
+            if entry is not None and entry.parsed is not None:
+                return data, entry.parsed
+        parsed = email.message_from_bytes(data[b"RFC822"])
+        with self.lock:
+            if entry is not None:
+                self.parsed_messages.put((folder, uidvalidity, uid), {}, parsed=parsed)
+        return data, parsed
+
+    def cached_text(self, folder: str, uid: int, name: str, build: Callable[[], str]) -> str:
+        """Return text derived from a message, built once per cached message.
+
+        The text is kept on the message's parsed-message LRU entry, so it lives
+        exactly as long as the fetched content it was derived from. Messages
+        that are not cached (too large, or never fetched) build it every time.
+
+        Args:
+            folder: Folder path
+            uid: Message UID
+            name: Kind of derived text, such as ``html:full``
+            build: Computes the text on a miss
+
+        Returns:
+            Cached or freshly built text
+        """
+        with self.lock:
+            key = (folder, self.uidvalidities.get(folder), uid)
+            entry = self.parsed_messages.get(key)
+            if entry is not None and name in entry.texts:
+                return entry.texts[name]
+        text = build()
+        with self.lock:
+            if entry is not None and self.uidvalidities.get(folder) == key[1]:
+                self.parsed_messages.put_text(key, name, text)
+        return text
+
+    def get_messages(self, folder: str, limit: int = 20, preview: bool = False, before_uid: int | None = None) -> list[dict]:
         """Get message list, validating cache with IMAP metadata.
 
+        The cached list always holds the newest N messages of the folder. A
+        request beyond N fetches only the missing older range and grows the
+        cache.
+
         Args:
             folder: Folder path
             limit: Maximum messages to return
             preview: Include body snippet (~100 chars) per message.
+            before_uid: Page cursor: only messages with UID below this
 
         Returns:
             List of message summaries (newest first)
         """
-        conn = self.get_connection()
+        if before_uid is None and self.watcher and self.watcher.is_live(folder):
+            with self.lock:
+                cached = self.message_cache.get(folder)
+            if cached and cached.covers(limit) and not (preview and self._blank_snippets(folder, cached.messages[:limit])[1]):
+                # The watcher applies every change the server reports, no SELECT needed
+                self.stats.count("lists_from_idle")
+                if preview:
+                    cached = self._fill_snippets(folder, None, cached, cached.messages[:limit])
+                return cached.messages[:limit]
+
+        with self._pooled_ctx(folder, readonly=True) as pooled:
+            conn = ReplayingClient(pooled)
+            cached = self.refresh_list(pooled, folder, limit, preview, grow=before_uid is None)
+
+            if before_uid is None:
+                if preview:
+                    # A list cached without preview has no snippets yet
+                    cached = self._fill_snippets(folder, conn, cached, cached.messages[:limit])
+                return cached.messages[:limit]
+
+            # Cursor outside the cached window: page straight from the server
+            if cached.messages and cached.messages[-1]["id"] > before_uid and not cached.covers(len(cached.messages) + 1):
+                return self._fetch_before(conn, before_uid, limit, preview)
+
+            page = [msg for msg in cached.messages if msg["id"] < before_uid][:limit]
+            needed = len(cached.messages) + limit - len(page)
+            if len(page) < limit and not cached.covers(needed):
+                if needed > CACHE_WINDOW_MAX:
+                    return self._fetch_before(conn, before_uid, limit, preview)
+                cached = self._grow(folder, conn, cached, needed, preview)
+                page = [msg for msg in cached.messages if msg["id"] < before_uid][:limit]
+            if preview:
+                cached = self._fill_snippets(folder, conn, cached, page)
+                page = [msg for msg in cached.messages if msg["id"] < before_uid][:limit]
+            return page
+
+    def refresh_list(self, pooled: PooledConnection, folder: str, limit: int, preview: bool, grow: bool = True) -> MessageListCache:
+        """SELECT folder and bring its cached list up to date.
+
+        The cached list is validated against UIDVALIDITY/UIDNEXT/EXISTS/
+        HIGHESTMODSEQ and resynced, or fetched fresh (newest `limit`) on a miss.
+        Also used by the IDLE watcher (idle_watcher.py) on its own connection.
+
+        Args:
+            pooled: Connection to use; the folder is left selected on it
+            folder: Folder path
+            limit: Messages to fetch when there is no usable cached list
+            preview: Include body snippets for fetched messages
+            grow: Extend a cached list shorter than limit with older messages
+
+        Returns:
+            Current (and stored) list
 
-        # Use select_folder to get atomic state for validation
+        Raises:
+            IMAPError: If folder cannot be opened
+        """
+        conn = ReplayingClient(pooled)
+
+        # Always SELECT (even if already selected) to get fresh state for validation
         try:
-            select_res = conn.select_folder(folder, readonly=True)
+            select_res = pooled.select(folder, readonly=True, force=True)
         except Exception as e:
             from imap_client import IMAPError
 
@@ -214,67 +950,105 @@ class AccountSession:
         uidvalidity = select_res.get(b"UIDVALIDITY")
         uidnext = select_res.get(b"UIDNEXT")
         exists = select_res.get(b"EXISTS")
-
-        with self.lock:
-            cached = self.message_cache.get(folder)
-            if cached and cached.uidvalidity == uidvalidity and cached.uidnext == uidnext and cached.exists == exists:
-                return cached.messages[:limit]
-
-        # Cache miss - fetch fresh
-        # Folder is already selected
-        message_ids = conn.search(["ALL"])
+        highestmodseq = select_res.get(b"HIGHESTMODSEQ")
+
+        cached = self._cached_list(folder, uidvalidity)
+        if cached and (cached.uidnext, cached.exists, cached.highestmodseq) != (uidnext, exists, highestmodseq):
+            resynced = self._resync(pooled, cached, uidnext, exists, highestmodseq, limit, preview)
+            cached = None if resynced is None else MessageListCache(resynced, uidvalidity, uidnext, exists, highestmodseq)
+            if cached:
+                self._store_list(folder, cached)
+
+        if cached is None:
+            # Cache miss - fetch fresh
+            cached = MessageListCache(self._fetch_newest(conn, exists, limit, preview), uidvalidity, uidnext, exists, highestmodseq)
+            self._store_list(folder, cached)
+        elif grow and not cached.covers(limit):
+            cached = self._grow(folder, conn, cached, limit, preview)
+        return cached
+
+    def _fetch_newest(self, conn: ReplayingClient, exists: int | None, count: int, preview: bool) -> list[dict]:
+        """Fetch summaries of the newest `count` messages in the selected folder."""
+        if exists is None:
+            message_ids = conn.search(["ALL"])
+        elif exists:
+            # Newest messages by sequence number: the SEARCH returns only their UIDs,
+            # not the whole folder's UID list
+            message_ids = conn.search([f"{max(1, exists - count + 1)}:*"])
+        else:
+            message_ids = []
 
         if not message_ids:
-            with self.lock:
-                self.message_cache[folder] = MessageListCache(messages=[], uidvalidity=uidvalidity, uidnext=uidnext, exists=exists)
             return []
 
         # Get newest messages
-        selected_ids = message_ids[-limit:] if len(message_ids) > limit else message_ids
+        selected_ids = sorted(message_ids)[-count:]
         selected_ids = list(reversed(selected_ids))
+        return self._fetch_summaries(conn, selected_ids, preview)
+
+    def _grow(self, folder: str, conn: ReplayingClient, cached: MessageListCache, count: int, preview: bool) -> MessageListCache:
+        """Extend a current cached list to the newest `count` messages.
+
+        Only the older range missing from the cache is fetched, addressed by
+        sequence number: the cached list holds positions EXISTS-N+1..EXISTS.
+
+        Args:
+            folder: Folder path
+            conn: Connection with the folder selected
+            cached: List valid for the current folder state
+            count: Messages the list should cover
+            preview: Include body snippets
+
+        Returns:
+            Grown (and stored) list
+        """
+        have = len(cached.messages)
+        if cached.exists is None:
+            messages = self._fetch_newest(conn, None, count, preview)
+        else:
+            high = cached.exists - have
+            low = max(1, cached.exists - count + 1)
+            older_ids = sorted(conn.search([f"{low}:{high}"]), reverse=True) if high >= low else []
+            oldest = cached.messages[-1]["id"] if cached.messages else None
+            if oldest is not None and any(uid >= oldest for uid in older_ids):
+                # Cached list is out of step with the server, start over
+                messages = self._fetch_newest(conn, cached.exists, count, preview)
+            else:
+                messages = cached.messages + self._fetch_summaries(conn, older_ids, preview) if older_ids else cached.messages
 
-        data = conn.fetch(selected_ids, ["ENVELOPE", "FLAGS", "RFC822.SIZE", "BODYSTRUCTURE"])
+        grown = MessageListCache(messages, cached.uidvalidity, cached.uidnext, cached.exists, cached.highestmodseq)
+        self._store_list(folder, grown)
+        return grown
+
+    def _fetch_before(self, conn: ReplayingClient, before_uid: int, limit: int, preview: bool) -> list[dict]:
+        """Fetch a page of messages below before_uid without caching it."""
+        from imap_client import search_newest
+
+        if before_uid <= 1:
+            return []
+        uids = search_newest(conn, ["UID", f"1:{before_uid - 1}"], limit)
+        return self._fetch_summaries(conn, uids, preview) if uids else []
+
+    def _fetch_summaries(self, conn: ReplayingClient, uids: list[int], preview: bool) -> list[dict]:
+        """Fetch list summaries for UIDs.
+
+        Args:
+            conn: Connection with the folder selected
+            uids: UIDs, newest first
+            preview: Include body snippet per message
+
+        Returns:
+            Message summaries in uids order
+        """
+        data = conn.fetch(uids, ["ENVELOPE", "FLAGS", "RFC822.SIZE", "BODYSTRUCTURE"])
 
         snippets: dict[int, str] = {}
         if preview:
-            try:
-                snippet_info: dict[int, tuple[str, bytes, bytes, bool]] = {}
-                for msg_id in selected_ids:
-                    msg_data = data.get(msg_id)
-                    if not msg_data:
-                        continue
-                    bodystructure = msg_data.get(b"BODYSTRUCTURE")
-                    part = find_text_part(bodystructure)
-                    is_html = False
-                    if part is None:
-                        part = find_html_part(bodystructure)
-                        is_html = part is not None
-                    if part:
-                        section, charset, encoding = part
-                        snippet_info[msg_id] = (section, charset, encoding, is_html)
-
-                snippet_raw: dict[int, dict] = {}
-                section_groups: dict[str, list[int]] = {}
-                for msg_id, (section, _, _, _) in snippet_info.items():
-                    section_groups.setdefault(section, []).append(msg_id)
-
-                for section, group_ids in section_groups.items():
-                    try:
-                        group_data = conn.fetch(group_ids, [f"BODY.PEEK[{section}]<0.600>"])
-                    except Exception:
-                        continue
-                    for msg_id, payload in group_data.items():
-                        if isinstance(payload, dict):
-                            snippet_raw[msg_id] = payload
-
-                for msg_id, (section, charset, encoding, is_html) in snippet_info.items():
-                    raw = get_body_peek(snippet_raw.get(msg_id, {}), section)
-                    snippets[msg_id] = extract_snippet(raw, charset, encoding, is_html) if raw else ""
-            except Exception:
-                snippets = {}
+            structures = {uid: data[uid].get(b"BODYSTRUCTURE") for uid in uids if uid in data}
+            snippets = self.load_snippets(conn, conn.selected_folder, structures)
 
         messages = []
-        for msg_id in selected_ids:
+        for msg_id in uids:
             if msg_id not in data:
                 continue
             msg_data = data[msg_id]
@@ -308,10 +1082,241 @@ class AccountSession:
                 }
             )
 
-        with self.lock:
-            self.message_cache[folder] = MessageListCache(messages=messages, uidvalidity=uidvalidity, uidnext=uidnext, exists=exists)
         return messages
 
+    def load_snippets(self, conn, folder: str | None, structures: dict[int, tuple | None]) -> dict[int, str]:
+        """Preview snippets for messages, fetching only those not seen before.
+
+        Snippets are persisted per (UIDVALIDITY, UID) in the summary cache;
+        the rest come from one FETCH covering all their text sections.
+        Fetch errors leave those snippets empty.
+
+        Args:
+            conn: Client with folder selected
+            folder: Selected folder
+            structures: UID -> BODYSTRUCTURE
+
+        Returns:
+            UID -> snippet
+        """
+        uidvalidity = self.uidvalidities.get(folder) if folder is not None else None
+        store = self.summary_cache if uidvalidity is not None else None
+        known = store.load_snippets(self.account, folder, uidvalidity, list(structures)) if store else {}
+        missing = {uid: body for uid, body in structures.items() if uid not in known}
+        if not missing:
+            return known
+        try:
+            fetched = fetch_snippets(conn.fetch, missing)
+        except Exception:
+            return known
+        if store:
+            # Messages without a text part are remembered too, so they are not looked up again
+            store.store_snippets(self.account, folder, uidvalidity, {uid: fetched.get(uid, "") for uid in missing})
+        return {**known, **fetched}
+
+    def _blank_snippets(self, folder: str, messages: list[dict]) -> tuple[dict[int, str], list[int]]:
+        """Look up snippets of cached entries listed without one (by a list without preview).
+
+        Returns:
+            (UID -> snippet from the snippet store, UIDs never looked up)
+        """
+        blank = [msg["id"] for msg in messages if not msg.get("snippet")]
+        uidvalidity = self.uidvalidities.get(folder)
+        known = {}
+        if blank and self.summary_cache and uidvalidity is not None:
+            known = self.summary_cache.load_snippets(self.account, folder, uidvalidity, blank)
+        return known, [uid for uid in blank if uid not in known]
+
+    def _fill_snippets(self, folder: str, conn: ReplayingClient | None, cached: MessageListCache, messages: list[dict]) -> MessageListCache:
+        """Add preview snippets to cached entries listed without one.
+
+        Snippets already in the snippet store are used as they are; only the
+        messages never looked up are fetched (BODYSTRUCTURE, then text).
+
+        Args:
+            folder: Folder path
+            conn: Connection with the folder selected, None to use the snippet store only
+            cached: List holding messages
+            messages: Entries about to be returned
+
+        Returns:
+            List with the snippets filled in (and stored), or cached if none were found
+        """
+        snippets, unknown = self._blank_snippets(folder, messages)
+        if unknown and conn is not None:
+            data = conn.fetch(unknown, ["BODYSTRUCTURE"])
+            structures = {uid: data[uid].get(b"BODYSTRUCTURE") for uid in unknown if uid in data}
+            snippets.update(self.load_snippets(conn, folder, structures))
+        snippets = {uid: snippet for uid, snippet in snippets.items() if snippet}
+        if not snippets:
+            return cached
+        filled = replace(
+            cached, messages=[{**msg, "snippet": snippets[msg["id"]]} if msg["id"] in snippets else msg for msg in cached.messages]
+        )
+        self._store_list(folder, filled)
+        return filled
+
+    def _cached_list(self, folder: str, uidvalidity: int | None) -> MessageListCache | None:
+        """Get cached list for folder from memory, else from the persistent cache.
+
+        Only lists stored under the current UIDVALIDITY are returned.
+        """
+        with self.lock:
+            cached = self.message_cache.get(folder)
+        if cached and cached.uidvalidity == uidvalidity:
+            return cached
+        if not self.summary_cache or uidvalidity is None:
+            return None
+
+        stored = self.summary_cache.load(self.account, folder, uidvalidity)
+        if stored is None:
+            return None
+        cached = MessageListCache(stored.messages, uidvalidity, stored.uidnext, stored.exists, stored.highestmodseq)
+        with self.lock:
+            self.message_cache[folder] = cached
+        return cached
+
+    def _store_list(self, folder: str, cache: MessageListCache):
+        """Store list in memory and in the persistent cache."""
+        with self.lock:
+            self.message_cache[folder] = cache
+        if self.summary_cache:
+            self.summary_cache.store(
+                self.account, folder, cache.uidvalidity, cache.uidnext, cache.exists, cache.messages, cache.highestmodseq
+            )
+
+    def _resync(
+        self,
+        pooled: PooledConnection,
+        cached: MessageListCache,
+        uidnext: int,
+        exists: int,
+        highestmodseq: int | None,
+        limit: int,
+        preview: bool,
+    ) -> list[dict] | None:
+        """Bring a cached list up to date without refetching it.
+
+        New mail is fetched as the UID range from the cached UIDNEXT and
+        prepended. On CONDSTORE servers flag changes since the cached
+        HIGHESTMODSEQ are applied, and on QRESYNC servers VANISHED UIDs are
+        dropped. Without QRESYNC, any removal shown by EXISTS forces a full
+        refetch.
+
+        Args:
+            pooled: Connection with the folder selected
+            cached: List cached under the current UIDVALIDITY
+            uidnext: UIDNEXT from SELECT
+            exists: EXISTS from SELECT
+            highestmodseq: HIGHESTMODSEQ from SELECT
+            limit: Requested number of messages
+            preview: Include body snippets for new messages
+
+        Returns:
+            Updated messages (newest first), or None if a full refetch is needed
+        """
+        if uidnext is None or cached.uidnext is None or exists is None or uidnext < cached.uidnext:
+            return None
+
+        conn = ReplayingClient(pooled)
+        window = max(limit, len(cached.messages))
+
+        new_ids: list[int] = []
+        if uidnext != cached.uidnext:
+            # "N:*" always matches the highest UID, even when it is below N
+            new_ids = [uid for uid in conn.search(["UID", f"{cached.uidnext}:*"]) if uid >= cached.uidnext]
+
+        removed = cached.exists + len(new_ids) - exists
+        condstore = highestmodseq is not None and cached.highestmodseq is not None
+        qresync = condstore and pooled.client.has_capability("QRESYNC")
+        if removed < 0 or (removed and not qresync):
+            return None
+
+        old = cached.messages
+        if condstore and highestmodseq != cached.highestmodseq and old:
+            modifiers = [f"CHANGEDSINCE {cached.highestmodseq}"] + (["VANISHED"] if qresync else [])
+            try:
+                changed = pooled.call("fetch", [msg["id"] for msg in old], ["FLAGS"], modifiers=modifiers)
+            except IMAPClientAbortError:
+                raise
+            except IMAPClientError:
+                return None
+            vanished = _pop_vanished(pooled.client, [msg["id"] for msg in old]) if qresync else set()
+
+            updated = []
+            for msg in old:
+                if msg["id"] in vanished:
+                    continue
+                msg_data = changed.get(msg["id"])
+                if msg_data and b"FLAGS" in msg_data:
+                    msg = {**msg, "flags": [_to_str(f).lstrip("\\") for f in msg_data[b"FLAGS"]]}
+                updated.append(msg)
+            old = updated
+
+        new_ids = sorted(new_ids, reverse=True)[:window]
+        messages = (self._fetch_summaries(conn, new_ids, preview) if new_ids else []) + old
+
+        # An expunge inside the window moves older messages into it
+        if len(messages) < min(window, exists):
+            return None
+        return messages[:window]
+
+
+def _folder_roles(folders: list[dict], by_name: bool = False) -> dict[str, str]:
+    """Map roles to folders by special-use flag, optionally then by common name.
+
+    Args:
+        folders: Folder dicts with 'name' and 'flags'
+        by_name: Also match _ROLE_NAMES (top level or under INBOX) for unflagged roles
+
+    Returns:
+        Role -> folder name (first match wins)
+    """
+    roles: dict[str, str] = {}
+    for folder in folders:
+        for flag in folder["flags"]:
+            role = SPECIAL_USE_ROLES.get(flag.lower())
+            if role:
+                roles.setdefault(role, folder["name"])
+    if by_name:
+        names = {folder["name"].lower(): folder["name"] for folder in folders}
+        for role, candidates in _ROLE_NAMES.items():
+            if role in roles:
+                continue
+            for candidate in candidates:
+                match = names.get(candidate) or names.get(f"inbox.{candidate}") or names.get(f"inbox/{candidate}")
+                if match:
+                    roles[role] = match
+                    break
+    return roles
+
+
+def _pop_vanished(client: IMAPClient, uids: list[int]) -> set[int]:
+    """Collect UIDs reported in VANISHED responses (RFC 7162).
+
+    imapclient leaves VANISHED in the underlying imaplib untagged responses.
+
+    Args:
+        client: Client that just ran a QRESYNC FETCH
+        uids: UIDs of interest
+
+    Returns:
+        Subset of uids the server reported as expunged
+    """
+    imap = getattr(client, "_imap", None)
+    lines = imap.untagged_responses.pop("VANISHED", []) if imap is not None else []
+
+    ranges = []
+    for line in lines:
+        text = _to_str(line).strip()
+        if text.upper().startswith("(EARLIER)"):
+            text = text[len("(EARLIER)") :]
+        for part in text.strip().split(","):
+            low, _, high = part.partition(":")
+            if low:
+                ranges.append((int(low), int(high or low)))
+    return {uid for uid in uids if any(min(lo, hi) <= uid <= max(lo, hi) for lo, hi in ranges)}
+
 
 def _to_str(value) -> str:
     """Convert bytes or str to str."""
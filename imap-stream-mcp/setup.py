@@ -19,6 +19,7 @@ import json
 import sys
 
 import keyring
+from summary_cache import accounts_stamp
 
 SERVICE_NAME = "imap-stream"
 
@@ -36,6 +37,16 @@ def save_accounts(accounts: list[str]):
     keyring.set_password(SERVICE_NAME, "accounts", json.dumps(accounts))
 
 
+def mark_accounts_changed():
+    """Touch the accounts stamp so a running server reloads its cached credentials."""
+    path = accounts_stamp()
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        path.touch()
+    except OSError as e:
+        print(f"Warning: could not notify running servers ({e}); they pick up the change within 5 minutes.")
+
+
 def get_default_account() -> str | None:
     """Get default account name."""
     accounts = get_accounts()
@@ -274,7 +285,9 @@ Examples:
 
     if args.list:
         list_accounts()
-    elif args.add:
+        return
+
+    if args.add:
         add_account(args.add)
     elif args.remove:
         remove_account(args.remove)
@@ -284,6 +297,7 @@ Examples:
         clear_all()
     else:
         interactive_setup()
+    mark_accounts_changed()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,320 @@
+"""Persistent on-disk cache of message summaries.
+
+MessageListCache lives in process memory and is lost whenever the MCP server
+restarts. SummaryCache keeps the same list summaries in SQLite, keyed by
+(account, folder, UIDVALIDITY, UID), together with the UIDNEXT/EXISTS/HIGHESTMODSEQ
+state that validates them. A cold-start list then costs one SELECT.
+Preview snippets are also kept per (UIDVALIDITY, UID), since they never
+change, so previews only fetch body bytes of messages not seen before.
+
+Location: $IMAP_STREAM_CACHE_DIR, else $XDG_CACHE_HOME/imap-stream, else
+~/.cache/imap-stream. Set IMAP_STREAM_DISK_CACHE=0 to disable.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 3
+CACHE_FILENAME = "summaries.sqlite3"
+ACCOUNTS_STAMP = "accounts.stamp"  # Touched by setup.py when accounts change
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folder_state (
+    account TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    uidnext INTEGER NOT NULL,
+    exists_count INTEGER NOT NULL,
+    highestmodseq INTEGER,
+    uids TEXT NOT NULL,
+    PRIMARY KEY (account, folder)
+);
+CREATE TABLE IF NOT EXISTS summaries (
+    account TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    uid INTEGER NOT NULL,
+    subject TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    date TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    flags TEXT NOT NULL,
+    attachment_count INTEGER NOT NULL,
+    snippet TEXT NOT NULL,
+    PRIMARY KEY (account, folder, uidvalidity, uid)
+);
+CREATE TABLE IF NOT EXISTS snippets (
+    account TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    uid INTEGER NOT NULL,
+    snippet TEXT NOT NULL,
+    PRIMARY KEY (account, folder, uidvalidity, uid)
+);
+"""
+
+
+class StoredFolder(NamedTuple):
+    """Persisted folder state and its summaries (newest first)."""
+
+    uidnext: int
+    exists: int
+    highestmodseq: int | None
+    messages: list[dict]
+
+
+_caches: dict[Path, "SummaryCache"] = {}
+_caches_lock = threading.Lock()
+
+
+def cache_dir() -> Path:
+    """Return directory for persistent cache files."""
+    override = os.environ.get("IMAP_STREAM_CACHE_DIR")
+    if override:
+        return Path(override)
+    base = os.environ.get("XDG_CACHE_HOME")
+    return (Path(base) if base else Path.home() / ".cache") / "imap-stream"
+
+
+def accounts_stamp() -> Path:
+    """Return the file setup.py touches to invalidate cached credentials."""
+    return cache_dir() / ACCOUNTS_STAMP
+
+
+def get_summary_cache() -> "SummaryCache | None":
+    """Get the shared SummaryCache for the configured location.
+
+    Returns:
+        SummaryCache, or None when disabled or the cache cannot be opened
+    """
+    if os.environ.get("IMAP_STREAM_DISK_CACHE", "1") == "0":
+        return None
+
+    path = cache_dir() / CACHE_FILENAME
+    with _caches_lock:
+        if path not in _caches:
+            try:
+                _caches[path] = SummaryCache(path)
+            except (OSError, sqlite3.Error) as e:
+                logger.debug("Summary cache disabled, cannot open %s: %s", path, e)
+                return None
+        return _caches[path]
+
+
+class SummaryCache:
+    """SQLite store of list summaries with folder validation state.
+
+    All methods swallow sqlite errors: a broken cache behaves like an empty one.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        try:
+            os.chmod(path, 0o600)  # Subjects and snippets are private
+        except OSError:
+            pass
+        self._db.execute("PRAGMA journal_mode=WAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._db.executescript("DROP TABLE IF EXISTS folder_state; DROP TABLE IF EXISTS summaries; DROP TABLE IF EXISTS snippets;")
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.executescript(_SCHEMA)
+
+    def load(self, account: str | None, folder: str, uidvalidity: int) -> StoredFolder | None:
+        """Load cached summaries stored under the given UIDVALIDITY.
+
+        The caller compares UIDNEXT/EXISTS/HIGHESTMODSEQ with the SELECT
+        response to decide whether the summaries are current or need a resync.
+
+        Args:
+            account: Account name
+            folder: Folder path
+            uidvalidity: UIDVALIDITY from SELECT
+
+        Returns:
+            StoredFolder, or None on UIDVALIDITY mismatch/miss
+        """
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT uidvalidity, uidnext, exists_count, highestmodseq, uids FROM folder_state WHERE account = ? AND folder = ?",
+                    (account or "", folder),
+                ).fetchone()
+                if row is None or row[0] != uidvalidity:
+                    return None
+                uids = json.loads(row[4])
+                rows = self._db.execute(
+                    "SELECT uid, subject, sender, date, size, flags, attachment_count, snippet FROM summaries"
+                    " WHERE account = ? AND folder = ? AND uidvalidity = ?",
+                    (account or "", folder, uidvalidity),
+                ).fetchall()
+        except (sqlite3.Error, ValueError) as e:
+            logger.debug("Summary cache load failed for %s: %s", folder, e)
+            return None
+
+        by_uid = {r[0]: r for r in rows}
+        if any(uid not in by_uid for uid in uids):
+            return None
+        return StoredFolder(row[1], row[2], row[3], [_row_to_message(by_uid[uid]) for uid in uids])
+
+    def store(
+        self,
+        account: str | None,
+        folder: str,
+        uidvalidity: int,
+        uidnext: int,
+        exists: int,
+        messages: list[dict],
+        highestmodseq: int | None = None,
+    ):
+        """Store summaries and the folder state they are valid for.
+
+        Summaries from an older UIDVALIDITY of the folder are dropped.
+
+        Args:
+            account: Account name
+            folder: Folder path
+            uidvalidity: UIDVALIDITY from SELECT
+            uidnext: UIDNEXT from SELECT
+            exists: EXISTS from SELECT
+            messages: Summaries newest first, as returned by get_messages
+            highestmodseq: HIGHESTMODSEQ from SELECT (CONDSTORE servers only)
+        """
+        if uidvalidity is None or uidnext is None or exists is None:
+            return
+        account = account or ""
+        try:
+            with self._lock, self._db:
+                self._db.execute("BEGIN")
+                self._db.execute(
+                    "DELETE FROM summaries WHERE account = ? AND folder = ? AND uidvalidity != ?",
+                    (account, folder, uidvalidity),
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            account,
+                            folder,
+                            uidvalidity,
+                            msg["id"],
+                            msg.get("subject", ""),
+                            msg.get("from", ""),
+                            msg.get("date", ""),
+                            msg.get("size", 0),
+                            json.dumps(msg.get("flags", [])),
+                            msg.get("attachment_count", 0),
+                            msg.get("snippet", ""),
+                        )
+                        for msg in messages
+                    ],
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO folder_state VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (account, folder, uidvalidity, uidnext, exists, highestmodseq, json.dumps([msg["id"] for msg in messages])),
+                )
+        except sqlite3.Error as e:
+            logger.debug("Summary cache store failed for %s: %s", folder, e)
+
+    def invalidate(self, account: str | None, folder: str):
+        """Forget folder state so the next list revalidates. Summaries are kept."""
+        try:
+            with self._lock:
+                self._db.execute("DELETE FROM folder_state WHERE account = ? AND folder = ?", (account or "", folder))
+        except sqlite3.Error as e:
+            logger.debug("Summary cache invalidate failed for %s: %s", folder, e)
+
+    def update_flags(self, account: str | None, folder: str, uid: int, flags: list[str]):
+        """Update flags of a cached summary."""
+        try:
+            with self._lock:
+                self._db.execute(
+                    "UPDATE summaries SET flags = ? WHERE account = ? AND folder = ? AND uid = ?",
+                    (json.dumps(flags), account or "", folder, uid),
+                )
+        except sqlite3.Error as e:
+            logger.debug("Summary cache flag update failed for %s: %s", folder, e)
+
+    def load_snippets(self, account: str | None, folder: str, uidvalidity: int, uids: list[int]) -> dict[int, str]:
+        """Return stored preview snippets of uids.
+
+        Args:
+            account: Account name
+            folder: Folder path
+            uidvalidity: UIDVALIDITY the UIDs belong to
+            uids: UIDs to look up
+
+        Returns:
+            UID -> snippet for the UIDs seen before (an empty snippet is a hit too)
+        """
+        if not uids:
+            return {}
+        try:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT uid, snippet FROM snippets WHERE account = ? AND folder = ? AND uidvalidity = ?"
+                    f" AND uid IN ({','.join('?' * len(uids))})",
+                    (account or "", folder, uidvalidity, *uids),
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.debug("Snippet load failed for %s: %s", folder, e)
+            return {}
+        return dict(rows)
+
+    def store_snippets(self, account: str | None, folder: str, uidvalidity: int, snippets: dict[int, str]):
+        """Store preview snippets; snippets from an older UIDVALIDITY of the folder are dropped."""
+        if not snippets:
+            return
+        account = account or ""
+        try:
+            with self._lock, self._db:
+                self._db.execute("BEGIN")
+                self._db.execute(
+                    "DELETE FROM snippets WHERE account = ? AND folder = ? AND uidvalidity != ?",
+                    (account, folder, uidvalidity),
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO snippets VALUES (?, ?, ?, ?, ?)",
+                    [(account, folder, uidvalidity, uid, snippet) for uid, snippet in snippets.items()],
+                )
+        except sqlite3.Error as e:
+            logger.debug("Snippet store failed for %s: %s", folder, e)
+
+    def clear(self):
+        """Remove all cached data."""
+        try:
+            with self._lock:
+                self._db.execute("DELETE FROM folder_state")
+                self._db.execute("DELETE FROM summaries")
+                self._db.execute("DELETE FROM snippets")
+        except sqlite3.Error as e:
+            logger.debug("Summary cache clear failed: %s", e)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+
+def _row_to_message(row: tuple) -> dict:
+    """Convert summaries row to get_messages dict."""
+    uid, subject, sender, date, size, flags, attachment_count, snippet = row
+    return {
+        "id": uid,
+        "subject": subject,
+        "from": sender,
+        "date": date,
+        "size": size,
+        "flags": json.loads(flags),
+        "attachment_count": attachment_count,
+        "snippet": snippet,
+    }
@@ -0,0 +1,20 @@
+"""Shared fixtures for session tests."""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_summary_cache(tmp_path, monkeypatch):
+    """Keep the persistent summary cache out of the user's cache directory."""
+    monkeypatch.setenv("IMAP_STREAM_CACHE_DIR", str(tmp_path / "cache"))
+    import imap_client
+
+    imap_client.invalidate_credentials()
+    yield
+    import summary_cache
+
+    with summary_cache._caches_lock:
+        caches = list(summary_cache._caches.values())
+        summary_cache._caches.clear()
+    for cache in caches:
+        cache.close()
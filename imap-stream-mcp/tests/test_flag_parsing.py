@@ -146,3 +146,40 @@ class TestParseFlagPayload:
 
         with pytest.raises(ValueError, match="must start with"):
             parse_flag_payload("123:Flagged")
+
+
+# Tests for parse_flag_changes (query-driven flag payloads)
+class TestParseFlagChanges:
+    """Test parsing of a flags-only payload."""
+
+    def test_add_and_remove(self):
+        from imap_stream_mcp import parse_flag_changes
+
+        assert parse_flag_changes("+Seen, -Flagged") == (["Seen"], ["Flagged"])
+
+    def test_missing_prefix_raises(self):
+        from imap_stream_mcp import parse_flag_changes
+
+        with pytest.raises(ValueError):
+            parse_flag_changes("Seen")
+
+    def test_empty_raises(self):
+        from imap_stream_mcp import parse_flag_changes
+
+        with pytest.raises(ValueError, match="No flags"):
+            parse_flag_changes("  ")
+
+
+class TestParseMessageIds:
+    """Test parsing of comma-separated message IDs."""
+
+    def test_parses_ids(self):
+        from imap_stream_mcp import parse_message_ids
+
+        assert parse_message_ids("1, 2,3") == [1, 2, 3]
+
+    def test_invalid_id_raises(self):
+        from imap_stream_mcp import parse_message_ids
+
+        with pytest.raises(ValueError, match="Invalid message ID"):
+            parse_message_ids("1,abc")
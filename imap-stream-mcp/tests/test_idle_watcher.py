@@ -0,0 +1,242 @@
+"""Tests for the IDLE watcher."""
+
+import time
+from unittest.mock import Mock, patch
+
+import idle_watcher
+import pytest
+from idle_watcher import IdleWatcher, start_watcher, watched_folders
+from imapclient import IMAPClient
+from session import AccountSession, MessageListCache, _sessions, get_session
+
+
+def _client(select: dict | None = None, idle: bool = True) -> Mock:
+    client = Mock(spec=IMAPClient)
+    client.has_capability.side_effect = lambda name: idle or name != "IDLE"
+    client.select_folder.return_value = {b"UIDVALIDITY": 1, b"UIDNEXT": 4, b"EXISTS": 3, **(select or {})}
+    client.idle_check.return_value = []
+    client.idle_done.return_value = (b"IDLE terminated", [])
+    client.noop.return_value = (b"NOOP completed", [])
+    client._imap = Mock(untagged_responses={})
+    return client
+
+
+def _session() -> AccountSession:
+    session = AccountSession("test")
+    session.message_cache["INBOX"] = MessageListCache(
+        messages=[
+            {"id": 3, "subject": "C", "flags": []},
+            {"id": 2, "subject": "B", "flags": []},
+            {"id": 1, "subject": "A", "flags": ["Seen"]},
+        ],
+        uidvalidity=1,
+        uidnext=4,
+        exists=3,
+    )
+    _sessions["test"] = session
+    return session
+
+
+@pytest.fixture(autouse=True)
+def clear_sessions():
+    """Isolate the module-level session registry."""
+    _sessions.clear()
+    yield
+    _sessions.clear()
+
+
+def _watch(session: AccountSession, client: Mock) -> IdleWatcher:
+    """Open the INBOX watch synchronously on client."""
+    watcher = IdleWatcher(session, ["INBOX"])
+    session.watcher = watcher
+    with patch("idle_watcher._create_connection", return_value=client):
+        watcher.poll(0)
+    return watcher
+
+
+class TestWatchedFolders:
+    def test_default_is_inbox(self, monkeypatch):
+        monkeypatch.delenv("IMAP_STREAM_IDLE_FOLDERS", raising=False)
+        assert watched_folders() == ["INBOX"]
+
+    def test_comma_list_deduplicated(self, monkeypatch):
+        monkeypatch.setenv("IMAP_STREAM_IDLE_FOLDERS", "INBOX, Work ,,INBOX")
+        assert watched_folders() == ["INBOX", "Work"]
+
+    def test_disabled_by_default(self, monkeypatch):
+        monkeypatch.delenv("IMAP_STREAM_IDLE", raising=False)
+        assert start_watcher(AccountSession("test")) is None
+
+
+class TestIdleWatcher:
+    def test_list_of_watched_folder_has_no_network_io(self):
+        session = _session()
+        client = _client()
+        watcher = _watch(session, client)
+        assert watcher.is_live("INBOX")
+        client.idle.assert_called_once()
+
+        with patch("session._create_connection") as create:
+            messages = session.get_messages("INBOX", limit=3)
+
+        create.assert_not_called()
+        client.select_folder.assert_called_once()  # only the watcher's own SELECT
+        assert [m["id"] for m in messages] == [3, 2, 1]
+        assert session.stats.lists_from_idle == 1
+
+    def test_list_beyond_cached_window_goes_to_server(self):
+        session = _session()
+        _watch(session, _client())
+        server = Mock(spec=IMAPClient)
+        server.select_folder.return_value = {b"UIDVALIDITY": 1, b"UIDNEXT": 4, b"EXISTS": 3}
+
+        with patch("session._create_connection", return_value=server):
+            session.get_messages("INBOX", limit=3, before_uid=3)
+
+        server.select_folder.assert_called_once()
+
+    def test_flag_change_applied_by_sequence_number(self):
+        session = _session()
+        client = _client()
+        watcher = _watch(session, client)
+        client.idle_check.return_value = [(2, b"FETCH", (b"FLAGS", (b"\\Seen", b"\\Flagged")))]
+
+        watcher.poll(0)
+
+        assert session.message_cache["INBOX"].messages[1]["flags"] == ["Seen", "Flagged"]
+        client.idle_done.assert_called_once()
+        assert client.idle.call_count == 2
+        assert watcher.is_live("INBOX")
+
+    def test_new_mail_resynced_on_exists(self):
+        session = _session()
+        client = _client()
+        watcher = _watch(session, client)
+        client.idle_check.return_value = [(4, b"EXISTS")]
+        client.select_folder.return_value = {b"UIDVALIDITY": 1, b"UIDNEXT": 5, b"EXISTS": 4}
+        client.search.return_value = [4]
+        client.fetch.return_value = {4: {b"ENVELOPE": Mock(subject=b"D", from_=[], date=None), b"FLAGS": [], b"BODYSTRUCTURE": None}}
+
+        watcher.poll(0)
+
+        client.search.assert_called_once_with(["UID", "4:*"])
+        cached = session.message_cache["INBOX"]
+        assert [m["id"] for m in cached.messages] == [4, 3, 2]  # same window size, newest first
+        assert (cached.uidnext, cached.exists) == (5, 4)
+
+    def test_expunge_refetches_and_ignores_shifted_sequence_numbers(self):
+        session = _session()
+        client = _client()
+        watcher = _watch(session, client)
+        client.idle_check.return_value = [(2, b"EXPUNGE"), (2, b"FETCH", (b"FLAGS", (b"\\Deleted",)))]
+        client.select_folder.return_value = {b"UIDVALIDITY": 1, b"UIDNEXT": 4, b"EXISTS": 2}
+        client.search.return_value = [1, 3]
+        client.fetch.return_value = {
+            uid: {b"ENVELOPE": Mock(subject=b"X", from_=[], date=None), b"FLAGS": [], b"BODYSTRUCTURE": None} for uid in (1, 3)
+        }
+
+        watcher.poll(0)
+
+        assert [m["id"] for m in session.message_cache["INBOX"].messages] == [3, 1]
+        assert all("Deleted" not in m["flags"] for m in session.message_cache["INBOX"].messages)
+
+    def test_vanished_resyncs_list(self):
+        """QRESYNC reports expunges as VANISHED; the list is refetched without them."""
+        session = _session()
+        client = _client()
+        watcher = _watch(session, client)
+        client.idle_check.return_value = [(b"VANISHED", 2)]
+        client.select_folder.return_value = {b"UIDVALIDITY": 1, b"UIDNEXT": 4, b"EXISTS": 2}
+        client.search.return_value = [1, 3]
+        client.fetch.return_value = {
+            uid: {b"ENVELOPE": Mock(subject=b"X", from_=[], date=None), b"FLAGS": [], b"BODYSTRUCTURE": None} for uid in (1, 3)
+        }
+
+        watcher.poll(0)
+
+        assert [m["id"] for m in session.message_cache["INBOX"].messages] == [3, 1]
+        assert watcher.is_live("INBOX")
+
+    def test_quiet_watch_verified_with_noop(self, monkeypatch):
+        """After IDLE_VERIFY without notifications the watch leaves IDLE for a NOOP."""
+        session = _session()
+        client = _client()
+        watcher = _watch(session, client)
+        monkeypatch.setattr(idle_watcher, "IDLE_VERIFY", 0)
+
+        watcher.poll(0)
+
+        client.idle_done.assert_called_once()
+        client.noop.assert_called_once()
+        assert client.idle.call_count == 2
+        assert watcher.is_live("INBOX")
+
+    def test_half_open_socket_stops_being_live(self, monkeypatch):
+        """A NOOP timing out on a silent socket drops the watch."""
+        session = _session()
+        client = _client()
+        watcher = _watch(session, client)
+        monkeypatch.setattr(idle_watcher, "IDLE_VERIFY", 0)
+        client.noop.side_effect = TimeoutError("timed out")
+
+        watcher.poll(0)
+
+        assert not watcher.is_live("INBOX")
+        client.logout.assert_called_once()
+
+    def test_unverified_watch_expires(self, monkeypatch):
+        """While the thread is stuck on a dead socket the folder stops counting as live."""
+        session = _session()
+        watcher = _watch(session, _client())
+        now = time.monotonic()
+        monkeypatch.setattr(idle_watcher.time, "monotonic", lambda: now + idle_watcher.IDLE_LIVE_WINDOW)
+
+        assert not watcher.is_live("INBOX")
+
+    def test_dropped_connection_falls_back_to_select(self):
+        session = _session()
+        client = _client()
+        watcher = _watch(session, client)
+        client.idle_check.side_effect = OSError("reset")
+
+        watcher.poll(0)
+
+        assert not watcher.is_live("INBOX")
+        client.logout.assert_called_once()
+        server = _client()
+        with patch("session._create_connection", return_value=server):
+            session.get_messages("INBOX", limit=3)
+        server.select_folder.assert_called_once()
+
+    def test_server_without_idle_is_not_watched(self):
+        session = _session()
+        client = _client(idle=False)
+
+        watcher = _watch(session, client)
+
+        assert not watcher.is_live("INBOX")
+        client.select_folder.assert_not_called()
+        client.logout.assert_called_once()
+
+
+class TestWatcherThread:
+    def test_get_session_starts_and_close_stops_watcher(self, monkeypatch):
+        monkeypatch.setenv("IMAP_STREAM_IDLE", "1")
+        monkeypatch.setattr(idle_watcher, "IDLE_POLL_INTERVAL", 0.01)
+        client = _client()
+        client.search.return_value = []
+
+        with patch("idle_watcher._create_connection", return_value=client), patch("session.get_summary_cache", return_value=None):
+            session = get_session("test")
+            watcher = session.watcher
+            for _ in range(200):
+                if watcher.is_live("INBOX"):
+                    break
+                time.sleep(0.01)
+            assert watcher.is_live("INBOX")
+
+            session.close()
+
+        assert session.watcher is None
+        assert not watcher.is_live("INBOX")
+        client.logout.assert_called_once()
@@ -128,6 +128,7 @@ class TestSearchMessagesFlagIntegration:
         mock_session.connection_ctx.return_value.__exit__.return_value = False
         mock_get_session.return_value = mock_session
         mock_client.search.return_value = []
+        mock_client.has_capability.return_value = False  # Plain SEARCH, no ESEARCH
 
         search_messages("INBOX", "flagged")
 
@@ -143,6 +144,7 @@ class TestSearchMessagesFlagIntegration:
         mock_session.connection_ctx.return_value.__exit__.return_value = False
         mock_get_session.return_value = mock_session
         mock_client.search.return_value = []
+        mock_client.has_capability.return_value = False  # Plain SEARCH, no ESEARCH
 
         search_messages("INBOX", "is:unread")
 
@@ -158,6 +160,7 @@ class TestSearchMessagesFlagIntegration:
         mock_session.connection_ctx.return_value.__exit__.return_value = False
         mock_get_session.return_value = mock_session
         mock_client.search.return_value = []
+        mock_client.has_capability.return_value = False  # Plain SEARCH, no ESEARCH
 
         search_messages("INBOX", "from:test@example.com")
 
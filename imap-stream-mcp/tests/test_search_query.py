@@ -0,0 +1,161 @@
+"""Tests for the search query compiler."""
+
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pytest
+from search_query import compile_query, plan_query, tokenize
+
+
+class TestTokenize:
+    """Test query tokenization."""
+
+    def test_quoted_phrase_attached_to_key(self):
+        assert tokenize('subject:"weekly report" x') == [("subject:weekly report", True), ("x", False)]
+
+    def test_parentheses_and_negation(self):
+        assert tokenize("-(a OR b)") == [("NOT", False), ("(", False), ("a", False), ("OR", False), ("b", False), (")", False)]
+
+    def test_key_with_space_joins_next_word(self):
+        assert tokenize("from: alice unread") == [("from:alice", False), ("unread", False)]
+
+    def test_lone_dash_is_a_word(self):
+        assert tokenize("a - b") == [("a", False), ("-", False), ("b", False)]
+
+
+class TestCompileQuery:
+    """Test query -> IMAP criteria compilation."""
+
+    @pytest.mark.parametrize(
+        "query,expected",
+        [
+            ("flagged", ["FLAGGED"]),
+            ("from:test@example.com", ["FROM", "test@example.com"]),
+            ("subject:hello", ["SUBJECT", "hello"]),
+            ("invoice", ["OR", "SUBJECT", "invoice", "BODY", "invoice"]),
+        ],
+    )
+    def test_single_terms_keep_previous_criteria(self, query, expected):
+        assert compile_query(query) == expected
+
+    def test_implicit_and_orders_cheap_keys_first(self):
+        criteria = compile_query("invoice from:alice since:2026-01-01 is:unread")
+
+        assert criteria == ["UNSEEN", "SINCE", date(2026, 1, 1), "FROM", "alice", "OR", "SUBJECT", "invoice", "BODY", "invoice"]
+
+    def test_or_chain_is_nested_binary(self):
+        assert compile_query("from:a OR from:b OR from:c") == ["OR", "FROM", "a", "OR", "FROM", "b", "FROM", "c"]
+
+    def test_group_under_or_is_parenthesized(self):
+        assert compile_query("(from:a is:unread) OR is:flagged") == ["OR", ["UNSEEN", "FROM", "a"], "FLAGGED"]
+
+    def test_flag_words_in_a_sentence_are_text(self):
+        """Only a lone flag word or a keyed form (is:, seen:no) filters by flag."""
+        assert compile_query("please read this") == [
+            *["OR", "SUBJECT", "please", "BODY", "please"],
+            *["OR", "SUBJECT", "read", "BODY", "read"],
+            *["OR", "SUBJECT", "this", "BODY", "this"],
+        ]
+        assert compile_query("deleted answered") == [
+            "OR",
+            "SUBJECT",
+            "deleted",
+            "BODY",
+            "deleted",
+            "OR",
+            "SUBJECT",
+            "answered",
+            "BODY",
+            "answered",
+        ]
+        assert compile_query("report -is:read seen:no") == ["NOT", "SEEN", "UNSEEN", "OR", "SUBJECT", "report", "BODY", "report"]
+        assert compile_query("read") == ["SEEN"]
+
+    def test_not_and_dash(self):
+        assert compile_query("NOT from:a -subject:b") == ["NOT", "FROM", "a", "NOT", "SUBJECT", "b"]
+        assert compile_query("-(from:a to:b)") == ["NOT", ["FROM", "a", "TO", "b"]]
+
+    def test_quoted_phrase_is_one_text_term(self):
+        assert compile_query('"out of office"') == ["OR", "SUBJECT", "out of office", "BODY", "out of office"]
+
+    def test_quoted_operator_is_text(self):
+        assert compile_query('"OR"') == ["OR", "SUBJECT", "OR", "BODY", "OR"]
+
+    def test_size_and_attachment(self):
+        assert compile_query("size>5M size<100k") == ["LARGER", 5 * 1024**2, "SMALLER", 100 * 1024]
+        assert compile_query("has:attachment") == ["HEADER", "Content-Type", "multipart/mixed"]
+
+    def test_dates_accept_imap_format(self):
+        assert compile_query("before:01-Jan-2024 on:2024-02-03") == ["BEFORE", date(2024, 1, 1), "ON", date(2024, 2, 3)]
+
+    def test_unknown_prefix_is_text(self):
+        assert compile_query("re:meeting") == ["OR", "SUBJECT", "re:meeting", "BODY", "re:meeting"]
+
+    @pytest.mark.parametrize(
+        "query,message",
+        [
+            ("", "Empty"),
+            ("(a", "Missing"),
+            ("a)", "Unexpected"),
+            ("a OR", "Expected"),
+            ("NOT", "NOT needs"),
+            ("from:", "Missing value"),
+            ("since:yesterday", "Invalid date"),
+            ('"abc', "Unterminated"),
+        ],
+    )
+    def test_malformed_queries_raise(self, query, message):
+        with pytest.raises(ValueError, match=message):
+            compile_query(query)
+
+
+class TestPlanQuery:
+    """Test splitting queries into local index and server parts."""
+
+    def test_text_terms_go_local_flags_and_dates_to_server(self):
+        expression, rest = plan_query("from:alice since:2026-01-01 is:unread invoice")
+
+        assert expression == '(sender : "alice") AND ({subject body} : "invoice")'
+        assert rest == ["UNSEEN", "SINCE", date(2026, 1, 1)]
+
+    def test_negated_text_needs_a_positive_term(self):
+        assert plan_query('report -"out of office"')[0] == '(({subject body} : "report")) NOT ({subject body} : "out of office")'
+        assert plan_query("-invoice") == (None, ["NOT", "OR", "SUBJECT", "invoice", "BODY", "invoice"])
+
+    def test_or_of_text_terms_is_local(self):
+        assert plan_query("from:alice OR from:bob") == ('((sender : "alice") OR (sender : "bob"))', [])
+
+    def test_mixed_or_stays_on_server(self):
+        assert plan_query("from:alice OR is:flagged") == (None, ["OR", "FROM", "alice", "FLAGGED"])
+
+    def test_short_terms_stay_on_server(self):
+        """The trigram index cannot match substrings under three characters."""
+        assert plan_query("subject:ok invoice") == ('({subject body} : "invoice")', ["SUBJECT", "ok"])
+
+
+class TestSearchMessagesCompound:
+    """Test that search_messages sends one compiled criteria tree."""
+
+    @patch("session.get_session")
+    def test_compound_query_single_search(self, mock_get_session):
+        from imap_client import search_messages
+
+        mock_client = MagicMock()
+        mock_session = MagicMock()
+        mock_session.connection_ctx.return_value.__enter__.return_value = mock_client
+        mock_session.connection_ctx.return_value.__exit__.return_value = False
+        mock_get_session.return_value = mock_session
+        mock_client.search.return_value = []
+        mock_client.has_capability.return_value = False
+
+        search_messages("INBOX", "from:alice is:unread (invoice OR receipt)")
+
+        mock_client.search.assert_called_once_with(
+            ["UNSEEN", "FROM", "alice", "OR", "OR", "SUBJECT", "invoice", "BODY", "invoice", "OR", "SUBJECT", "receipt", "BODY", "receipt"]
+        )
+
+    def test_malformed_query_raises_imap_error(self):
+        from imap_client import IMAPError, build_search_criteria
+
+        with pytest.raises(IMAPError, match="Invalid search query"):
+            build_search_criteria("(unbalanced")
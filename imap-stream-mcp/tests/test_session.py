@@ -1,20 +1,32 @@
 """Tests for session caching."""
 
+import threading
 import time
 from unittest.mock import Mock, patch
 
 import pytest
+from imap_client import IMAPError
 from imapclient import IMAPClient
 from imapclient.exceptions import IMAPClientError
 from session import (
+    CONNECTION_IDLE_TIMEOUT,
+    FOLDER_ROLES_TTL,
+    LIVENESS_WINDOW,
+    POOL_SIZE,
     AccountSession,
     FolderCache,
+    FolderRoles,
     MessageListCache,
+    ParsedMessageCache,
+    PooledConnection,
+    _enable_resync,
+    _pop_vanished,
     _sessions,
     get_session,
     invalidate_message_cache,
     update_cached_flags,
 )
+from summary_cache import SummaryCache
 
 
 class TestDataStructures:
@@ -32,60 +44,338 @@ class TestDataStructures:
     def test_account_session_initial_state(self):
         session = AccountSession("test@example.com")
         assert session.account == "test@example.com"
-        assert session.connection is None
+        assert session.pool == []
+        assert session.pool_size == POOL_SIZE
         assert session.folder_cache is None
         assert session.message_cache == {}
 
 
-class TestConnectionManagement:
-    def test_get_connection_creates_new(self):
-        """First call creates connection."""
+def _add_pooled(session: AccountSession, client, folder: str | None = None, readonly: bool = True, age: float = 0.0) -> PooledConnection:
+    """Put an already-authenticated client into the session pool."""
+    pooled = PooledConnection(
+        client=client,
+        selected_folder=folder,
+        readonly=readonly,
+        last_activity=time.time() - age,
+        account=session.account,
+        stats=session.stats,
+        uidvalidities=session.uidvalidities,
+    )
+    session.pool.append(pooled)
+    return pooled
+
+
+class TestConnectionPool:
+    def test_acquire_creates_new(self):
+        """First checkout creates a connection."""
         session = AccountSession("test")
         mock_client = Mock(spec=IMAPClient)
 
         with patch("session._create_connection", return_value=mock_client) as create:
-            conn = session.get_connection()
-            assert conn is mock_client
-            assert session.connection is mock_client
+            with session.connection_ctx() as conn:
+                assert conn._pooled.client is mock_client
             create.assert_called_once_with("test")
 
-    def test_get_connection_reuses_existing(self):
-        """Second call within timeout reuses connection."""
+        assert len(session.pool) == 1
+        assert session.pool[0].in_use is False
+
+    def test_acquire_reuses_idle(self):
+        """Second checkout within timeout reuses the idle connection."""
         session = AccountSession("test")
         mock_client = Mock(spec=IMAPClient)
-        session.connection = mock_client
-        session.last_activity = time.time()
+        _add_pooled(session, mock_client)
 
         with patch("session._create_connection") as create:
-            conn = session.get_connection()
-            assert conn is mock_client
+            with session.connection_ctx() as conn:
+                assert conn._pooled.client is mock_client
             create.assert_not_called()
 
-    def test_get_connection_recreates_after_timeout(self):
-        """Connection recreated after idle timeout."""
+    def test_idle_connection_reaped_after_timeout(self):
+        """Connection unused for longer than idle_timeout is logged out and replaced."""
         session = AccountSession("test")
         old_client = Mock(spec=IMAPClient)
         new_client = Mock(spec=IMAPClient)
-        session.connection = old_client
-        session.last_activity = time.time() - 400  # Older than 300s timeout
+        _add_pooled(session, old_client, age=CONNECTION_IDLE_TIMEOUT + 100)
 
         with patch("session._create_connection", return_value=new_client):
-            conn = session.get_connection()
-            assert conn is new_client
-            old_client.logout.assert_called_once()
+            with session.connection_ctx() as conn:
+                assert conn._pooled.client is new_client
+        old_client.logout.assert_called_once()
+        assert [c.client for c in session.pool] == [new_client]
+
+    def test_reap_idle(self):
+        session = AccountSession("test", idle_timeout=10)
+        stale_client = Mock(spec=IMAPClient)
+        fresh_client = Mock(spec=IMAPClient)
+        _add_pooled(session, stale_client, age=20)
+        _add_pooled(session, fresh_client, age=1)
+
+        assert session.reap_idle() == 1
 
-    def test_get_connection_recreates_on_noop_failure(self):
-        """Connection recreated if NOOP fails."""
+        stale_client.logout.assert_called_once()
+        assert [c.client for c in session.pool] == [fresh_client]
+
+    def test_recreates_on_noop_failure(self):
+        """Connection recreated if health-check NOOP fails."""
         session = AccountSession("test")
         old_client = Mock(spec=IMAPClient)
         old_client.noop.side_effect = Exception("Connection lost")
         new_client = Mock(spec=IMAPClient)
-        session.connection = old_client
-        session.last_activity = time.time()
+        _add_pooled(session, old_client, age=LIVENESS_WINDOW + 1)
 
         with patch("session._create_connection", return_value=new_client):
-            conn = session.get_connection()
-            assert conn is new_client
+            with session.connection_ctx() as conn:
+                assert conn._pooled.client is new_client
+
+    def test_health_check_disabled_skips_noop(self):
+        session = AccountSession("test", health_check=False)
+        mock_client = Mock(spec=IMAPClient)
+        _add_pooled(session, mock_client, age=LIVENESS_WINDOW + 1)
+
+        with session.connection_ctx():
+            pass
+
+        mock_client.noop.assert_not_called()
+
+    def test_busy_connection_not_shared(self):
+        """A connection in use is never handed out twice; a second one is opened."""
+        session = AccountSession("test")
+        first = Mock(spec=IMAPClient)
+        second = Mock(spec=IMAPClient)
+
+        with patch("session._create_connection", side_effect=[first, second]):
+            with session.connection_ctx() as outer, session.connection_ctx() as inner:
+                assert outer._pooled.client is first
+                assert inner._pooled.client is second
+
+        assert len(session.pool) == 2
+
+    def test_pool_size_limits_connections(self):
+        """When pool is full, checkout waits for a release."""
+        session = AccountSession("test", pool_size=1)
+        mock_client = Mock(spec=IMAPClient)
+        _add_pooled(session, mock_client)
+        got = []
+
+        def worker():
+            with session.connection_ctx() as conn:
+                got.append(conn._pooled.client)
+
+        with patch("session._create_connection") as create:
+            with session.connection_ctx():
+                thread = threading.Thread(target=worker)
+                thread.start()
+                thread.join(timeout=0.2)
+                assert thread.is_alive()  # Blocked on full pool
+            thread.join(timeout=2)
+            create.assert_not_called()
+
+        assert got == [mock_client]
+
+    def test_pool_wait_timeout_raises(self):
+        session = AccountSession("test", pool_size=1)
+        _add_pooled(session, Mock(spec=IMAPClient))
+
+        with patch("session.POOL_WAIT_TIMEOUT", 0.05), session.connection_ctx():
+            with pytest.raises(IMAPError, match="busy"):
+                with session.connection_ctx():
+                    pass
+
+
+class TestFolderRouting:
+    def test_same_folder_skips_select(self):
+        """Connection that already has the folder selected is reused without SELECT."""
+        session = AccountSession("test")
+        mock_client = Mock(spec=IMAPClient)
+        _add_pooled(session, mock_client, folder="INBOX", readonly=True)
+
+        with session.connection_ctx("INBOX") as conn:
+            assert conn._pooled.client is mock_client
+
+        mock_client.select_folder.assert_not_called()
+
+    def test_different_mode_reselects(self):
+        """Read-only selection does not satisfy a writable request."""
+        session = AccountSession("test")
+        mock_client = Mock(spec=IMAPClient)
+        pooled = _add_pooled(session, mock_client, folder="INBOX", readonly=True)
+
+        with session.connection_ctx("INBOX", readonly=False):
+            pass
+
+        mock_client.select_folder.assert_called_once_with("INBOX", readonly=False)
+        assert pooled.readonly is False
+
+    def test_routes_to_connection_with_folder_selected(self):
+        session = AccountSession("test")
+        inbox_client = Mock(spec=IMAPClient)
+        drafts_client = Mock(spec=IMAPClient)
+        _add_pooled(session, inbox_client, folder="INBOX", age=5)
+        _add_pooled(session, drafts_client, folder="Drafts", age=10)
+
+        with session.connection_ctx("INBOX") as conn:
+            assert conn._pooled.client is inbox_client
+        with session.connection_ctx("Drafts") as conn:
+            assert conn._pooled.client is drafts_client
+
+        inbox_client.select_folder.assert_not_called()
+        drafts_client.select_folder.assert_not_called()
+
+    def test_select_failure_raises_imap_error(self):
+        session = AccountSession("test")
+        mock_client = Mock(spec=IMAPClient)
+        mock_client.select_folder.side_effect = IMAPClientError("NO no such folder")
+        pooled = _add_pooled(session, mock_client, folder="INBOX")
+
+        with pytest.raises(IMAPError, match="Cannot open folder 'Nope'"):
+            with session.connection_ctx("Nope"):
+                pass
+
+        assert pooled.selected_folder is None
+        assert pooled.in_use is False
+
+    def test_unscoped_use_forgets_selection(self):
+        """Without folder, the caller may select anything; remembered folder is dropped."""
+        session = AccountSession("test")
+        mock_client = Mock(spec=IMAPClient)
+        pooled = _add_pooled(session, mock_client, folder="INBOX")
+
+        with session.connection_ctx():
+            pass
+
+        assert pooled.selected_folder is None
+
+
+class TestLiveness:
+    def test_recent_connection_trusted_without_noop(self):
+        session = AccountSession("test")
+        mock_client = Mock(spec=IMAPClient)
+        _add_pooled(session, mock_client, age=1)
+
+        with session.connection_ctx():
+            pass
+
+        mock_client.noop.assert_not_called()
+        assert session.stats.noops_skipped == 1
+
+    def test_connection_past_window_gets_noop(self):
+        session = AccountSession("test")
+        mock_client = Mock(spec=IMAPClient)
+        _add_pooled(session, mock_client, age=LIVENESS_WINDOW + 1)
+
+        with session.connection_ctx():
+            pass
+
+        mock_client.noop.assert_called_once()
+        assert session.stats.noops == 1
+
+    def test_dead_socket_reconnects_and_replays_once(self):
+        """First command on a trusted-but-dead socket is replayed on a fresh connection."""
+        session = AccountSession("test")
+        dead_client = Mock(spec=IMAPClient)
+        dead_client.fetch.side_effect = BrokenPipeError("socket closed")
+        new_client = Mock(spec=IMAPClient)
+        new_client.fetch.return_value = {1: {b"FLAGS": []}}
+        pooled = _add_pooled(session, dead_client, folder="INBOX", age=1)
+
+        with patch("session._create_connection", return_value=new_client), session.connection_ctx("INBOX") as conn:
+            result = conn.fetch([1], ["FLAGS"])
+
+        assert result == {1: {b"FLAGS": []}}
+        new_client.select_folder.assert_called_once_with("INBOX", readonly=True)
+        new_client.fetch.assert_called_once_with([1], ["FLAGS"])
+        assert pooled.client is new_client
+        assert session.stats.replays == 1
+        assert session.stats.reconnects == 1
+
+    def test_no_replay_after_verified_command(self):
+        """Once a command succeeded, a later socket error is raised, not replayed."""
+        session = AccountSession("test")
+        mock_client = Mock(spec=IMAPClient)
+        mock_client.fetch.side_effect = BrokenPipeError("socket closed")
+        _add_pooled(session, mock_client, age=1)
+
+        with patch("session._create_connection") as create:
+            with pytest.raises(BrokenPipeError), session.connection_ctx() as conn:
+                conn.search(["ALL"])
+                conn.fetch([1], ["FLAGS"])
+            create.assert_not_called()
+
+        assert session.pool == []
+
+    def test_trusted_mutating_command_skips_noop(self):
+        """APPEND on a connection used within the window is the only round-trip."""
+        session = AccountSession("test")
+        mock_client = Mock(spec=IMAPClient)
+        _add_pooled(session, mock_client, age=1)
+
+        with session.connection_ctx() as conn:
+            conn.append("Drafts", b"msg")
+
+        assert [c[0] for c in mock_client.method_calls] == ["append"]
+
+    def test_untrusted_mutating_command_probes_with_noop(self):
+        """APPEND opening an unchecked checkout on a dead socket is sent once, after a NOOP recovered the connection."""
+        session = AccountSession("test", health_check=False)
+        dead_client = Mock(spec=IMAPClient)
+        dead_client.noop.side_effect = BrokenPipeError("socket closed")
+        new_client = Mock(spec=IMAPClient)
+        _add_pooled(session, dead_client, age=LIVENESS_WINDOW + 1)
+
+        with patch("session._create_connection", return_value=new_client), session.connection_ctx() as conn:
+            conn.append("Drafts", b"msg")
+
+        dead_client.append.assert_not_called()
+        new_client.noop.assert_called_once()
+        new_client.append.assert_called_once_with("Drafts", b"msg")
+
+    @pytest.mark.parametrize("method", ["append", "multiappend", "add_flags", "move", "expunge"])
+    def test_non_idempotent_command_not_replayed(self, method):
+        """A socket error during a mutating command is raised: the server may have run it."""
+        session = AccountSession("test")
+        mock_client = Mock(spec=IMAPClient)
+        getattr(mock_client, method).side_effect = BrokenPipeError("socket closed")
+        _add_pooled(session, mock_client, age=1)
+
+        with patch("session._create_connection") as create:
+            with pytest.raises(BrokenPipeError), session.connection_ctx() as conn:
+                getattr(conn, method)("Drafts")
+            create.assert_not_called()
+
+        getattr(mock_client, method).assert_called_once()
+        assert session.stats.replays == 0
+
+    def test_timeout_not_replayed(self):
+        """A slow server is not a dead socket; the command is not sent twice."""
+        session = AccountSession("test")
+        mock_client = Mock(spec=IMAPClient)
+        mock_client.search.side_effect = TimeoutError("timed out")
+        _add_pooled(session, mock_client, age=1)
+
+        with patch("session._create_connection") as create:
+            with pytest.raises(TimeoutError), session.connection_ctx() as conn:
+                conn.search(["ALL"])
+            create.assert_not_called()
+
+    def test_round_trip_accounting_shows_savings(self):
+        """Repeated operations on one folder save a NOOP and a SELECT each."""
+        session = AccountSession("test")
+        mock_client = Mock(spec=IMAPClient)
+        mock_client.search.return_value = []
+
+        with patch("session._create_connection", return_value=mock_client):
+            for _ in range(5):
+                with session.connection_ctx("INBOX") as conn:
+                    conn.search(["ALL"])
+
+        summary = session.stats.summary()
+        mock_client.noop.assert_not_called()
+        assert mock_client.select_folder.call_count == 1
+        assert summary["noops_skipped"] == 4  # First checkout logged in fresh
+        assert summary["selects_skipped"] == 4
+        assert summary["saved_round_trips"] == 8
+        assert summary["commands"] == 6  # 1 SELECT + 5 SEARCH
+        assert summary["saved_ms_estimate"] is not None
 
 
 class TestConnectionContextManager:
@@ -96,33 +386,32 @@ class TestConnectionContextManager:
 
         with patch("session._create_connection", return_value=mock_client):
             with session.connection_ctx() as conn:
-                assert conn is mock_client
+                assert conn._pooled.client is mock_client
 
     def test_context_manager_updates_activity(self):
         """Context manager updates last_activity on exit."""
         session = AccountSession("test")
         mock_client = Mock(spec=IMAPClient)
-        session.connection = mock_client
-        old_time = time.time() - 10  # 10 seconds ago, within timeout
-        session.last_activity = old_time
+        pooled = _add_pooled(session, mock_client, age=10)
+        old_time = pooled.last_activity
 
         with session.connection_ctx():
             pass
 
-        assert session.last_activity > old_time
+        assert pooled.last_activity > old_time
 
     def test_context_manager_closes_on_error_keeps_cache(self):
-        """Connection error closes connection but keeps caches."""
+        """Connection error drops connection but keeps caches."""
         session = AccountSession("test")
         mock_client = Mock(spec=IMAPClient)
-        session.connection = mock_client
-        session.last_activity = time.time()
+        _add_pooled(session, mock_client)
         session.folder_cache = FolderCache(folders=[{"name": "INBOX"}], fetched_at=1.0)
 
         with pytest.raises(IMAPClientError), session.connection_ctx():
             raise IMAPClientError("Test error")
 
-        assert session.connection is None  # Connection closed
+        assert session.pool == []  # Connection dropped
+        mock_client.logout.assert_called_once()
         assert session.folder_cache is not None  # Cache preserved
 
 
@@ -149,8 +438,7 @@ class TestFolderCaching:
         session = AccountSession("test")
         session.folder_cache = FolderCache(folders=[{"name": "INBOX", "flags": []}], fetched_at=time.time())
         mock_client = Mock(spec=IMAPClient)
-        session.connection = mock_client
-        session.last_activity = time.time()
+        _add_pooled(session, mock_client)
 
         folders = session.get_folders()
 
@@ -158,6 +446,61 @@ class TestFolderCaching:
         mock_client.list_folders.assert_not_called()
 
 
+class TestFolderRoles:
+    """Special-use role map from the folder list, cached with a TTL."""
+
+    def test_special_use_flags_from_plain_list(self):
+        """RFC 6154 attributes in the LIST response resolve roles with one LIST."""
+        session = AccountSession("test")
+        client = Mock(spec=IMAPClient)
+        client.list_folders.return_value = [
+            ([b"\\HasNoChildren"], b"/", "INBOX"),
+            ([b"\\HasNoChildren", b"\\Drafts"], b"/", "Entw\u00fcrfe"),
+            ([b"\\Sent"], b"/", "Gesendet"),
+        ]
+        _add_pooled(session, client)
+
+        assert session.get_folder_role("drafts") == "Entw\u00fcrfe"
+        assert session.get_folder_role("sent") == "Gesendet"
+        assert session.get_folder_role("archive") is None
+        client.list_folders.assert_called_once()
+
+    def test_stale_folder_list_is_listed_again(self):
+        """A folder listing older than the role TTL does not resolve roles."""
+        session = AccountSession("test")
+        session.folder_cache = FolderCache(folders=[{"name": "Old", "flags": ["\\Drafts"]}], fetched_at=time.time() - FOLDER_ROLES_TTL)
+        client = Mock(spec=IMAPClient)
+        client.list_folders.return_value = [([b"\\Drafts"], b"/", "New")]
+        _add_pooled(session, client)
+
+        assert session.get_folder_role("drafts") == "New"
+
+    def test_without_special_use_falls_back_to_names(self):
+        session = AccountSession("test")
+        session.folder_cache = FolderCache(
+            folders=[
+                {"name": "INBOX", "flags": []},
+                {"name": "INBOX.Drafts", "flags": []},
+                {"name": "Spam", "flags": []},
+                {"name": "Papierkorb", "flags": ["\\Trash"]},
+            ],
+            fetched_at=time.time(),
+        )
+        _add_pooled(session, Mock(spec=IMAPClient))
+
+        assert session.get_folder_role("drafts") == "INBOX.Drafts"
+        assert session.get_folder_role("junk") == "Spam"
+        assert session.get_folder_role("trash") == "Papierkorb"
+
+    def test_expired_map_is_resolved_again(self):
+        session = AccountSession("test")
+        session.folder_roles = FolderRoles(roles={"drafts": "Old"}, fetched_at=time.time() - FOLDER_ROLES_TTL)
+        session.folder_cache = FolderCache(folders=[{"name": "Drafts", "flags": ["\\Drafts"]}], fetched_at=time.time())
+        _add_pooled(session, Mock(spec=IMAPClient))
+
+        assert session.get_folder_role("drafts") == "Drafts"
+
+
 class TestMessageListCaching:
     def test_get_messages_fetches_on_miss(self):
         """First call fetches from server."""
@@ -192,10 +535,9 @@ class TestMessageListCaching:
         )
         mock_client = Mock(spec=IMAPClient)
         mock_client.select_folder.return_value = {b"UIDVALIDITY": 12345, b"UIDNEXT": 100, b"EXISTS": 50}
-        session.connection = mock_client
-        session.last_activity = time.time()
+        _add_pooled(session, mock_client)
 
-        messages = session.get_messages("Drafts", limit=10)
+        messages = session.get_messages("Drafts", limit=1)
 
         assert messages[0]["subject"] == "Cached"
         mock_client.search.assert_not_called()
@@ -225,8 +567,7 @@ class TestMessageListCaching:
                 b"BODYSTRUCTURE": None,
             },
         }
-        session.connection = mock_client
-        session.last_activity = time.time()
+        _add_pooled(session, mock_client)
 
         session.get_messages("Drafts", limit=10)
 
@@ -234,6 +575,402 @@ class TestMessageListCaching:
         assert session.message_cache["Drafts"].uidnext == 101
 
 
+class TestPersistentSummaries:
+    """Summaries persisted to disk survive a new session (process restart)."""
+
+    SELECT = {b"UIDVALIDITY": 12345, b"UIDNEXT": 100, b"EXISTS": 2}
+
+    def _fetching_client(self):
+        client = Mock(spec=IMAPClient)
+        client.select_folder.return_value = dict(self.SELECT)
+        client.search.return_value = [1, 2]
+        client.fetch.return_value = {
+            2: {
+                b"ENVELOPE": Mock(subject=b"New", from_=[Mock(name=None, mailbox=b"a", host=b"b.com")], date=None),
+                b"FLAGS": [b"\\Seen"],
+                b"RFC822.SIZE": 2048,
+                b"BODYSTRUCTURE": None,
+            },
+            1: {
+                b"ENVELOPE": Mock(subject=b"Old", from_=[Mock(name=None, mailbox=b"c", host=b"d.com")], date=None),
+                b"FLAGS": [],
+                b"RFC822.SIZE": 1024,
+                b"BODYSTRUCTURE": None,
+            },
+        }
+        return client
+
+    def test_cold_start_costs_one_select(self, tmp_path):
+        """A fresh session with a valid disk cache issues only SELECT."""
+        cache = SummaryCache(tmp_path / "s.sqlite3")
+        warm = AccountSession("test", summary_cache=cache)
+        _add_pooled(warm, self._fetching_client())
+        expected = warm.get_messages("INBOX", limit=10)
+
+        cold = AccountSession("test", summary_cache=cache)
+        client = Mock(spec=IMAPClient)
+        client.select_folder.return_value = dict(self.SELECT)
+        _add_pooled(cold, client)
+
+        messages = cold.get_messages("INBOX", limit=10)
+
+        assert messages == expected
+        assert [m["subject"] for m in messages] == ["New", "Old"]
+        client.select_folder.assert_called_once()
+        client.search.assert_not_called()
+        client.fetch.assert_not_called()
+        assert cold.message_cache["INBOX"].uidnext == 100
+
+    def test_other_uidvalidity_refetches(self, tmp_path):
+        """Disk state from an older UIDVALIDITY is ignored."""
+        cache = SummaryCache(tmp_path / "s.sqlite3")
+        cache.store("test", "INBOX", 999, 100, 2, [{"id": 1, "subject": "Stale"}])
+        session = AccountSession("test", summary_cache=cache)
+        client = self._fetching_client()
+        _add_pooled(session, client)
+
+        messages = session.get_messages("INBOX", limit=10)
+
+        client.search.assert_called_once_with(["1:*"])
+        assert messages[0]["subject"] == "New"
+        assert cache.load("test", "INBOX", 12345).messages == messages
+
+    def test_stale_disk_state_resumes_with_delta(self, tmp_path):
+        """New mail since the last process is fetched as a delta on top of disk state."""
+        cache = SummaryCache(tmp_path / "s.sqlite3")
+        cache.store("test", "INBOX", 12345, 2, 1, [{"id": 1, "subject": "Old", "flags": []}])
+        session = AccountSession("test", summary_cache=cache)
+        client = self._fetching_client()
+        client.search.return_value = [2]
+        _add_pooled(session, client)
+
+        messages = session.get_messages("INBOX", limit=10)
+
+        client.search.assert_called_once_with(["UID", "2:*"])
+        client.fetch.assert_called_once_with([2], ["ENVELOPE", "FLAGS", "RFC822.SIZE", "BODYSTRUCTURE"])
+        assert [m["subject"] for m in messages] == ["New", "Old"]
+        assert cache.load("test", "INBOX", 12345).uidnext == 100
+
+    def test_invalidate_and_flag_update_reach_disk(self, tmp_path):
+        cache = SummaryCache(tmp_path / "s.sqlite3")
+        session = AccountSession("test", summary_cache=cache)
+        _add_pooled(session, self._fetching_client())
+        session.get_messages("INBOX", limit=10)
+        _sessions.clear()
+        _sessions["test"] = session
+
+        update_cached_flags("test", "INBOX", 1, ["Flagged"])
+        assert cache.load("test", "INBOX", 12345).messages[1]["flags"] == ["Flagged"]
+
+        invalidate_message_cache("test", "INBOX")
+        assert cache.load("test", "INBOX", 12345) is None
+        _sessions.clear()
+
+
+class TestIncrementalResync:
+    """CONDSTORE/QRESYNC deltas applied to the cached list."""
+
+    def _session(self, qresync: bool = True, modseq: int = 500, select: dict | None = None):
+        session = AccountSession("test")
+        session.message_cache["INBOX"] = MessageListCache(
+            messages=[
+                {"id": 3, "subject": "C", "flags": []},
+                {"id": 2, "subject": "B", "flags": []},
+                {"id": 1, "subject": "A", "flags": ["Seen"]},
+            ],
+            uidvalidity=1,
+            uidnext=4,
+            exists=3,
+            highestmodseq=500,
+        )
+        client = Mock(spec=IMAPClient)
+        client.has_capability.side_effect = lambda name: qresync or name == "CONDSTORE"
+        client.select_folder.return_value = {b"UIDVALIDITY": 1, b"UIDNEXT": 4, b"EXISTS": 3, b"HIGHESTMODSEQ": modseq, **(select or {})}
+        client._imap = Mock(untagged_responses={})
+        _add_pooled(session, client)
+        return session, client
+
+    def test_unchanged_modseq_is_cache_hit(self):
+        session, client = self._session()
+
+        session.get_messages("INBOX")
+
+        client.fetch.assert_not_called()
+
+    def test_flag_change_fetched_with_changedsince(self):
+        """Flag change by another client is picked up without refetching envelopes."""
+        session, client = self._session(modseq=510)
+        client.fetch.return_value = {2: {b"FLAGS": (b"\\Seen", b"\\Flagged"), b"MODSEQ": (510,)}}
+
+        messages = session.get_messages("INBOX")
+
+        client.fetch.assert_called_once_with([3, 2, 1], ["FLAGS"], modifiers=["CHANGEDSINCE 500", "VANISHED"])
+        client.search.assert_not_called()
+        assert messages[1]["flags"] == ["Seen", "Flagged"]
+        assert session.message_cache["INBOX"].highestmodseq == 510
+
+    def test_vanished_outside_window_keeps_list(self):
+        """EARLIER expunge of a message older than the cached window drops nothing from it."""
+        session, client = self._session(modseq=520, select={b"EXISTS": 2})
+        session.message_cache["INBOX"].messages = session.message_cache["INBOX"].messages[:2]  # UIDs 3, 2 of 3
+        client.fetch.return_value = {}
+        client._imap.untagged_responses["VANISHED"] = [b"(EARLIER) 1"]
+
+        messages = session.get_messages("INBOX", limit=2)
+
+        assert [m["id"] for m in messages] == [3, 2]
+        client.search.assert_not_called()
+
+    def test_vanished_inside_full_window_drops_message(self):
+        """An expunge inside a window that holds the whole folder needs no refetch."""
+        session, client = self._session(modseq=520, select={b"EXISTS": 2})
+        client.fetch.return_value = {}
+        client._imap.untagged_responses["VANISHED"] = [b"(EARLIER) 2"]
+
+        messages = session.get_messages("INBOX")
+
+        assert [m["id"] for m in messages] == [3, 1]
+        client.search.assert_not_called()
+
+    def test_vanished_with_older_mail_refetches(self):
+        """Expunge inside the window with older mail on the server needs a refetch."""
+        session, client = self._session(modseq=520, select={b"EXISTS": 5})
+        client.fetch.return_value = {}
+        client._imap.untagged_responses["VANISHED"] = [b"(EARLIER) 1:2"]
+        client.search.return_value = []
+
+        session.get_messages("INBOX")
+
+        client.search.assert_called_once()
+
+    def test_condstore_without_qresync_refetches_on_exists_change(self):
+        session, client = self._session(qresync=False, modseq=520, select={b"EXISTS": 2})
+        client.search.return_value = []
+
+        session.get_messages("INBOX")
+
+        client.search.assert_called_once()
+
+    def test_condstore_without_qresync_omits_vanished(self):
+        session, client = self._session(qresync=False, modseq=510)
+        client.fetch.return_value = {}
+
+        session.get_messages("INBOX")
+
+        client.fetch.assert_called_once_with([3, 2, 1], ["FLAGS"], modifiers=["CHANGEDSINCE 500"])
+
+    def test_new_mail_fetched_with_flag_changes(self):
+        """New mail and flag changes on older messages in one resync."""
+        session, client = self._session(modseq=510, select={b"UIDNEXT": 5, b"EXISTS": 4})
+        client.search.return_value = [4]
+        client.fetch.side_effect = [
+            {3: {b"FLAGS": (b"\\Seen",)}},
+            {4: {b"ENVELOPE": Mock(subject=b"D", from_=[], date=None), b"FLAGS": [], b"BODYSTRUCTURE": None}},
+        ]
+
+        messages = session.get_messages("INBOX")
+
+        assert [m["id"] for m in messages] == [4, 3, 2, 1]
+        assert messages[1]["flags"] == ["Seen"]
+
+    def test_rejected_changedsince_refetches(self):
+        session, client = self._session(modseq=510)
+        client.fetch.side_effect = [IMAPClientError("BAD"), {}]
+        client.search.return_value = []
+
+        session.get_messages("INBOX")
+
+        client.search.assert_called_once()
+
+
+class TestAppendDelta:
+    """Only UIDs at or above the cached UIDNEXT are fetched when new mail arrives."""
+
+    def _session(self, uidnext: int, exists: int, messages: int = 3):
+        session = AccountSession("test")
+        session.message_cache["INBOX"] = MessageListCache(
+            messages=[{"id": uid, "subject": f"m{uid}", "flags": []} for uid in range(messages, 0, -1)],
+            uidvalidity=1,
+            uidnext=messages + 1,
+            exists=messages,
+        )
+        client = Mock(spec=IMAPClient)
+        client.select_folder.return_value = {b"UIDVALIDITY": 1, b"UIDNEXT": uidnext, b"EXISTS": exists}
+        client.fetch.side_effect = lambda uids, items: {
+            uid: {b"ENVELOPE": Mock(subject=f"m{uid}".encode(), from_=[], date=None), b"FLAGS": [], b"BODYSTRUCTURE": None} for uid in uids
+        }
+        _add_pooled(session, client)
+        return session, client
+
+    def test_prepends_new_messages(self):
+        session, client = self._session(uidnext=6, exists=5)
+        client.search.return_value = [4, 5]
+
+        messages = session.get_messages("INBOX", limit=10)
+
+        client.search.assert_called_once_with(["UID", "4:*"])
+        client.fetch.assert_called_once_with([5, 4], ["ENVELOPE", "FLAGS", "RFC822.SIZE", "BODYSTRUCTURE"])
+        assert [m["id"] for m in messages] == [5, 4, 3, 2, 1]
+        assert session.message_cache["INBOX"].uidnext == 6
+
+    def test_trims_to_window(self):
+        session, client = self._session(uidnext=6, exists=5)
+        client.search.return_value = [4, 5]
+
+        messages = session.get_messages("INBOX", limit=3)
+
+        assert [m["id"] for m in messages] == [5, 4, 3]
+        assert [m["id"] for m in session.message_cache["INBOX"].messages] == [5, 4, 3]
+
+    def test_star_match_below_uidnext_ignored(self):
+        """Server answers "N:*" with the highest UID even if it is below N."""
+        session, client = self._session(uidnext=5, exists=3)
+        client.search.return_value = [3]
+
+        messages = session.get_messages("INBOX", limit=10)
+
+        client.fetch.assert_not_called()
+        assert [m["id"] for m in messages] == [3, 2, 1]
+
+    def test_removal_forces_full_refresh(self):
+        """EXISTS lower than cached + new means something was expunged."""
+        session, client = self._session(uidnext=6, exists=4)
+        client.search.side_effect = [[4, 5], [1, 3, 4, 5]]
+
+        messages = session.get_messages("INBOX", limit=10)
+
+        assert client.search.call_args_list[-1].args == (["1:*"],)
+        assert [m["id"] for m in messages] == [5, 4, 3, 1]
+
+
+class TestCoverageWindow:
+    """Cached list grows downward instead of truncating."""
+
+    def _session(self, cached: int, exists: int = 10):
+        """Folder with UIDs 1..exists, the newest `cached` of them in cache."""
+        session = AccountSession("test")
+        session.message_cache["INBOX"] = MessageListCache(
+            messages=[{"id": uid, "subject": f"m{uid}", "flags": []} for uid in range(exists, exists - cached, -1)],
+            uidvalidity=1,
+            uidnext=exists + 1,
+            exists=exists,
+        )
+        client = Mock(spec=IMAPClient)
+        client.select_folder.return_value = {b"UIDVALIDITY": 1, b"UIDNEXT": exists + 1, b"EXISTS": exists}
+        client.has_capability.return_value = False
+
+        def search(criteria):
+            low, _, high = criteria[-1].partition(":")
+            high = exists if high == "*" else int(high)
+            return list(range(int(low), high + 1))
+
+        client.search.side_effect = search
+        client.fetch.side_effect = lambda uids, items: {
+            uid: {b"ENVELOPE": Mock(subject=f"m{uid}".encode(), from_=[], date=None), b"FLAGS": [], b"BODYSTRUCTURE": None} for uid in uids
+        }
+        _add_pooled(session, client)
+        return session, client
+
+    def test_larger_limit_fetches_only_missing_range(self):
+        session, client = self._session(cached=3)
+
+        messages = session.get_messages("INBOX", limit=5)
+
+        client.search.assert_called_once_with(["6:7"])
+        client.fetch.assert_called_once_with([7, 6], ["ENVELOPE", "FLAGS", "RFC822.SIZE", "BODYSTRUCTURE"])
+        assert [m["id"] for m in messages] == [10, 9, 8, 7, 6]
+        assert len(session.message_cache["INBOX"].messages) == 5
+
+    def test_smaller_limit_served_from_window(self):
+        session, client = self._session(cached=5)
+
+        messages = session.get_messages("INBOX", limit=2)
+
+        client.search.assert_not_called()
+        assert [m["id"] for m in messages] == [10, 9]
+
+    def test_small_folder_fully_covered(self):
+        session, client = self._session(cached=3, exists=3)
+
+        assert len(session.get_messages("INBOX", limit=50)) == 3
+        client.search.assert_not_called()
+
+    def test_before_uid_inside_window(self):
+        session, client = self._session(cached=5)
+
+        messages = session.get_messages("INBOX", limit=2, before_uid=9)
+
+        client.search.assert_not_called()
+        assert [m["id"] for m in messages] == [8, 7]
+
+    def test_before_uid_at_window_edge_grows(self):
+        """Walking pages extends the cache by one page each time."""
+        session, client = self._session(cached=3)
+
+        messages = session.get_messages("INBOX", limit=3, before_uid=8)
+
+        client.search.assert_called_once_with(["5:7"])
+        assert [m["id"] for m in messages] == [7, 6, 5]
+        assert [m["id"] for m in session.message_cache["INBOX"].messages] == [10, 9, 8, 7, 6, 5]
+
+    def test_before_uid_past_folder_start(self):
+        session, client = self._session(cached=3, exists=3)
+
+        assert session.get_messages("INBOX", limit=3, before_uid=1) == []
+
+    def test_before_uid_outside_window_pages_directly(self):
+        session, client = self._session(cached=3, exists=10)
+
+        messages = session.get_messages("INBOX", limit=2, before_uid=4)
+
+        client.search.assert_called_once_with(["UID", "1:3"])
+        assert [m["id"] for m in messages] == [3, 2]
+        assert len(session.message_cache["INBOX"].messages) == 3
+
+    def test_growth_capped(self):
+        with patch("session.CACHE_WINDOW_MAX", 4):
+            session, client = self._session(cached=3)
+
+            messages = session.get_messages("INBOX", limit=3, before_uid=8)
+
+        client.search.assert_called_once_with(["UID", "1:7"])
+        assert [m["id"] for m in messages] == [7, 6, 5]
+        assert len(session.message_cache["INBOX"].messages) == 3
+
+
+class TestResyncHelpers:
+    def test_enable_prefers_qresync(self):
+        client = Mock(spec=IMAPClient)
+        client.has_capability.return_value = True
+
+        _enable_resync(client)
+
+        client.enable.assert_called_once_with("QRESYNC")
+
+    def test_enable_falls_back_to_condstore(self):
+        client = Mock(spec=IMAPClient)
+        client.has_capability.side_effect = lambda name: name == "CONDSTORE"
+
+        _enable_resync(client)
+
+        client.enable.assert_called_once_with("CONDSTORE")
+
+    def test_enable_skipped_without_support(self):
+        client = Mock(spec=IMAPClient)
+        client.has_capability.return_value = False
+
+        _enable_resync(client)
+
+        client.enable.assert_not_called()
+
+    def test_pop_vanished_parses_sets_and_ranges(self):
+        client = Mock(spec=IMAPClient)
+        client._imap = Mock(untagged_responses={"VANISHED": [b"(EARLIER) 41,43:45", b"99"]})
+
+        assert _pop_vanished(client, [40, 41, 42, 44, 99, 100]) == {41, 44, 99}
+        assert "VANISHED" not in client._imap.untagged_responses
+
+
 class TestSessionManagement:
     def setup_method(self):
         """Clear sessions before each test."""
@@ -269,6 +1006,23 @@ class TestSessionManagement:
         assert "Drafts" not in session.message_cache
         assert "INBOX" in session.message_cache
 
+    def test_failed_login_invalidates_credentials(self):
+        """A rejected password is read from the keychain again on the next connect."""
+        from imapclient.exceptions import LoginError
+        from session import _create_connection
+
+        client = Mock(spec=IMAPClient)
+        client.login.side_effect = LoginError("AUTHENTICATIONFAILED")
+        with (
+            patch("session.IMAPClient", return_value=client),
+            patch("imap_client.get_credentials", return_value=("imap.example.com", "993", "me", "old")),
+            patch("imap_client.invalidate_credentials") as invalidate,
+        ):
+            with pytest.raises(LoginError):
+                _create_connection("work")
+
+        invalidate.assert_called_once()
+
 
 class TestCacheUpdateOnFlags:
     def setup_method(self):
@@ -304,3 +1058,132 @@ class TestCacheUpdateOnFlags:
         update_cached_flags("test", "Drafts", 999, ["Seen"])  # No error
 
         assert session.message_cache["Drafts"].messages[0]["flags"] == []
+
+
+class TestParsedMessageCache:
+    def setup_method(self):
+        _sessions.clear()
+
+    def _session(self, uidvalidity: int = 7):
+        session = AccountSession("test")
+        client = Mock(spec=IMAPClient)
+        client.select_folder.return_value = {b"UIDVALIDITY": uidvalidity, b"UIDNEXT": 10, b"EXISTS": 9}
+        client.fetch.side_effect = lambda uids, items: {
+            uids[0]: {b"RFC822": b"Subject: Hi\r\n\r\nbody", b"ENVELOPE": "env", b"FLAGS": (b"\\Draft",)}
+        }
+        _add_pooled(session, client)
+        return session, client
+
+    def test_lru_evicts_oldest_by_bytes(self):
+        """Entries beyond the byte budget are evicted least recently used first."""
+        cache = ParsedMessageCache(max_bytes=3000)
+        cache.put(("INBOX", 1, 1), {b"RFC822": b"x" * 1000})
+        cache.put(("INBOX", 1, 2), {b"RFC822": b"x" * 1000})
+        cache.get(("INBOX", 1, 1))
+        cache.put(("INBOX", 1, 3), {b"RFC822": b"x" * 1000})
+
+        assert cache.get(("INBOX", 1, 2)) is None
+        assert cache.get(("INBOX", 1, 1)) is not None
+        assert cache.size <= 3000
+
+    def test_oversized_entry_not_retained(self):
+        """A message bigger than the budget is returned but not kept."""
+        cache = ParsedMessageCache(max_bytes=500)
+        entry = cache.put(("INBOX", 1, 1), {b"RFC822": b"x" * 1000})
+
+        assert entry.items[b"RFC822"] == b"x" * 1000
+        assert len(cache) == 0
+        assert cache.size == 0
+
+    def test_repeat_fetch_costs_no_round_trip(self):
+        """Second fetch of the same items is served without a connection."""
+        session, client = self._session()
+
+        first = session.fetch_message("Drafts", 5, ["RFC822", "ENVELOPE", "FLAGS"])
+        with patch.object(session, "connection_ctx", side_effect=AssertionError("no connection expected")):
+            second = session.fetch_message("Drafts", 5, ["ENVELOPE"])
+
+        assert client.fetch.call_count == 1
+        assert second == {b"ENVELOPE": "env"}
+        assert first[b"RFC822"].endswith(b"body")
+        assert session.stats.fetches_cached == 1
+
+    def test_only_missing_items_are_fetched(self):
+        """Cached items are not requested again."""
+        session, client = self._session()
+        session.fetch_message("Drafts", 5, ["ENVELOPE"])
+        session.fetch_message("Drafts", 5, ["ENVELOPE", "FLAGS"])
+
+        assert client.fetch.call_args_list[1].args == ([5], ["FLAGS"])
+
+    def test_parsed_message_is_shared(self):
+        """The parsed form is built once and reused."""
+        session, client = self._session()
+        _, first = session.parsed_message("Drafts", 5)
+        _, second = session.parsed_message("Drafts", 5)
+
+        assert first is second
+        assert first["Subject"] == "Hi"
+        assert client.fetch.call_args_list[1].args == ([5], ["FLAGS"])
+
+    def test_uidvalidity_change_misses(self):
+        """Entries from an older UIDVALIDITY are not served."""
+        session, client = self._session()
+        session.fetch_message("Drafts", 5, ["ENVELOPE"])
+        session.uidvalidities["Drafts"] = 8
+
+        session.fetch_message("Drafts", 5, ["ENVELOPE"])
+
+        assert client.fetch.call_count == 2
+
+    def test_cached_text_built_once_per_message(self):
+        """Derived text is kept on the message's entry and counted in its size."""
+        session, _ = self._session()
+        session.fetch_message("Drafts", 5, ["RFC822"])
+        size = session.parsed_messages.size
+        build = Mock(return_value="converted")
+
+        assert session.cached_text("Drafts", 5, "html:full", build) == "converted"
+        assert session.cached_text("Drafts", 5, "html:full", build) == "converted"
+
+        build.assert_called_once()
+        assert session.parsed_messages.size == size + len("converted")
+
+    def test_cached_text_not_kept_for_uncached_message(self):
+        """Without a cached entry the text is built on every call."""
+        session, _ = self._session()
+        build = Mock(return_value="converted")
+
+        session.cached_text("Drafts", 5, "html:full", build)
+        session.cached_text("Drafts", 5, "html:full", build)
+
+        assert build.call_count == 2
+
+    def test_flags_always_fetched_live(self):
+        """FLAGS changed by another client are seen; they never enter the cache."""
+        session, client = self._session()
+        session.fetch_message("Drafts", 5, ["ENVELOPE", "FLAGS"])
+        client.fetch.side_effect = lambda uids, items: {uids[0]: {b"FLAGS": (b"\\Seen",)}}
+
+        assert session.fetch_message("Drafts", 5, ["ENVELOPE", "FLAGS"]) == {b"ENVELOPE": "env", b"FLAGS": (b"\\Seen",)}
+        assert client.fetch.call_args.args == ([5], ["FLAGS"])
+        assert all(b"FLAGS" not in entry.items for entry in session.parsed_messages._entries.values())
+
+    def test_message_expunged_elsewhere_reads_as_missing(self):
+        """A cached message whose live FLAGS fetch returns nothing is not found."""
+        session, client = self._session()
+        session.parsed_message("Drafts", 5)
+        client.fetch.side_effect = lambda uids, items: {}
+
+        assert session.parsed_message("Drafts", 5) is None
+
+    def test_invalidate_hook_drops_folder(self):
+        """invalidate_message_cache drops the folder."""
+        session, client = self._session()
+        _sessions["test"] = session
+        session.fetch_message("Drafts", 5, ["ENVELOPE"])
+
+        invalidate_message_cache("test", "Drafts")
+        assert len(session.parsed_messages) == 0
+        session.fetch_message("Drafts", 5, ["ENVELOPE"])
+        assert client.fetch.call_count == 2
@@ -0,0 +1,65 @@
+"""Benchmark markdown_utils.convert_body over a batch of drafts.
+
+Compares the per-thread reusable converter with building a new Markdown
+instance per draft (markdown.markdown), as convert_body did before.
+
+Usage:
+    python tests/imap-stream-mcp/bench_convert_body.py [drafts]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "imap-stream-mcp"))
+
+import markdown  # noqa: E402
+from markdown_utils import (  # noqa: E402
+    MARKDOWN_EXTENSION_CONFIGS,
+    MARKDOWN_EXTENSIONS,
+    autolink_urls,
+    convert_body,
+    markdown_to_plain,
+    preprocess_markdown,
+)
+
+DRAFTS = [
+    "Hi Alice,\n\nThanks for the **update**. A few notes:\n- ~~old plan~~ is dropped\n- ==deadline== is Friday\n\nSee https://example.com/status\n",
+    "# Agenda\n1. Status\n2. Budget :smile:\n\n> Quoted from last week\n\n- [x] done\n- [ ] open\n",
+    "Short reply with a [link](https://example.com) and __emphasis__.\n\n```\ncode block\n```\n",
+    "Reference style [docs][1] link.\n\n[1]: https://example.com/docs\n\nRegards,\nBob",
+]
+
+
+def reference_convert_body(body: str) -> tuple[str, str]:
+    """convert_body with a new Markdown instance per call."""
+    html_body = markdown.markdown(preprocess_markdown(body), extensions=MARKDOWN_EXTENSIONS, extension_configs=MARKDOWN_EXTENSION_CONFIGS)
+    return autolink_urls(html_body), markdown_to_plain(body)
+
+
+def drafts(count: int) -> list[str]:
+    """Count distinct draft bodies cycling through DRAFTS."""
+    return [f"{DRAFTS[n % len(DRAFTS)]}\nDraft {n}\n" for n in range(count)]
+
+
+def _time(func, bodies: list[str]) -> float:
+    """Wall-clock seconds to convert every body."""
+    start = time.perf_counter()
+    for body in bodies:
+        func(body)
+    return time.perf_counter() - start
+
+
+def main(count: int):
+    """Print time per batch for both converters."""
+    bodies = drafts(count)
+    assert [convert_body(body) for body in bodies[:20]] == [reference_convert_body(body) for body in bodies[:20]]
+    reference = _time(reference_convert_body, bodies)
+    reused = _time(convert_body, bodies)
+    print(
+        f"{count} drafts: new instance per draft {reference * 1000:.0f} ms, reused converter {reused * 1000:.0f} ms ({reference / reused:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
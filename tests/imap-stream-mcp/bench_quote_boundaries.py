@@ -0,0 +1,174 @@
+"""Benchmark quote boundary detection on multi-megabyte reply chains.
+
+Compares imap_client._find_all_boundaries with the previous three-pass
+implementation, kept here as the reference the equivalence tests check
+against.
+
+Usage:
+    python tests/imap-stream-mcp/bench_quote_boundaries.py [megabytes ...]
+"""
+
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "imap-stream-mcp"))
+
+from imap_client import _find_all_boundaries, _find_next_non_blank_line, _find_tail_quote_boundary, _is_quote_line  # noqa: E402
+
+OUTLOOK_HEADER = (
+    "________________________________\n"
+    "From: {name} <{user}@example.com>\n"
+    "Sent: Monday, February 24, 2026 10:00 AM\n"
+    "To: Team <team@example.com>\n"
+    "Subject: Re: Status\n"
+)
+LOCALIZED_HEADER = (
+    "Lähettäjä: {name} <{user}@example.fi>\n"
+    "Lähetetty: keskiviikko 23. huhtikuuta 2025 15.40\n"
+    "Vastaanottaja: Tiimi <tiimi@example.fi>\n"
+    "Aihe: Re: Tilanne\n"
+)
+CLASSIC_HEADER = "On Tue, 24 Feb 2026, {name} <{user}@example.com> wrote:\n"
+NAMES = ["Alice", "Bob", "Carol", "Dave", "Erin"]
+
+
+def reference_find_all_boundaries(lines: list[str]) -> list[int]:
+    """Three-pass boundary finder that _find_all_boundaries replaced."""
+    if not lines:
+        return []
+
+    outlook_candidates: list[int] = []
+    for idx in range(len(lines) - 1):
+        if not re.match(r"^_{30,}\s*$", lines[idx].strip()):
+            continue
+        next_idx = _find_next_non_blank_line(lines, idx + 1)
+        if next_idx is not None and lines[next_idx].lstrip().startswith("From:"):
+            outlook_candidates.append(idx)
+
+    localized_candidates: list[int] = []
+    localized_first_line = re.compile(r"^\w[\w\s]*:.*<[^>]+@[^>]+>")
+    localized_header_line = re.compile(r"^\w[\w\s]*:.+")
+    for idx, line in enumerate(lines):
+        if not localized_first_line.match(line.strip()):
+            continue
+
+        header_lines = 1
+        next_idx = idx + 1
+        while next_idx < len(lines):
+            next_line = lines[next_idx].strip()
+            if not next_line or not localized_header_line.match(next_line):
+                break
+            header_lines += 1
+            next_idx += 1
+
+        if header_lines >= 3:
+            localized_candidates.append(idx)
+
+    classic_candidates: list[int] = []
+    classic_pattern = re.compile(r"^\s*On .+wrote:\s*$", flags=re.IGNORECASE)
+    for idx, line in enumerate(lines):
+        if not classic_pattern.match(line):
+            continue
+        next_idx = _find_next_non_blank_line(lines, idx + 1)
+        if next_idx is not None and _is_quote_line(lines[next_idx]):
+            classic_candidates.append(idx)
+
+    outlook_set = set(outlook_candidates)
+    precedence = {"classic": 0, "localized": 1, "outlook": 2}
+    candidates: list[tuple[int, str]] = [(idx, "outlook") for idx in outlook_candidates]
+    candidates.extend((idx, "localized") for idx in localized_candidates)
+    candidates.extend((idx, "classic") for idx in classic_candidates if idx + 1 not in outlook_set)
+
+    if candidates:
+        best_by_index: dict[int, str] = {}
+        for idx, kind in candidates:
+            existing = best_by_index.get(idx)
+            if existing is None or precedence[kind] > precedence[existing]:
+                best_by_index[idx] = kind
+
+        merged: list[tuple[int, str]] = []
+        for idx in sorted(best_by_index):
+            kind = best_by_index[idx]
+            if not merged:
+                merged.append((idx, kind))
+                continue
+            prev_idx, prev_kind = merged[-1]
+            if idx - prev_idx <= 1 and {prev_kind, kind} == {"outlook", "localized"}:
+                if precedence[kind] > precedence[prev_kind]:
+                    merged[-1] = (idx, kind)
+                continue
+            merged.append((idx, kind))
+
+        filtered: list[int] = []
+        for idx, _ in merged:
+            if not filtered:
+                filtered.append(idx)
+                continue
+            prev_idx = filtered[-1]
+            non_blank_gap = sum(1 for line in lines[prev_idx + 1 : idx] if line.strip())
+            if non_blank_gap >= 3:
+                filtered.append(idx)
+
+        return filtered
+
+    fallback = _find_tail_quote_boundary(lines)
+    if fallback is None:
+        return []
+    return [fallback]
+
+
+def reply_chain(size: int, seed: int = 0) -> str:
+    """Build a forwarded/replied thread of about size bytes.
+
+    Layers mix Outlook, localized and classic headers with quoted and
+    unquoted bodies, like a long chain that went through several clients.
+    """
+    rng = random.Random(seed)
+    parts = ["Latest reply on top.\n\n"]
+    total = len(parts[0])
+    depth = 0
+    while total < size:
+        name = rng.choice(NAMES)
+        header = rng.choice([OUTLOOK_HEADER, LOCALIZED_HEADER, CLASSIC_HEADER]).format(name=name, user=name.lower())
+        depth = min(depth + 1, 8)
+        prefix = "> " * depth if header is CLASSIC_HEADER else ""
+        body = "".join(f"{prefix}Line {n} of a message from {name} about the status.\n" for n in range(rng.randint(2, 40)))
+        blank = "\n" if rng.random() < 0.7 else ""
+        part = f"{header}{blank}{body}\n"
+        parts.append(part)
+        total += len(part)
+    return "".join(parts)
+
+
+def _time(func, lines: list[str]) -> float:
+    """Best of three wall-clock runs in seconds."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        func(lines)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(sizes: list[float]):
+    """Print throughput of both implementations per chain size."""
+    print(f"{'MB':>6} {'lines':>9} {'boundaries':>10} {'reference MB/s':>15} {'scanner MB/s':>13} {'speedup':>8}")
+    for megabytes in sizes:
+        body = reply_chain(int(megabytes * 1024 * 1024))
+        lines = body.splitlines()
+        expected = reference_find_all_boundaries(lines)
+        assert _find_all_boundaries(lines) == expected
+        reference = _time(reference_find_all_boundaries, lines)
+        scanner = _time(_find_all_boundaries, lines)
+        size_mb = len(body.encode()) / (1024 * 1024)
+        print(
+            f"{size_mb:6.1f} {len(lines):9d} {len(expected):10d} {size_mb / reference:15.1f} {size_mb / scanner:13.1f}"
+            f" {reference / scanner:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main([float(arg) for arg in sys.argv[1:]] or [1, 4, 16])
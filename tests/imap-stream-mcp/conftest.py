@@ -1,5 +1,7 @@
 """Pytest configuration and shared fixtures for streammail tests."""
 
+import email
+import re
 import sys
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -19,6 +21,7 @@ class MockEnvelope:
     from_: list = field(default_factory=list)
     to: list = field(default_factory=list)
     cc: list = field(default_factory=list)
+    bcc: list = field(default_factory=list)
     date: Any = None
     message_id: bytes = b"<test@example.com>"
     in_reply_to: bytes | None = None
@@ -49,6 +52,96 @@ SIMPLE_TEXT_BODYSTRUCTURE = (
 )
 
 
+_DERIVE = object()  # add_message default: build BODYSTRUCTURE from raw_email
+
+
+def _bodystructure_params(part: email.message.Message, header: str) -> tuple | None:
+    """Flatten header parameters to an IMAP (key, value, ...) tuple."""
+    params = part.get_params(header=header) or []
+    flat: list[bytes] = []
+    for key, value in params[1:]:
+        if isinstance(value, tuple):
+            charset, language, text = value
+            flat += [f"{key}*".encode(), f"{charset or ''}'{language or ''}'{text}".encode()]
+        else:
+            flat += [key.encode(), str(value).encode()]
+    return tuple(flat) or None
+
+
+def build_bodystructure(part: email.message.Message) -> tuple:
+    """Build an imapclient-shaped BODYSTRUCTURE tuple for a parsed message.
+
+    Sizes are the encoded section sizes, as a server reports them.
+    """
+    maintype = part.get_content_maintype().upper().encode()
+    subtype = part.get_content_subtype().upper().encode()
+    params = _bodystructure_params(part, "content-type")
+    disposition_type = part.get_content_disposition()
+    disposition = (disposition_type.encode(), _bodystructure_params(part, "content-disposition")) if disposition_type else None
+
+    if part.is_multipart() and maintype == b"MULTIPART":
+        return ([build_bodystructure(child) for child in part.get_payload()], subtype, params, disposition, None, None)
+
+    encoding = (part.get("Content-Transfer-Encoding") or "7BIT").upper().encode()
+    section = _part_payload(part)
+    if maintype == b"MESSAGE" and subtype == b"RFC822":
+        nested = build_bodystructure(part.get_payload(0))
+        return (
+            maintype,
+            subtype,
+            params,
+            None,
+            None,
+            encoding,
+            len(section),
+            None,
+            nested,
+            section.count(b"\n"),
+            None,
+            disposition,
+            None,
+            None,
+        )
+    if maintype == b"TEXT":
+        params = params or (b"CHARSET", b"utf-8")
+        return (maintype, subtype, params, None, None, encoding, len(section), section.count(b"\n"), None, disposition, None, None)
+    return (maintype, subtype, params, None, None, encoding, len(section), None, disposition, None, None)
+
+
+def _part_payload(part: email.message.Message) -> bytes:
+    """Return the transfer-encoded body of a non-multipart part."""
+    if part.get_content_type() == "message/rfc822":
+        return part.get_payload(0).as_bytes()
+    payload = part.get_payload()
+    return payload.encode("ascii", "surrogateescape") if isinstance(payload, str) else bytes(payload or b"")
+
+
+def mime_section(raw_email: bytes, section: str) -> bytes | None:
+    """Return the BODY[section] bytes of a raw message, as an IMAP server would."""
+    part = email.message_from_bytes(raw_email)
+    for number in section.split("."):
+        if part.get_content_type() == "message/rfc822":
+            part = part.get_payload(0)
+        if not part.is_multipart():
+            if number != "1":
+                return None
+            continue
+        children = part.get_payload()
+        if not number.isdigit() or not 1 <= int(number) <= len(children):
+            return None
+        part = children[int(number) - 1]
+    return _part_payload(part)
+
+
+def _in_uid_set(uid: int, uid_set: str) -> bool:
+    """Check uid against an IMAP sequence set such as ``1:3,7``."""
+    for item in uid_set.split(","):
+        low, _, high = item.partition(":")
+        if int(low) <= uid <= (int(high) if high and high != "*" else int(low) if not high else uid):
+            return True
+    return False
+
+
 class MockIMAPClient:
     """Mock IMAP client for testing."""
 
@@ -61,6 +154,11 @@ class MockIMAPClient:
         self.logged_in: bool = False
         self.appended_messages: list[dict] = []
         self.deleted_messages: list[int] = []
+        self.capabilities: set[str] = set()
+        self.searches: list = []
+        self.bytes_fetched: int = 0  # Body/RFC822 payload bytes returned by fetch
+        self.stores: list[tuple[str, list[int], list]] = []
+        self.multiappends: int = 0
 
     def login(self, username: str, password: str):
         """Mock login."""
@@ -70,6 +168,10 @@ class MockIMAPClient:
         """Mock logout."""
         self.logged_in = False
 
+    def noop(self):
+        """Mock NOOP."""
+        return (b"NOOP completed", [])
+
     def list_folders(self) -> list[tuple]:
         """Return mock folder list."""
         return [
@@ -90,58 +192,110 @@ class MockIMAPClient:
             b"EXISTS": len(messages),
         }
 
+    def has_capability(self, capability: str) -> bool:
+        """Check mock server capability."""
+        return capability.upper() in self.capabilities
+
     def search(self, criteria: list) -> list[int]:
-        """Return message IDs matching criteria."""
+        """Return message IDs matching criteria.
+
+        A lone sequence-set criterion ("N:*") selects by position and ["UID", set, ...]
+        filters by UID (further criteria are ignored); anything else matches all.
+        """
+        self.searches.append(criteria)
         if self.selected_folder is None:
             return []
         messages = self.folders.get(self.selected_folder, [])
+        if len(criteria) == 1 and re.fullmatch(r"\d+:\*", str(criteria[0])):
+            start = int(str(criteria[0]).split(":")[0])
+            messages = messages[start - 1 :] or messages[-1:]
+        elif len(criteria) >= 2 and str(criteria[0]).upper() == "UID":
+            messages = [msg for msg in messages if _in_uid_set(msg["id"], str(criteria[1]))]
         return [msg["id"] for msg in messages]
 
     def fetch(self, message_ids: list[int], data: list[str]) -> dict:
-        """Fetch message data."""
+        """Fetch message data.
+
+        ``BODY.PEEK[n]<0.600>`` serves the configured snippet_body; other
+        BODY.PEEK selectors serve real section bytes from the raw message.
+        """
         if self.selected_folder is None:
             return {}
 
         messages = self.folders.get(self.selected_folder, [])
         result = {}
-        body_peek_section = None
+        body_peeks = []
         for selector in data:
             selector_text = selector.decode() if isinstance(selector, bytes) else selector
-            if not selector_text.startswith("BODY.PEEK["):
-                continue
-            start = selector_text.find("[")
-            end = selector_text.find("]", start + 1)
-            if start != -1 and end != -1:
-                body_peek_section = selector_text[start + 1 : end]
-                break
+            match = re.fullmatch(r"BODY\.PEEK\[([^\]]*)\](?:<(\d+)\.(\d+)>)?", selector_text)
+            if match:
+                body_peeks.append((match.group(1), match.group(2), match.group(3)))
 
         for msg_id in message_ids:
             for msg in messages:
                 if msg["id"] == msg_id:
-                    if body_peek_section is not None:
-                        snippet_body = msg.get("snippet_body")
-                        snippet_section = msg.get("snippet_section", "1")
-                        if snippet_body is not None and snippet_section == body_peek_section:
-                            key_variant = msg.get("snippet_key_variant", "<0>")
-                            if key_variant == "<0.600>":
-                                response_key = f"BODY[{body_peek_section}]<0.600>"
-                            elif key_variant == "bare":
-                                response_key = f"BODY[{body_peek_section}]"
-                            else:
-                                response_key = f"BODY[{body_peek_section}]<0>"
-                            result[msg_id] = {response_key.encode(): snippet_body}
-                        else:
-                            result[msg_id] = {}
-                    else:
-                        msg_data = msg.get("data", {})
-                        filtered = {}
-                        for selector in data:
-                            selector_key = selector.encode() if isinstance(selector, str) else selector
-                            if selector_key in msg_data:
-                                filtered[selector_key] = msg_data[selector_key]
+                    msg_data = msg.get("data", {})
+                    filtered = {}
+                    for selector in data:
+                        selector_key = selector.encode() if isinstance(selector, str) else selector
+                        if selector_key in msg_data:
+                            filtered[selector_key] = msg_data[selector_key]
+                    if not body_peeks:
                         result[msg_id] = filtered if filtered else msg_data
+                    else:
+                        for section, start, length in body_peeks:
+                            filtered.update(self._body_peek(msg, section, start, length))
+                        result[msg_id] = filtered
                     break
 
+        for msg_data in result.values():
+            self.bytes_fetched += sum(len(value) for key, value in msg_data.items() if key.startswith(b"BODY[") or key == b"RFC822")
+        return result
+
+    @staticmethod
+    def _body_peek(msg: dict, section: str, start: str | None, length: str | None) -> dict:
+        """Answer one BODY.PEEK selector."""
+        if (start, length) == ("0", "600"):
+            snippet_body = msg.get("snippet_body")
+            if snippet_body is None or msg.get("snippet_section", "1") != section:
+                return {}
+            key_variant = msg.get("snippet_key_variant", "<0>")
+            if key_variant == "<0.600>":
+                response_key = f"BODY[{section}]<0.600>"
+            elif key_variant == "bare":
+                response_key = f"BODY[{section}]"
+            else:
+                response_key = f"BODY[{section}]<0>"
+            return {response_key.encode(): snippet_body}
+
+        content = mime_section(msg["data"][b"RFC822"], section)
+        if content is None:
+            return {}
+        if start is None:
+            return {f"BODY[{section}]".encode(): content}
+        offset = int(start)
+        return {f"BODY[{section}]<{offset}>".encode(): content[offset : offset + int(length)]}
+
+    def add_flags(self, message_ids: list[int], flags: list, silent: bool = False) -> dict:
+        """Add flags, returning new flags per message like the untagged FETCH replies."""
+        return self._store("add_flags", message_ids, flags)
+
+    def remove_flags(self, message_ids: list[int], flags: list, silent: bool = False) -> dict:
+        """Remove flags, returning new flags per message."""
+        return self._store("remove_flags", message_ids, flags)
+
+    def _store(self, operation: str, message_ids: list[int], flags: list) -> dict:
+        """Apply a UID STORE to the selected folder."""
+        self.stores.append((operation, list(message_ids), list(flags)))
+        result = {}
+        for msg in self.folders.get(self.selected_folder, []):
+            if msg["id"] not in message_ids:
+                continue
+            current = [f for f in msg["data"].get(b"FLAGS", []) if operation == "add_flags" or f not in flags]
+            if operation == "add_flags":
+                current += [f for f in flags if f not in current]
+            msg["data"][b"FLAGS"] = current
+            result[msg["id"]] = tuple(current)
         return result
 
     def append(self, folder: str, message: bytes, flags: list[bytes] = None) -> int:
@@ -157,13 +311,43 @@ class MockIMAPClient:
         )
         return msg_id
 
+    def multiappend(self, folder: str, msgs: list[dict]):
+        """Append several messages in one command (MULTIAPPEND)."""
+        if "MULTIAPPEND" not in self.capabilities:
+            raise AttributeError("Server does not support MULTIAPPEND")
+        self.multiappends += 1
+        for item in msgs:
+            self.append(folder, item["msg"], flags=item.get("flags"))
+        return b"APPEND completed"
+
     def delete_messages(self, message_ids: list[int]):
         """Mark messages for deletion."""
         self.deleted_messages.extend(message_ids)
 
-    def expunge(self):
-        """Expunge deleted messages."""
-        pass
+    def expunge(self, messages: list[int] | None = None):
+        """Expunge deleted messages. With messages, only those (UID EXPUNGE)."""
+        if messages is None:
+            return
+        self.folders[self.selected_folder] = [
+            msg
+            for msg in self.folders[self.selected_folder]
+            if not (msg["id"] in messages and b"\\Deleted" in msg["data"].get(b"FLAGS", []))
+        ]
+
+    def copy(self, message_ids: list[int], folder: str):
+        """Copy messages to folder with new UIDs."""
+        if folder not in self.folders:
+            raise Exception(f"Folder '{folder}' not found")
+        target = self.folders[folder]
+        for msg in self.folders[self.selected_folder]:
+            if msg["id"] in message_ids:
+                next_uid = max((m["id"] for m in target), default=0) + 1
+                target.append({**msg, "id": next_uid, "data": dict(msg["data"])})
+
+    def move(self, message_ids: list[int], folder: str):
+        """Move messages to folder (MOVE extension)."""
+        self.copy(message_ids, folder)
+        self.folders[self.selected_folder] = [msg for msg in self.folders[self.selected_folder] if msg["id"] not in message_ids]
 
     # Helper methods for tests
     def add_message(
@@ -175,7 +359,7 @@ class MockIMAPClient:
         body_html: str = "",
         flags: list = None,
         raw_email: bytes = None,
-        bodystructure: tuple | None = SIMPLE_TEXT_BODYSTRUCTURE,
+        bodystructure: tuple | None = _DERIVE,
         snippet_body: bytes | str | None = None,
         snippet_section: str = "1",
         snippet_key_variant: str = "<0>",
@@ -186,6 +370,13 @@ class MockIMAPClient:
 
         if raw_email is None:
             raw_email = f"Subject: {envelope.subject.decode()}\r\n\r\n{body_text}".encode()
+            if bodystructure is _DERIVE:
+                bodystructure = SIMPLE_TEXT_BODYSTRUCTURE
+        elif bodystructure is _DERIVE:
+            bodystructure = build_bodystructure(email.message_from_bytes(raw_email))
+
+        if flags is None and folder == "Drafts":
+            flags = [b"\\Draft"]
 
         data = {
             b"ENVELOPE": envelope,
@@ -208,6 +399,33 @@ class MockIMAPClient:
         )
 
 
+@pytest.fixture(autouse=True)
+def isolated_summary_cache(tmp_path, monkeypatch):
+    """Keep the persistent summary cache and search index out of the user's cache directory."""
+    monkeypatch.setenv("IMAP_STREAM_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("IMAP_STREAM_SEARCH_INDEX", raising=False)
+    import imap_client
+
+    imap_client.invalidate_credentials()
+    yield
+    import search_index
+    import summary_cache
+
+    with search_index._crawlers_lock:
+        crawlers = list(search_index._crawlers.values())
+        search_index._crawlers.clear()
+    for thread in crawlers:
+        thread.join(timeout=5)
+    with summary_cache._caches_lock:
+        caches = list(summary_cache._caches.values())
+        summary_cache._caches.clear()
+    with search_index._indexes_lock:
+        caches += list(search_index._indexes.values())
+        search_index._indexes.clear()
+    for cache in caches:
+        cache.close()
+
+
 @pytest.fixture
 def mock_imap():
     """Provide mock IMAP client."""
@@ -3,9 +3,22 @@
 import base64
 import logging
 import quopri
+from unittest.mock import Mock, call
 
 import bodystructure
-from bodystructure import _extract_charset, _strip_html_tags, count_attachments, extract_snippet, find_html_part, find_text_part
+from bodystructure import (
+    TransferDecoder,
+    _extract_charset,
+    _strip_html_tags,
+    count_attachments,
+    decode_body,
+    extract_snippet,
+    fetch_snippets,
+    find_html_part,
+    find_text_part,
+    list_attachments,
+    walk_parts,
+)
 
 SIMPLE_TEXT = (
     b"TEXT",
@@ -397,6 +410,57 @@ def test_extract_charset_odd_params_tuple_defaults_utf8():
     assert _extract_charset(odd_params) == b"utf-8"
 
 
+def test_fetch_snippets_single_fetch_for_all_sections():
+    """Messages with different text sections share one FETCH."""
+    fetch = Mock(
+        return_value={
+            1: {b"BODY[1]<0>": b"plain body", b"BODY[1.2]<0>": b""},
+            2: {b"BODY[1]<0>": b"<html>", b"BODY[1.2]<0>": b"nested text"},
+        }
+    )
+
+    snippets = fetch_snippets(fetch, {1: SIMPLE_TEXT, 2: NESTED_MULTIPART, 3: None})
+
+    fetch.assert_called_once_with([1, 2], ["BODY.PEEK[1]<0.600>", "BODY.PEEK[1.2]<0.600>"])
+    assert snippets == {1: "plain body", 2: "nested text"}
+
+
+def test_fetch_snippets_large_prefix_fetches_per_section():
+    """Index-sized prefixes are not requested for sections a message does not use."""
+    fetch = Mock(side_effect=[{1: {b"BODY[1]<0>": b"plain body"}}, {2: {b"BODY[1.2]<0>": b"nested text"}}])
+
+    snippets = fetch_snippets(fetch, {1: SIMPLE_TEXT, 2: NESTED_MULTIPART}, max_bytes=65536, max_chars=65536)
+
+    assert fetch.call_args_list == [
+        call([1], ["BODY.PEEK[1]<0.65536>"]),
+        call([2], ["BODY.PEEK[1.2]<0.65536>"]),
+    ]
+    assert snippets == {1: "plain body", 2: "nested text"}
+
+
+def test_fetch_snippets_rejected_multi_section_falls_back():
+    """A server refusing a section a message lacks still yields every snippet."""
+    fetch = Mock(
+        side_effect=[
+            Exception("BAD Invalid section"),
+            {1: {b"BODY[1]<0>": b"plain body"}},
+            {2: {b"BODY[1.2]<0>": b"nested text"}},
+        ]
+    )
+
+    snippets = fetch_snippets(fetch, {1: SIMPLE_TEXT, 2: NESTED_MULTIPART})
+
+    assert fetch.call_count == 3
+    assert snippets == {1: "plain body", 2: "nested text"}
+
+
+def test_fetch_snippets_without_text_parts_skips_fetch():
+    fetch = Mock()
+
+    assert fetch_snippets(fetch, {1: None}) == {}
+    fetch.assert_not_called()
+
+
 def test_extract_snippet_invalid_charset_returns_empty():
     """Invalid charset should fail gracefully."""
     assert extract_snippet(b"hello", b"INVALID-XYZ", b"7BIT") == ""
@@ -472,3 +536,115 @@ def test_strip_html_tags_removes_style_and_script_content():
     assert ".hidden" not in text
     assert "hack()" not in text
     assert "Hello & welcome" in text
+
+
+def test_walk_parts_numbers_nested_sections():
+    """walk_parts should yield leaf parts with RFC 3501 section numbers."""
+    assert [section for section, _ in walk_parts(NESTED_MULTIPART)] == ["1.1", "1.2", "2"]
+
+
+def test_walk_parts_single_part_is_section_one():
+    """A non-multipart message body is section 1."""
+    assert list(walk_parts(SIMPLE_TEXT)) == [("1", SIMPLE_TEXT)]
+
+
+def test_walk_parts_descends_into_message_rfc822():
+    """An encapsulated message is yielded before its own parts."""
+    forwarded = (
+        b"MESSAGE",
+        b"RFC822",
+        None,
+        None,
+        None,
+        b"7BIT",
+        1234,
+        None,
+        MIXED_1ATT,
+        42,
+        None,
+        (b"attachment", (b"filename", b"forwarded.eml")),
+        None,
+        None,
+    )
+    body = ([SIMPLE_TEXT, forwarded], b"MIXED", None, None, None, None)
+    assert [section for section, _ in walk_parts(body)] == ["1", "2", "2.1", "2.2"]
+    assert [item["section"] for item in list_attachments(body)] == ["2", "2.2"]
+
+
+def test_list_attachments_indexes_inline_and_attachment_parts():
+    """list_attachments should index all attachment-like parts in walk order."""
+    items = list_attachments(MIXED_3ATT)
+    assert [(i["index"], i["section"], i["filename"], i["inline"]) for i in items] == [
+        (0, "2", "a.pdf", False),
+        (1, "3", "b.zip", False),
+        (2, "4", "c.png", True),
+    ]
+    assert items[0]["content_type"] == "application/pdf"
+    assert items[0]["encoding"] == "BASE64"
+
+
+def test_list_attachments_estimates_decoded_base64_size():
+    """Base64 size should be estimated from the encoded size with CRLF lines."""
+    encoded_size = 78 * 100  # 100 full lines of 76 chars + CRLF
+    part = (b"APPLICATION", b"PDF", None, None, None, b"BASE64", encoded_size, None, (b"attachment", None), None, None)
+    assert list_attachments(part)[0]["size"] == 100 * 57
+
+
+def test_list_attachments_decodes_filenames():
+    """RFC 2231 and RFC 2047 filenames should be decoded; missing names are None."""
+    rfc2231 = (
+        b"APPLICATION",
+        b"PDF",
+        None,
+        None,
+        None,
+        b"BASE64",
+        10,
+        None,
+        (b"attachment", (b"filename*", b"utf-8''r%C3%A9sum%C3%A9.pdf")),
+    )
+    rfc2047 = (b"APPLICATION", b"PDF", (b"NAME", b"=?utf-8?q?caf=C3=A9.pdf?="), None, None, b"BASE64", 10, None, (b"attachment", None))
+    unnamed = (b"APPLICATION", b"PDF", None, None, None, b"BASE64", 10, None, (b"attachment", None))
+    body = ([rfc2231, rfc2047, unnamed], b"MIXED", None, None, None, None)
+    assert [item["filename"] for item in list_attachments(body)] == ["r\u00e9sum\u00e9.pdf", "caf\u00e9.pdf", None]
+
+
+def test_decode_body_transfer_encodings_and_charset():
+    """decode_body should undo transfer encoding and apply the charset."""
+    text = "Gr\u00fc\u00dfe"
+    assert decode_body(base64.b64encode(text.encode("utf-8")), b"utf-8", b"BASE64") == text
+    assert decode_body(quopri.encodestring(text.encode("latin-1")), b"iso-8859-1", b"QUOTED-PRINTABLE") == text
+
+
+def test_decode_body_unknown_charset_falls_back_to_utf8():
+    """Unknown charsets and encodings should not raise."""
+    assert decode_body(b"hello", b"x-unknown", b"X-TOKEN") == "hello"
+
+
+def _decode_in_chunks(encoded: bytes, encoding: bytes, size: int) -> bytes:
+    """Feed encoded bytes to a TransferDecoder in fixed-size chunks."""
+    decoder = TransferDecoder(encoding)
+    out = b"".join(decoder.feed(encoded[i : i + size]) for i in range(0, len(encoded), size))
+    return out + decoder.flush()
+
+
+def test_transfer_decoder_base64_any_chunk_size():
+    """Chunked base64 decoding should match one-shot decoding for every split."""
+    payload = bytes(range(256)) * 7
+    encoded = base64.encodebytes(payload).replace(b"\n", b"\r\n")
+    for size in (1, 3, 4, 5, 77, 78, 1000):
+        assert _decode_in_chunks(encoded, b"BASE64", size) == payload
+
+
+def test_transfer_decoder_quoted_printable_any_chunk_size():
+    """Escapes and soft line breaks split across chunks should decode intact."""
+    payload = ("caf\u00e9 = na\u00efve " * 30).encode("utf-8") + b"\n"
+    encoded = quopri.encodestring(payload)
+    for size in (1, 2, 3, 10, 76):
+        assert _decode_in_chunks(encoded, b"QUOTED-PRINTABLE", size) == quopri.decodestring(encoded)
+
+
+def test_transfer_decoder_passthrough():
+    """Identity and unknown encodings should pass bytes through."""
+    assert _decode_in_chunks(b"raw\x00bytes", b"BINARY", 2) == b"raw\x00bytes"
+    assert _decode_in_chunks(b"raw bytes", b"X-UNKNOWN", 4) == b"raw bytes"
@@ -0,0 +1,133 @@
+"""Tests for dispatch module."""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import anyio
+import anyio.to_thread
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import dispatch
+from dispatch import get_executor, run_blocking
+from imap_client import IMAPError
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def fresh_executors():
+    dispatch.shutdown()
+    yield
+    dispatch.shutdown()
+
+
+class TestGetExecutor:
+    def test_same_account_reuses_pool(self):
+        assert get_executor("work") is get_executor("work")
+
+    def test_accounts_get_separate_pools(self):
+        assert get_executor("work") is not get_executor("personal")
+
+    def test_pool_is_bounded(self):
+        assert get_executor("work")._max_workers == dispatch.DISPATCH_WORKERS
+
+
+class TestRunBlocking:
+    async def test_returns_result(self):
+        result = await run_blocking(lambda a, b=0: a + b, 2, b=3)
+        assert result == 5
+
+    async def test_runs_off_caller_thread(self):
+        caller = threading.get_ident()
+        worker = await run_blocking(threading.get_ident)
+        assert worker != caller
+
+    async def test_account_kwarg_reaches_func(self):
+        """func's own account argument is not taken as the pool selector."""
+
+        def where(account=None):
+            return account, threading.current_thread().name
+
+        account, thread = await run_blocking(where, account="home", executor_account="work")
+        assert account == "home"
+        assert thread.startswith("imap-work")
+
+    async def test_propagates_exceptions(self):
+        def boom():
+            raise IMAPError("Cannot open folder 'Nope'")
+
+        with pytest.raises(IMAPError, match="Cannot open folder"):
+            await run_blocking(boom)
+
+    async def test_timeout_raises_imap_error(self):
+        release = threading.Event()
+
+        def slow_search():
+            release.wait(timeout=5)
+
+        try:
+            with pytest.raises(IMAPError, match="slow_search timed out.*may still complete"):
+                await run_blocking(slow_search, timeout=0.1)
+        finally:
+            release.set()
+
+    async def test_timeout_cancels_queued_call(self, monkeypatch):
+        """Calls still waiting for a worker never start after their timeout."""
+        monkeypatch.setattr(dispatch, "DISPATCH_WORKERS", 1)
+        release = threading.Event()
+        started = []
+
+        def blocker():
+            release.wait(timeout=5)
+
+        def queued():
+            started.append(True)
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(run_blocking, blocker)
+            await anyio.sleep(0.05)
+            with pytest.raises(IMAPError, match="before it started; nothing was changed"):
+                await run_blocking(queued, timeout=0.1)
+            release.set()
+
+        get_executor().shutdown(wait=True)
+        assert started == []
+
+    async def test_wait_uses_no_anyio_worker_thread(self):
+        """Waiting is not capped by anyio's default thread limiter."""
+        release = threading.Event()
+        anyio.to_thread.current_default_thread_limiter().total_tokens = 1
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(anyio.to_thread.run_sync, release.wait, 5)  # Holds the only token
+            await anyio.sleep(0.05)
+            try:
+                with anyio.fail_after(2):
+                    assert await run_blocking(lambda: 7) == 7
+            finally:
+                release.set()
+
+    async def test_pool_limits_concurrency(self, monkeypatch):
+        monkeypatch.setattr(dispatch, "DISPATCH_WORKERS", 2)
+        lock = threading.Lock()
+        active = 0
+        peak = 0
+
+        def work():
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+
+        async with anyio.create_task_group() as tg:
+            for _ in range(6):
+                tg.start_soon(run_blocking, work)
+
+        assert peak == 2
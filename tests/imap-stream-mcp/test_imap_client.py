@@ -1,11 +1,16 @@
 """Tests for imap_client module."""
 
 import email
+import email.policy
+import os
 import sys
+import tempfile
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
 import pytest
+from imapclient import IMAPClient
+from imapclient.exceptions import IMAPClientAbortError, IMAPClientError
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -15,7 +20,9 @@ from imap_client import (
     IMAPError,
     _attach_files,
     _find_all_boundaries,
+    _uid_set,
     create_draft,
+    create_drafts,
     decode_header_value,
     download_attachment,
     edit_draft,
@@ -23,13 +30,20 @@ from imap_client import (
     format_address_list,
     get_credentials,
     get_default_account,
+    html_to_text,
+    index_folder,
     list_accounts,
     list_folders,
     list_messages,
     modify_draft,
+    modify_flags,
+    modify_flags_by_query,
+    move_messages,
     parse_folder_path,
     read_message,
+    search_folders,
     search_messages,
+    search_newest,
     split_quoted_tail,
     to_str,
 )
@@ -203,6 +217,69 @@ class TestGetCredentials:
             get_credentials("nonexistent")
 
 
+class TestCredentialCache:
+    """Keyring lookups are cached per process until setup.py changes accounts."""
+
+    KEYRING = {
+        "accounts": '["work"]',
+        "default_account": "work",
+        "work:imap_server": "imap.example.com",
+        "work:imap_port": "993",
+        "work:imap_username": "me@example.com",
+        "work:imap_password": "secret",
+    }
+
+    @patch("imap_client.keyring.get_password")
+    def test_repeat_lookups_hit_keyring_once(self, mock_keyring):
+        mock_keyring.side_effect = lambda service, key: self.KEYRING.get(key)
+
+        for _ in range(3):
+            assert get_credentials() == ("imap.example.com", "993", "me@example.com", "secret")
+            assert get_default_account() == "work"
+
+        assert mock_keyring.call_count == 6  # accounts, default_account and four credential keys
+
+    @patch("imap_client.keyring.get_password")
+    def test_accounts_stamp_invalidates(self, mock_keyring):
+        """setup.py touching the stamp makes the next lookup read the keyring."""
+        from summary_cache import accounts_stamp
+
+        keyring_data = dict(self.KEYRING)
+        mock_keyring.side_effect = lambda service, key: keyring_data.get(key)
+        assert list_accounts() == ["work"]
+
+        keyring_data["accounts"] = '["work", "home"]'
+        assert list_accounts() == ["work"]  # Cached
+        accounts_stamp().parent.mkdir(parents=True, exist_ok=True)
+        accounts_stamp().touch()
+
+        assert list_accounts() == ["work", "home"]
+
+    @patch("imap_client.keyring.get_password")
+    def test_ttl_expiry_reloads(self, mock_keyring, monkeypatch):
+        import imap_client
+
+        mock_keyring.side_effect = lambda service, key: self.KEYRING.get(key)
+        list_accounts()
+        monkeypatch.setattr(imap_client, "CREDENTIALS_TTL", 0)
+
+        list_accounts()
+
+        assert mock_keyring.call_count == 2
+
+    @patch("imap_client.keyring.get_password")
+    def test_invalidate_credentials(self, mock_keyring):
+        from imap_client import invalidate_credentials
+
+        mock_keyring.side_effect = lambda service, key: self.KEYRING.get(key)
+        get_credentials("work")
+        invalidate_credentials()
+
+        get_credentials("work")
+
+        assert mock_keyring.call_count == 10
+
+
 class TestListAccounts:
     """Tests for list_accounts function."""
 
@@ -431,6 +508,20 @@ class TestListMessages:
 
         assert result == []
 
+    @patch("session._create_connection")
+    def test_list_selects_newest_by_sequence_range(self, mock_create, sample_envelope):
+        """Large folder: SEARCH by sequence range returns only the newest UIDs."""
+        mock_client = MockIMAPClient()
+        for uid in range(1, 51):
+            mock_client.add_message("INBOX", uid * 10, sample_envelope)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = list_messages("INBOX", limit=5)
+
+        assert mock_client.searches == [["46:*"]]
+        assert [m["id"] for m in result] == [500, 490, 480, 470, 460]
+
     @patch("session._create_connection")
     def test_list_messages_with_content(self, mock_create, sample_envelope):
         """Test listing folder with messages."""
@@ -568,6 +659,23 @@ class TestListMessages:
         assert len(result) == 1
         assert result[0]["snippet"] == ""
 
+    @patch("session._create_connection")
+    def test_list_messages_preview_after_cached_list_without_preview(self, mock_create, sample_envelope):
+        """A list cached without preview gets its snippets filled (and stored) on a preview list."""
+        mock_client = MockIMAPClient()
+        mock_client.add_message("INBOX", 1, sample_envelope, snippet_body=b"Filled in later.")
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        list_messages("INBOX", limit=20, preview=False)
+        result = list_messages("INBOX", limit=20, preview=True)
+
+        assert result[0]["snippet"] == "Filled in later."
+        # Also persisted: a fresh session reads the snippet from the summary cache
+        session._sessions.clear()
+        mock_client.folders["INBOX"][0]["snippet_body"] = b"Not fetched again."
+        assert list_messages("INBOX", limit=20, preview=True)[0]["snippet"] == "Filled in later."
+
     @patch("session._create_connection")
     def test_list_messages_folder_not_found(self, mock_create):
         """Test listing non-existent folder."""
@@ -732,6 +840,55 @@ class TestReadMessage:
         assert [x["index"] for x in result["inline_images"]] == [0, 2]
         assert [x["index"] for x in result["attachments"]] == [1]
 
+    @patch("session._create_connection")
+    def test_read_message_skips_attachment_bytes(self, mock_create):
+        """A 5 MB attachment costs the body section only, not the full message."""
+        mock_client = MockIMAPClient()
+        raw = self._build_message_with_parts([("attachment", "big.bin", os.urandom(5 * 1024 * 1024))])
+        raw = raw.replace(b"\n", b"\r\n")  # Servers store CRLF lines
+        mock_client.add_message("INBOX", 1, MockEnvelope(subject=b"Big"), raw_email=raw)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = read_message("INBOX", 1)
+
+        assert result["body_text"].strip() == "Body text"
+        assert result["attachments"][0]["filename"] == "big.bin"
+        assert abs(result["attachments"][0]["size"] - 5 * 1024 * 1024) < 1024
+        assert mock_client.bytes_fetched < 100
+        assert len(raw) > 6_000_000
+
+    @patch("session._create_connection")
+    def test_read_message_without_bodystructure_parses_rfc822(self, mock_create):
+        """Servers that omit BODYSTRUCTURE still get the full-message parse."""
+        mock_client = MockIMAPClient()
+        raw = self._build_message_with_parts([("attachment", "report.pdf", b"%PDF-test")])
+        mock_client.add_message("INBOX", 1, MockEnvelope(subject=b"No structure"), raw_email=raw, bodystructure=None)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = read_message("INBOX", 1)
+
+        assert result["body_text"].strip() == "Body text"
+        assert result["attachments"] == [{"filename": "report.pdf", "content_type": "application/octet-stream", "size": 9, "index": 0}]
+
+    @patch("session._create_connection")
+    def test_read_message_decodes_html_section(self, mock_create):
+        """Base64 HTML alternative is fetched by section and decoded with its charset."""
+        msg = email.message.EmailMessage()
+        msg["Subject"] = "Alt"
+        msg.set_content("Plain version")
+        msg.add_alternative("<p>Gr\u00fc\u00dfe</p>", subtype="html", charset="utf-8", cte="base64")
+        mock_client = MockIMAPClient()
+        mock_client.add_message("INBOX", 1, MockEnvelope(subject=b"Alt"), raw_email=msg.as_bytes())
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = read_message("INBOX", 1, full=True)
+
+        assert result["body_text"].strip() == "Plain version"
+        assert result["body_html"].strip() == "<p>Gr\u00fc\u00dfe</p>"
+
     @patch("session._create_connection")
     def test_download_attachment_index_with_mixed_parts(self, mock_create):
         """download_attachment index still maps to walk-order mixed parts."""
@@ -760,6 +917,104 @@ class TestReadMessage:
         assert second["filename"] == "report.pdf"
         assert third["filename"] == "image002.png"
 
+    @patch("session._create_connection")
+    def test_download_attachment_streams_section_in_chunks(self, mock_create, monkeypatch, tmp_path):
+        """Only the attachment section is fetched, in partial chunks, and decoded to disk."""
+        monkeypatch.setattr("imap_client.ATTACHMENT_CHUNK_SIZE", 1000)
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+        payload = os.urandom(50_000)
+        raw = self._build_message_with_parts([("attachment", "big.bin", payload)]).replace(b"\n", b"\r\n")
+        mock_client = MockIMAPClient()
+        mock_client.add_message("INBOX", 1, MockEnvelope(subject=b"Big"), raw_email=raw)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        fetches = []
+        orig_fetch = mock_client.fetch
+
+        def track_fetch(message_ids, data):
+            fetches.append(list(data))
+            return orig_fetch(message_ids, data)
+
+        mock_client.fetch = track_fetch
+
+        result = download_attachment("INBOX", 1, 0)
+
+        assert Path(result["saved_to"]).read_bytes() == payload
+        assert result["size"] == len(payload)
+        assert result["content_type"] == "application/octet-stream"
+        assert fetches[0] == ["BODYSTRUCTURE"]
+        assert fetches[1:3] == [["BODY.PEEK[2]<0.1000>"], ["BODY.PEEK[2]<1000.1000>"]]
+        assert all(len(selectors) == 1 and selectors[0].startswith("BODY.PEEK[2]<") for selectors in fetches[1:])
+        assert mock_client.bytes_fetched < len(raw) - len("Body text")
+
+    @patch("session._create_connection")
+    def test_download_attachment_quoted_printable(self, mock_create, monkeypatch, tmp_path):
+        """Quoted-printable sections decode correctly across chunk boundaries."""
+        monkeypatch.setattr("imap_client.ATTACHMENT_CHUNK_SIZE", 7)
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+        text = "Gr\u00fc\u00dfe = caf\u00e9 " * 20
+        msg = email.message.EmailMessage()
+        msg["Subject"] = "QP"
+        msg.set_content("Body text")
+        msg.add_attachment(text, subtype="plain", charset="utf-8", cte="quoted-printable", filename="notes.txt")
+        mock_client = MockIMAPClient()
+        mock_client.add_message("INBOX", 1, MockEnvelope(subject=b"QP"), raw_email=msg.as_bytes())
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = download_attachment("INBOX", 1, 0)
+
+        expected = next(msg.iter_attachments()).get_payload(decode=True)
+        assert Path(result["saved_to"]).read_bytes() == expected
+        assert expected.decode("utf-8").startswith(text)
+        assert result["filename"] == "notes.txt"
+
+    @patch("session._create_connection")
+    def test_download_attachment_without_bodystructure(self, mock_create, monkeypatch, tmp_path):
+        """Servers that omit BODYSTRUCTURE fall back to the full-message parse."""
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+        raw = self._build_message_with_parts([("attachment", "report.pdf", b"%PDF-test")])
+        mock_client = MockIMAPClient()
+        mock_client.add_message("INBOX", 1, MockEnvelope(subject=b"Old"), raw_email=raw, bodystructure=None)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = download_attachment("INBOX", 1, 0)
+
+        assert Path(result["saved_to"]).read_bytes() == b"%PDF-test"
+        assert result["filename"] == "report.pdf"
+
+        with pytest.raises(IMAPError, match="out of range"):
+            download_attachment("INBOX", 1, 1)
+
+    @patch("session._create_connection")
+    def test_repeated_operations_reuse_message_cache(self, mock_create, monkeypatch, tmp_path):
+        """read, attachment twice and read again fetch each content item once; FLAGS stay live."""
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+        raw = self._build_message_with_parts([("attachment", "report.pdf", b"%PDF-test")])
+        mock_client = MockIMAPClient()
+        mock_client.add_message("INBOX", 1, MockEnvelope(subject=b"Cached"), raw_email=raw)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        fetches = []
+        orig_fetch = mock_client.fetch
+
+        def track_fetch(message_ids, data):
+            fetches.append(list(data))
+            return orig_fetch(message_ids, data)
+
+        mock_client.fetch = track_fetch
+
+        first = read_message("INBOX", 1)
+        download_attachment("INBOX", 1, 0)
+        download_attachment("INBOX", 1, 0)
+        again = read_message("INBOX", 1)
+
+        assert again == first
+        assert fetches == [["ENVELOPE", "FLAGS", "BODYSTRUCTURE"], ["BODY.PEEK[1]"], ["BODY.PEEK[2]"], ["FLAGS"]]
+
     def test_split_quoted_tail_outlook_separator(self):
         """Outlook separator + From line should split quoted tail."""
         body = (
@@ -1170,6 +1425,151 @@ class TestReadMessage:
         assert "On Tue, Alice wrote:" in result["body_text"]
         assert result["body_html"] != ""
 
+    @patch("session._create_connection")
+    @pytest.mark.parametrize(
+        ("mode", "full", "truncated"),
+        [("full", False, True), ("full", True, False), ("fast", False, False)],
+    )
+    def test_read_message_html_only_truncation_by_mode(self, mock_create, monkeypatch, mode, full, truncated):
+        """Converted HTML is split like plain text; fast mode has no quote markers to split on."""
+        monkeypatch.setenv("IMAP_STREAM_HTML_TEXT", mode)
+        mock_client = MockIMAPClient()
+        raw = (
+            b"MIME-Version: 1.0\r\n"
+            b"Content-Type: text/html; charset=utf-8\r\n"
+            b"\r\n"
+            b"<p>Hello there</p><blockquote>On Tue, Alice wrote:<br>Older line</blockquote>"
+        )
+        mock_client.add_message("INBOX", 1, MockEnvelope(), raw_email=raw)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = read_message("INBOX", 1, full=full)
+
+        assert result["body_text"].startswith("Hello there")
+        assert ("Older line" in result["body_text"]) is not truncated
+        assert result["quoted_truncated"] is truncated
+
+
+class TestHtmlToText:
+    def test_pre_pass_drops_style_script_comments_and_tracking_pixels(self):
+        html = (
+            "<style>p{color:red}</style><script>track()</script><!--[if mso]><v:rect/><![endif]-->"
+            '<p>Hello</p><img src="https://t.example/o.gif" width="1" height="1">'
+            '<img src="https://t.example/h.gif" style="display:none"><img src="logo.png" alt="logo">'
+        )
+
+        text = html_to_text(html)
+
+        assert "Hello" in text
+        assert "![logo](logo.png)" in text
+        for noise in ("color:red", "track()", "v:rect", "o.gif", "h.gif"):
+            assert noise not in text
+
+    def test_input_capped_before_a_tag(self, monkeypatch):
+        monkeypatch.setattr("imap_client.HTML_TEXT_MAX_CHARS", 40)
+
+        text = html_to_text("<p>first paragraph</p><p>second paragraph</p>")
+
+        assert "first paragraph" in text
+        assert "second" not in text
+
+    def test_fast_mode_strips_tags_only(self):
+        text = html_to_text('<p>Hi <a href="https://example.com">there</a></p>\n\n\n<p>Bye</p>', mode="fast")
+
+        assert text == "Hi there\n\nBye"
+
+    @patch("session._create_connection")
+    def test_html_only_message_converted_once(self, mock_create):
+        """Reads at any depth, and full reads, share one conversion."""
+        mock_client = MockIMAPClient()
+        raw = (
+            b"MIME-Version: 1.0\r\n"
+            b"Content-Type: text/html; charset=utf-8\r\n"
+            b"\r\n"
+            b"<div>Top reply</div><blockquote>On Tue, Alice wrote:<br>Older line</blockquote>"
+        )
+        mock_client.add_message("INBOX", 1, MockEnvelope(), raw_email=raw)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        with patch("imap_client.html_to_text", wraps=html_to_text) as convert:
+            read_message("INBOX", 1)
+            full = read_message("INBOX", 1, full=True)
+
+        convert.assert_called_once()
+        assert "Top reply" in full["body_text"]
+        assert "On Tue, Alice wrote:" in full["body_text"]
+
+    @patch("session._create_connection")
+    def test_html_text_mode_from_environment(self, mock_create, monkeypatch):
+        monkeypatch.setenv("IMAP_STREAM_HTML_TEXT", "fast")
+        mock_client = MockIMAPClient()
+        raw = b'MIME-Version: 1.0\r\nContent-Type: text/html\r\n\r\n<p>Hi <a href="https://example.com">there</a></p>'
+        mock_client.add_message("INBOX", 1, MockEnvelope(), raw_email=raw)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        assert read_message("INBOX", 1)["body_text"] == "Hi there"
+
+
+OUTLOOK_BLOCK = (
+    "________________________________\n"
+    "From: Alice <alice@example.com>\n"
+    "Sent: Monday, February 24, 2026 10:00 AM\n"
+    "To: Bob <bob@example.com>\n"
+    "Subject: Re: Status\n"
+)
+FINNISH_BLOCK = (
+    "Lähettäjä: Ville Reijonen <vreijone@gmail.com>\n"
+    "Lähetetty: keskiviikko 23. huhtikuuta 2025 15.40\n"
+    "Vastaanottaja: Henna Hopia <henna.hopia@hopiasepat.fi>\n"
+)
+BOUNDARY_FIXTURES = [
+    f"Latest reply line.\n\n{OUTLOOK_BLOCK}\n> older text",
+    f"Newest reply.\n\n{OUTLOOK_BLOCK}\nOlder message body from Alice.\n{OUTLOOK_BLOCK}\n> Oldest quoted block",
+    f"Hei, tässä uusin viesti.\n\n{FINNISH_BLOCK}Aihe: Re: KHRU-kerho\n\nAiempaa sisältöä.",
+    "Hier ist die neueste Antwort.\n\nVon: Max <max@example.de>\nGesendet: Mittwoch\nAn: Erika <erika@example.de>\n\nFrüher.",
+    "Thanks.\n\nOn Tue, Alex wrote:\n> First line\n> Second line\n",
+    "Top response.\n\n> old line 1\n> old line 2\n",
+    "Line 1\nLine 2\n\nLine 3",
+    "Answer 1\n> Question 1\nAnswer 2\n> Question 2\n",
+    f"{OUTLOOK_BLOCK}\nOlder content",
+    "Reply\n\nOn Tue, Alex wrote:\n> Question 1\nOn Mon, Bob wrote:\n> Question 2\n",
+    "Reply\n\nOn Tue, Alex wrote:\n> Q1\n> Q2\n> Q3\n> Q4\nOn Mon, Bob wrote:\n> Q5\n",
+    f"Uusin viesti.\n\n{FINNISH_BLOCK}\nLähettäjä: Team <support@example.com>\nRooli: Asiakaspalvelu\nPuhelin: 010\n",
+    "Latest response only.\n\nOn Tue, Alice wrote:\n" + "\n".join(f"> Message layer {idx}" for idx in range(1, 400)),
+    # Edge cases of the lookahead and merge rules
+    "Reply\n\nOn Mon, Alice wrote:\n________________________________\nFrom: Alice <a@example.com>\nTo: b\n> x\n",
+    "Reply\n________________________________\n\n   \n  From: Alice <a@example.com>\nSent: now\nTo: Bob <b@example.com>\n",
+    "Reply\n\nOn 10:30 Alice <a@example.com> wrote:\nSent: today\nTo: Bob\n> quoted\n",
+    "Reply\n\nFrom: A <a@x.fi>\nTo: B <b@x.fi>\nCc: C <c@x.fi>\nSubject: s",
+    "Body\r\n\r\nOn Tue, Alex wrote:\r\n\r\n> quoted\r\n",
+    "Body\n________________________________",
+    "Body\n\non tue, alex WROTE:   \n\t> quoted\n",
+]
+
+
+class TestQuoteBoundaryScanner:
+    """Single-pass _find_all_boundaries against the three-pass reference."""
+
+    @pytest.mark.parametrize("body", BOUNDARY_FIXTURES)
+    def test_matches_reference_on_fixtures(self, body):
+        from bench_quote_boundaries import reference_find_all_boundaries
+
+        lines = body.splitlines()
+        assert _find_all_boundaries(lines) == reference_find_all_boundaries(lines)
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_matches_reference_on_generated_chains(self, seed):
+        from bench_quote_boundaries import reference_find_all_boundaries, reply_chain
+
+        lines = reply_chain(64 * 1024, seed=seed).splitlines()
+        boundaries = _find_all_boundaries(lines)
+
+        assert len(boundaries) > 10
+        assert boundaries == reference_find_all_boundaries(lines)
+
 
 class TestSearchMessages:
     """Tests for search_messages function."""
@@ -1241,6 +1641,21 @@ class TestSearchMessages:
         assert len(result) == 1
         assert result[0]["snippet"].startswith("Search preview body")
 
+    @patch("session._create_connection")
+    def test_repeat_preview_search_fetches_no_bodies(self, mock_create, sample_envelope):
+        """Snippets are kept per UID, so a repeat search only fetches summaries."""
+        mock_client = MockIMAPClient()
+        mock_client.add_message("INBOX", 33, sample_envelope, snippet_body=b"Search preview body content from body.peek.")
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+        search_messages("INBOX", "anything", preview=True)
+        fetched = mock_client.bytes_fetched
+
+        result = search_messages("INBOX", "anything", preview=True)
+
+        assert mock_client.bytes_fetched == fetched
+        assert result[0]["snippet"].startswith("Search preview body")
+
     @patch("session._create_connection")
     def test_search_messages_empty_body_peek_returns_empty_snippet(self, mock_create, sample_envelope):
         """Search snippet should be empty when BODY.PEEK payload is empty."""
@@ -1255,6 +1670,69 @@ class TestSearchMessages:
         assert result[0]["snippet"] == ""
 
 
+class TestSearchNewest:
+    """Tests for server-side paging of search hits."""
+
+    def _client(self, *capabilities):
+        client = Mock()
+        client.has_capability.side_effect = lambda name: name in capabilities
+        return client
+
+    def test_partial_returns_only_last_hits(self):
+        client = self._client("ESEARCH", "PARTIAL")
+        client._raw_command_untagged.return_value = [b'(TAG "A7") UID PARTIAL (-1:-3 88,90:91) COUNT 412']
+
+        assert search_newest(client, ["FROM", "alice"], 3) == [91, 90, 88]
+        args = client._raw_command_untagged.call_args.args[1]
+        assert args[:2] == [b"RETURN", b"(PARTIAL -1:-3)"]
+        client.search.assert_not_called()
+
+    def test_esearch_all_takes_newest_from_ranges(self):
+        client = self._client("ESEARCH")
+        client._raw_command_untagged.return_value = [b'(TAG "A7") UID ALL 1:300000,300005']
+
+        assert search_newest(client, ["UNSEEN"], 3) == [300005, 300000, 299999]
+        assert client._raw_command_untagged.call_args.args[1][:2] == [b"RETURN", b"(ALL)"]
+
+    def test_esearch_no_hits(self):
+        client = self._client("ESEARCH", "PARTIAL")
+        client._raw_command_untagged.return_value = [b'(TAG "A7") UID PARTIAL (-1:-3 NIL)']
+
+        assert search_newest(client, ["UNSEEN"], 3) == []
+
+    def test_esearch_rejected_falls_back_to_search(self):
+        from imapclient.exceptions import IMAPClientError
+
+        client = self._client("ESEARCH")
+        client._raw_command_untagged.side_effect = IMAPClientError("BAD")
+        client.search.return_value = [5, 1, 9, 7]
+
+        assert search_newest(client, ["UNSEEN"], 2) == [9, 7]
+
+    def test_plain_search_without_esearch(self):
+        client = self._client()
+        client.search.return_value = [1, 2, 3, 4]
+
+        assert search_newest(client, ["UNSEEN"], 3) == [4, 3, 2]
+        client._raw_command_untagged.assert_not_called()
+
+    def test_imapclient_internals_present(self):
+        """Fails loudly when an imapclient upgrade drops the private ESEARCH helpers."""
+        from imapclient.imapclient import _normalise_search_criteria
+
+        assert callable(IMAPClient._raw_command_untagged)
+        assert _normalise_search_criteria(["FROM", "alice"], None) == [b"FROM", b"alice"]
+
+    def test_missing_internals_fall_back_to_search(self, monkeypatch):
+        """Without the private helpers ESEARCH servers get a plain SEARCH."""
+        monkeypatch.setattr("imap_client._normalise_search_criteria", None)
+        client = self._client("ESEARCH", "PARTIAL")
+        client.search.return_value = [1, 2, 3, 4]
+
+        assert search_newest(client, ["UNSEEN"], 3) == [4, 3, 2]
+        client._raw_command_untagged.assert_not_called()
+
+
 class TestCreateDraft:
     """Tests for create_draft function."""
 
@@ -1345,6 +1823,63 @@ class TestCreateDraft:
         appended = mock_client.appended_messages[0]
         assert b"Cc: cc1@example.com, cc2@example.com" in appended["message"]
 
+    @patch("session._create_connection")
+    @patch("imap_client.get_credentials")
+    def test_repeat_draft_is_single_append(self, mock_creds, mock_create):
+        """The Drafts role is resolved once; later drafts only APPEND."""
+        mock_creds.return_value = ("server", "993", "user@example.com", "pass")
+        mock_client = MockIMAPClient()
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        commands = []
+        timed = session.PooledConnection._timed
+
+        def record(pooled, method, *args, **kwargs):
+            commands.append(method)
+            return timed(pooled, method, *args, **kwargs)
+
+        with patch.object(mock_client, "list_folders", wraps=mock_client.list_folders) as list_folders:
+            create_draft(folder="INBOX", to="a@example.com", subject="One", body="Body")
+            with patch.object(session.PooledConnection, "_timed", record):
+                create_draft(folder="INBOX", to="b@example.com", subject="Two", body="Body")
+
+        list_folders.assert_called_once()
+        assert commands == ["append"]
+        assert mock_client.selected_folder is None
+        assert [m["folder"] for m in mock_client.appended_messages] == ["Drafts", "Drafts"]
+
+    @patch("session._create_connection")
+    @patch("imap_client.get_credentials")
+    def test_missing_drafts_folder_lists_available(self, mock_creds, mock_create):
+        mock_creds.return_value = ("server", "993", "user@example.com", "pass")
+        mock_client = MockIMAPClient()
+        mock_client.list_folders = lambda: [([b"\\HasNoChildren"], b"/", "INBOX")]
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        with pytest.raises(IMAPError, match="Cannot find Drafts folder. Available folders: INBOX"):
+            create_draft(folder="INBOX", to="a@example.com", subject="One", body="Body")
+
+    @patch("session._create_connection")
+    @patch("imap_client.get_credentials")
+    def test_failed_append_forgets_roles(self, mock_creds, mock_create):
+        """A renamed Drafts folder is re-resolved on the next draft."""
+        from imapclient.exceptions import IMAPClientError
+
+        mock_creds.return_value = ("server", "993", "user@example.com", "pass")
+        mock_client = MockIMAPClient()
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+        create_draft(folder="INBOX", to="a@example.com", subject="One", body="Body")
+
+        with patch.object(mock_client, "append", side_effect=IMAPClientError("NO [TRYCREATE]")):
+            with pytest.raises(IMAPClientError):
+                create_draft(folder="INBOX", to="a@example.com", subject="Two", body="Body")
+
+        assert session.get_session().folder_roles is None
+        assert session.get_session().folder_cache is None
+
 
 class TestModifyDraft:
     """Tests for modify_draft function."""
@@ -1619,6 +2154,115 @@ class TestAttachFiles:
             f.chmod(0o644)
 
 
+class TestCreateDrafts:
+    """Tests for create_drafts batch uploads."""
+
+    DRAFTS = [{"to": f"r{n}@example.com", "subject": f"Hello {n}", "body": f"Body {n}"} for n in range(3)]
+
+    @patch("session._create_connection")
+    @patch("imap_client.get_credentials")
+    def test_multiappend_uploads_batch_in_one_command(self, mock_creds, mock_create):
+        mock_creds.return_value = ("server", "993", "user@example.com", "pass")
+        mock_client = MockIMAPClient()
+        mock_client.capabilities.add("MULTIAPPEND")
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = create_drafts("INBOX", self.DRAFTS)
+
+        assert mock_client.multiappends == 1
+        assert result["created"] == 3
+        assert [d["status"] for d in result["drafts"]] == ["created"] * 3
+        assert len({d["message_id"] for d in result["drafts"]}) == 3
+        for draft, appended in zip(result["drafts"], mock_client.appended_messages, strict=True):
+            assert appended["folder"] == "Drafts"
+            assert appended["flags"] == [b"\\Draft", b"\\Seen"]
+            assert draft["message_id"].encode() in appended["message"]
+        mock_creds.assert_called_once()
+
+    @patch("session._create_connection")
+    @patch("imap_client.get_credentials")
+    def test_appends_one_by_one_without_multiappend(self, mock_creds, mock_create):
+        mock_creds.return_value = ("server", "993", "user@example.com", "pass")
+        mock_client = MockIMAPClient()
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = create_drafts("INBOX", self.DRAFTS)
+
+        assert result["created"] == 3
+        assert mock_client.multiappends == 0
+        assert len(mock_client.appended_messages) == 3
+        assert mock_create.call_count == 1  # one connection for the whole batch
+
+    @patch("session._create_connection")
+    @patch("imap_client.get_credentials")
+    def test_rejected_batch_isolates_failing_draft(self, mock_creds, mock_create):
+        mock_creds.return_value = ("server", "993", "user@example.com", "pass")
+        mock_client = MockIMAPClient()
+        mock_client.capabilities.add("MULTIAPPEND")
+        mock_client.multiappend = Mock(side_effect=IMAPClientError("APPEND failed: too big"))
+        append = mock_client.append
+
+        def reject_second(folder, message, flags=None):
+            if b"Hello 1" in message:
+                raise IMAPClientError("APPEND failed: too big")
+            return append(folder, message, flags)
+
+        mock_client.append = reject_second
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = create_drafts("INBOX", self.DRAFTS)
+
+        assert [d["status"] for d in result["drafts"]] == ["created", "error", "created"]
+        assert "too big" in result["drafts"][1]["error"]
+        assert "message_id" not in result["drafts"][1]
+        assert result["created"] == 2
+
+    @patch("session._create_connection")
+    @patch("imap_client.get_credentials")
+    def test_lost_connection_fails_remaining_drafts(self, mock_creds, mock_create):
+        mock_creds.return_value = ("server", "993", "user@example.com", "pass")
+        mock_client = MockIMAPClient()
+        append = mock_client.append
+        calls = []
+
+        def drop_after_first(folder, message, flags=None):
+            calls.append(folder)
+            if len(calls) > 1:
+                raise IMAPClientAbortError("socket closed")
+            return append(folder, message, flags)
+
+        mock_client.append = drop_after_first
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = create_drafts("INBOX", self.DRAFTS)
+
+        assert [d["status"] for d in result["drafts"]] == ["created", "error", "error"]
+        assert len(calls) == 2
+
+    @patch("session._create_connection")
+    @patch("imap_client.get_credentials")
+    def test_invalid_attachment_fails_only_its_draft(self, mock_creds, mock_create, tmp_path):
+        mock_creds.return_value = ("server", "993", "user@example.com", "pass")
+        mock_client = MockIMAPClient()
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+        drafts = [*self.DRAFTS[:2], {**self.DRAFTS[2], "attachments": [str(tmp_path / "missing.pdf")]}]
+
+        result = create_drafts("INBOX", drafts)
+
+        assert [d["status"] for d in result["drafts"]] == ["created", "created", "error"]
+        assert "File not found" in result["drafts"][2]["error"]
+        assert len(mock_client.appended_messages) == 2
+
+    def test_batch_size_limited(self):
+        with pytest.raises(IMAPError, match="Too many drafts"):
+            create_drafts("INBOX", self.DRAFTS * 50)
+
+
 class TestCreateDraftWithAttachments:
     """Tests for create_draft with file attachments."""
 
@@ -1916,6 +2560,73 @@ class TestModifyDraftWithAttachments:
         assert att_parts[0].get_payload(decode=True) == b""
 
 
+class TestModifyDraftRawCarryOver:
+    """modify_draft copies kept parts as the original encoded bytes."""
+
+    @staticmethod
+    def _make_related_draft() -> bytes:
+        """Rich-client draft: mixed[alternative[plain, related[html, image]], pdf], CRLF line endings."""
+        msg = email.message.EmailMessage(policy=email.policy.SMTP)
+        msg["From"] = "user@example.com"
+        msg["To"] = "recipient@example.com"
+        msg["Subject"] = "Draft with logo"
+        msg["Message-ID"] = "<rich@example.com>"
+        msg.set_content("Original body")
+        msg.add_alternative('<p>Original <img src="cid:logo@example.com"></p>', subtype="html")
+        msg.get_payload()[1].add_related(b"PNG" * 500, maintype="image", subtype="png", cid="<logo@example.com>")
+        msg.add_attachment(b"%PDF" * 2000, maintype="application", subtype="pdf", filename="report.pdf")
+        return msg.as_bytes()
+
+    def _modify(self, mock_create, raw: bytes, **kwargs) -> tuple[bytes, dict]:
+        mock_client = MockIMAPClient()
+        envelope = MockEnvelope(subject=b"Draft", to=[MockAddress(mailbox=b"recipient", host=b"example.com")])
+        mock_client.add_message("Drafts", 1, envelope, raw_email=raw)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+        result = modify_draft("Drafts", 1, **kwargs)
+        return mock_client.appended_messages[0]["message"], result
+
+    @patch("session._create_connection")
+    @patch("imap_client.get_credentials")
+    def test_inline_image_keeps_cid_linkage(self, mock_creds, mock_create):
+        """Resources of a multipart/related body stay related to the new HTML body."""
+        mock_creds.return_value = ("server", "993", "user@example.com", "pass")
+
+        appended, result = self._modify(
+            mock_create, self._make_related_draft(), body="New body", html='<p>New <img src="cid:logo@example.com"></p>'
+        )
+
+        parsed = email.message_from_bytes(appended, policy=email.policy.default)
+        related = next(p for p in parsed.walk() if p.get_content_type() == "multipart/related")
+        image = next(p for p in related.iter_parts() if p.get_content_type() == "image/png")
+        assert image["Content-ID"] == "<logo@example.com>"
+        assert image.get_content() == b"PNG" * 500
+        assert "cid:logo@example.com" in parsed.get_body(("html",)).get_content()
+        assert "Original" not in parsed.get_body(("plain",)).get_content()
+        assert result["attachments"] == [{"name": "report.pdf", "size": 8000}]
+
+    @patch("session._create_connection")
+    @patch("imap_client.get_credentials")
+    def test_attachment_copied_as_encoded_bytes(self, mock_creds, mock_create):
+        """The encoded attachment section appears verbatim; line endings stay CRLF."""
+        mock_creds.return_value = ("server", "993", "user@example.com", "pass")
+        raw = self._make_related_draft()
+        original = email.message_from_bytes(raw, policy=email.policy.default)
+        pdf = next(original.iter_attachments())
+
+        appended, _ = self._modify(mock_create, raw, body="New body")
+
+        assert pdf.as_bytes(policy=email.policy.SMTP) in appended
+        assert b"\n" not in appended.replace(b"\r\n", b"")
+
+    def test_split_multipart_drops_preamble_and_epilogue(self):
+        from imap_client import _split_multipart
+
+        body = memoryview(b"preamble\n--b\nA: 1\n\none\n--b \r\n\r\ntwo\r\n--b--\nepilogue")
+
+        assert [bytes(part) for part in _split_multipart(body, "b")] == [b"A: 1\n\none", b"\r\ntwo"]
+
+
 class TestEditDraft:
     """Tests for edit_draft function."""
 
@@ -1987,6 +2698,42 @@ class TestEditDraft:
         assert b"12 ducks" in appended["message"]
         assert b"11 ducks" not in appended["message"]
 
+    @patch("session._create_connection")
+    @patch("imap_client.get_credentials")
+    def test_draft_flag_checked_live_after_caching(self, mock_creds, mock_create):
+        """A cached draft that another client sent (\\Draft removed) is not re-appended."""
+        mock_creds.return_value = ("server", "993", "user@example.com", "pass")
+        mock_client = MockIMAPClient()
+        raw = self._make_plain_draft("There are 11 ducks.")
+        mock_client.add_message("Drafts", 1, MockEnvelope(subject=b"Draft subject"), raw_email=raw)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+        session.get_session().parsed_message("Drafts", 1)  # Cached while still a draft
+        mock_client.folders["Drafts"][0]["data"][b"FLAGS"] = [b"\\Seen"]
+
+        with pytest.raises(IMAPError, match="does not have"):
+            edit_draft("Drafts", 1, replacements=[{"old": "11 ducks", "new": "12 ducks"}])
+        with pytest.raises(IMAPError, match="does not have"):
+            modify_draft("Drafts", 1, body="New body")
+        assert mock_client.appended_messages == []
+
+    @patch("session._create_connection")
+    @patch("imap_client.get_credentials")
+    def test_draft_expunged_elsewhere_is_not_found(self, mock_creds, mock_create):
+        """A cached draft expunged by another client reads as missing, not as the stale copy."""
+        mock_creds.return_value = ("server", "993", "user@example.com", "pass")
+        mock_client = MockIMAPClient()
+        raw = self._make_plain_draft("There are 11 ducks.")
+        mock_client.add_message("Drafts", 1, MockEnvelope(subject=b"Draft subject"), raw_email=raw)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+        session.get_session().parsed_message("Drafts", 1)
+        mock_client.folders["Drafts"].clear()
+
+        with pytest.raises(IMAPError, match="not found"):
+            modify_draft("Drafts", 1, body="New body")
+        assert mock_client.appended_messages == []
+
     @patch("session._create_connection")
     @patch("imap_client.get_credentials")
     def test_edit_draft_multiple_replacements_in_order(self, mock_creds, mock_create):
@@ -2146,7 +2893,7 @@ class TestEditDraft:
     @patch("session._create_connection")
     @patch("imap_client.get_credentials")
     def test_edit_draft_avoids_second_fetch(self, mock_creds, mock_create):
-        """edit_draft should fetch source draft once and reuse parsed data for modify."""
+        """edit_draft fetches the draft content once; modify only re-checks FLAGS live."""
         mock_creds.return_value = ("server", "993", "user@example.com", "pass")
         mock_client = MockIMAPClient()
         raw = self._make_plain_draft("There are 11 ducks.")
@@ -2170,7 +2917,7 @@ class TestEditDraft:
 
         edit_draft("Drafts", 1, replacements=[{"old": "11 ducks", "new": "12 ducks"}], account="default")
 
-        assert fetch_calls == [("RFC822", "ENVELOPE")]
+        assert fetch_calls == [("RFC822", "ENVELOPE", "FLAGS"), ("FLAGS",)]
 
     @patch("session._create_connection")
     @patch("imap_client.get_credentials")
@@ -2249,3 +2996,364 @@ class TestAttachmentRoundtrip:
         att_parts = [p for p in parsed.walk() if p.get_content_disposition() == "attachment"]
         assert len(att_parts) == 1
         assert att_parts[0].get_payload(decode=True) == b"%PDF-1.4 real pdf content here"
+
+
+class TestModifyFlags:
+    """Tests for batched modify_flags."""
+
+    @staticmethod
+    def _client(count: int = 5) -> MockIMAPClient:
+        mock_client = MockIMAPClient()
+        for uid in range(1, count + 1):
+            mock_client.add_message("INBOX", uid, MockEnvelope(subject=f"Msg {uid}".encode()), flags=[b"\\Recent"])
+        return mock_client
+
+    @patch("session._create_connection")
+    def test_one_store_per_flag_set(self, mock_create):
+        """All UIDs are checked with one SEARCH and changed with one STORE per set."""
+        mock_client = self._client()
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+        fetches = []
+        orig_fetch = mock_client.fetch
+        mock_client.fetch = lambda ids, data: fetches.append(data) or orig_fetch(ids, data)
+
+        result = modify_flags("INBOX", [1, 2, 3, 5], ["Seen", "$label1"], ["Recent"])
+
+        assert result["modified"] == 4
+        assert result["failed"] == []
+        assert mock_client.searches == [["UID", "1:3,5"]]
+        assert mock_client.stores == [
+            ("add_flags", [1, 2, 3, 5], [b"\\Seen", b"$label1"]),
+            ("remove_flags", [1, 2, 3, 5], [b"Recent"]),
+        ]
+        assert fetches == []  # Flags come from the STORE replies
+
+    @patch("session._create_connection")
+    def test_missing_messages_reported_per_uid(self, mock_create):
+        """UIDs absent from the SEARCH result fail individually and are not stored."""
+        mock_client = self._client(2)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = modify_flags("INBOX", [1, 9, 2], ["Flagged"], [])
+
+        assert result["modified"] == 2
+        assert result["failed"] == [{"id": 9, "error": "Message not found"}]
+        assert mock_client.stores == [("add_flags", [1, 2], [b"\\Flagged"])]
+
+    @patch("session._create_connection")
+    def test_rejected_batch_isolates_failing_uid(self, mock_create):
+        """When the batched STORE fails, each UID is retried so only the bad one is reported."""
+        mock_client = self._client(3)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+        orig_store = mock_client._store
+
+        def store(operation, message_ids, flags):
+            if 2 in message_ids:
+                raise Exception("STORE failed")
+            return orig_store(operation, message_ids, flags)
+
+        mock_client._store = store
+
+        result = modify_flags("INBOX", [1, 2, 3], ["Seen"], ["Flagged"])
+
+        assert result["modified"] == 2
+        assert result["failed"] == [{"id": 2, "operation": "add_flags", "flags": ["Seen"], "error": "STORE failed"}]
+        assert mock_client.stores[-1] == ("remove_flags", [1, 3], [b"\\Flagged"])
+
+    @patch("session._create_connection")
+    def test_cached_flags_updated_from_store_reply(self, mock_create):
+        """The message list cache picks up the flags returned by STORE."""
+        mock_client = self._client(2)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+        list_messages("INBOX", limit=2)
+
+        modify_flags("INBOX", [2], ["Seen"], [])
+
+        cached = session.get_session().message_cache["INBOX"].messages
+        assert next(m for m in cached if m["id"] == 2)["flags"] == ["Recent", "Seen"]
+
+    def test_uid_set_compacts_ranges(self):
+        """Consecutive UIDs collapse into ranges."""
+        assert _uid_set([5, 1, 2, 3, 9, 10, 5]) == "1:3,5,9:10"
+
+    @patch("session._create_connection")
+    def test_query_flags_whole_result_set(self, mock_create, monkeypatch):
+        """A query is resolved server-side and stored in UID_PAGE_SIZE pages."""
+        monkeypatch.setattr("imap_client.UID_PAGE_SIZE", 2)
+        mock_client = self._client(5)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = modify_flags_by_query("INBOX", "from:newsletters@x.com", ["Seen"], [])
+
+        assert result["matched"] == 5
+        assert result["modified"] == 5
+        assert mock_client.searches == [["FROM", "newsletters@x.com"]]
+        assert [ids for _, ids, _ in mock_client.stores] == [[1, 2], [3, 4], [5]]
+
+
+class TestMoveMessages:
+    """Tests for move_messages."""
+
+    @staticmethod
+    def _client(count: int = 4, capabilities: set | None = None) -> MockIMAPClient:
+        mock_client = MockIMAPClient()
+        mock_client.folders["Archive"] = []
+        mock_client.capabilities = capabilities if capabilities is not None else {"MOVE"}
+        for uid in range(1, count + 1):
+            mock_client.add_message("INBOX", uid, MockEnvelope(subject=f"Msg {uid}".encode()))
+        return mock_client
+
+    @patch("session._create_connection")
+    def test_move_by_ids_uses_move(self, mock_create):
+        """MOVE extension moves the existing IDs; missing ones are reported."""
+        mock_client = self._client()
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = move_messages("INBOX", "Archive", message_ids=[2, 3, 99])
+
+        assert result["moved"] == 2
+        assert result["method"] == "MOVE"
+        assert result["failed"] == [{"id": 99, "error": "Message not found"}]
+        assert [m["id"] for m in mock_client.folders["INBOX"]] == [1, 4]
+        assert len(mock_client.folders["Archive"]) == 2
+
+    @patch("session._create_connection")
+    def test_copy_store_uid_expunge_fallback(self, mock_create, monkeypatch):
+        """Without MOVE, pages are copied, marked Deleted and UID-expunged."""
+        monkeypatch.setattr("imap_client.UID_PAGE_SIZE", 3)
+        mock_client = self._client(4, capabilities={"UIDPLUS"})
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = move_messages("INBOX", "Archive", query="from:x@y.com")
+
+        assert result == {"matched": 4, "moved": 4, "target": "Archive", "method": "COPY", "expunged": True, "failed": []}
+        assert mock_client.folders["INBOX"] == []
+        assert [ids for _, ids, _ in mock_client.stores] == [[1, 2, 3], [4]]
+
+    @patch("session._create_connection")
+    def test_no_uidplus_leaves_originals_deleted(self, mock_create):
+        """Without UIDPLUS a plain EXPUNGE is never sent."""
+        mock_client = self._client(2, capabilities=set())
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        result = move_messages("INBOX", "Archive", message_ids=[1])
+
+        assert result["expunged"] is False
+        assert [m["id"] for m in mock_client.folders["INBOX"]] == [1, 2]
+        assert b"\\Deleted" in mock_client.folders["INBOX"][0]["data"][b"FLAGS"]
+
+    @patch("session._create_connection")
+    def test_source_cache_shrinks_without_refetch(self, mock_create):
+        """Moved messages leave the source list cache; the next list needs no refetch."""
+        mock_client = self._client(4)
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+        list_messages("INBOX", limit=10)
+        fetches = []
+        orig_fetch = mock_client.fetch
+        mock_client.fetch = lambda ids, data: fetches.append(data) or orig_fetch(ids, data)
+
+        move_messages("INBOX", "Archive", message_ids=[2])
+        mock_client.select_folder = lambda folder, readonly=False: {b"UIDVALIDITY": 1, b"UIDNEXT": 5, b"EXISTS": 3}
+        listed = list_messages("INBOX", limit=10)
+
+        assert [m["id"] for m in listed] == [4, 3, 1]
+        assert fetches == []
+
+    def test_requires_ids_or_query(self):
+        """Exactly one of message_ids and query must be given."""
+        with pytest.raises(IMAPError, match="either"):
+            move_messages("INBOX", "Archive")
+
+
+class TestSearchIndexIntegration:
+    """Tests for search_messages with the local search index enabled."""
+
+    @staticmethod
+    def _client() -> MockIMAPClient:
+        mock_client = MockIMAPClient()
+        bodies = {1: ("Invoice March", "Total due 40 EUR"), 2: ("Lunch", "Invoices attached"), 3: ("Status", "All green")}
+        for uid, (subject, body) in bodies.items():
+            raw = f"From: a@b.com\r\nSubject: {subject}\r\nContent-Type: text/plain\r\n\r\n{body}\r\n".encode()
+            envelope = MockEnvelope(subject=subject.encode(), from_=[MockAddress(mailbox=b"a", host=b"b.com")])
+            mock_client.add_message("INBOX", uid, envelope, raw_email=raw)
+        return mock_client
+
+    @pytest.fixture(autouse=True)
+    def enable_index(self, monkeypatch):
+        monkeypatch.setenv("IMAP_STREAM_SEARCH_INDEX", "1")
+
+    @patch("session._create_connection")
+    def test_covered_folder_searches_locally(self, mock_create):
+        """Text terms resolve from the index; the server only checks UIDs and flags."""
+        mock_client = self._client()
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        assert index_folder("INBOX") == {"indexed": 3, "uidnext": 4}
+        mock_client.searches.clear()
+        result = search_messages("INBOX", "invoice is:unread")
+
+        assert [m["id"] for m in result] == [2, 1]
+        assert mock_client.searches == [["UID", "1:2", "UNSEEN"]]
+
+    @patch("session._create_connection")
+    def test_no_local_hits_skips_server_search(self, mock_create):
+        mock_client = self._client()
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+        index_folder("INBOX")
+        mock_client.searches.clear()
+
+        assert search_messages("INBOX", "subject:nothing-like-this") == []
+        assert mock_client.searches == []
+
+    @patch("imap_client.start_crawler")
+    @patch("session._create_connection")
+    def test_uncovered_folder_falls_back_and_starts_crawler(self, mock_create, mock_crawler):
+        mock_client = self._client()
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        search_messages("INBOX", "invoice")
+
+        assert mock_client.searches == [["OR", "SUBJECT", "invoice", "BODY", "invoice"]]
+        mock_crawler.assert_called_once_with(None, "INBOX")
+
+    @patch("session._create_connection")
+    def test_new_mail_indexed_inline(self, mock_create):
+        """A few messages beyond the indexed UIDNEXT are indexed by the search itself."""
+        mock_client = self._client()
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+        index_folder("INBOX")
+        raw = b"Subject: Invoice April\r\nContent-Type: text/plain\r\n\r\nPay soon\r\n"
+        mock_client.add_message("INBOX", 4, MockEnvelope(subject=b"Invoice April"), raw_email=raw)
+
+        result = search_messages("INBOX", "invoice")
+
+        assert [m["id"] for m in result] == [4, 2, 1]
+
+    @patch("session._create_connection")
+    def test_reindex_after_uidvalidity_change(self, mock_create):
+        mock_client = self._client()
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+        index_folder("INBOX")
+        select = mock_client.select_folder
+        mock_client.select_folder = lambda folder, readonly=False: {**select(folder, readonly), b"UIDVALIDITY": 2}
+
+        assert index_folder("INBOX") == {"indexed": 3, "uidnext": 4}
+
+    @patch("session._create_connection")
+    def test_read_adds_message_to_index(self, mock_create):
+        import search_index
+
+        mock_client = self._client()
+        mock_create.return_value = mock_client
+        session._sessions.clear()
+
+        read_message("INBOX", 3)
+
+        index = search_index.get_search_index()
+        assert index.search(None, "INBOX", 1, '"all green"') == [3]
+
+
+class TestSearchFolders:
+    """Tests for search_folders (multi-folder and multi-account search)."""
+
+    @staticmethod
+    def _server(dates: dict[str, list[int]]) -> dict:
+        """Folders with one message per day-of-January given, UIDs ascending."""
+        from datetime import datetime
+
+        folders = {"INBOX": [], "Drafts": [], "Sent": []}
+        template = MockIMAPClient()
+        template.folders = folders
+        for folder, days in dates.items():
+            folders.setdefault(folder, [])
+            for uid, day in enumerate(days, start=1):
+                envelope = MockEnvelope(subject=f"{folder} {day}".encode(), date=datetime(2026, 1, day))
+                template.add_message(folder, uid, envelope)
+        return folders
+
+    @staticmethod
+    def _connect(folders: dict):
+        """_create_connection side effect: one client per connection, shared mailbox."""
+
+        def connect(account):
+            client = MockIMAPClient()
+            client.folders = folders
+            return client
+
+        return connect
+
+    @patch("session._create_connection")
+    def test_merges_by_date_with_global_limit(self, mock_create):
+        mock_create.side_effect = self._connect(self._server({"INBOX": [1, 5], "Archive": [3, 9]}))
+        session._sessions.clear()
+
+        result = search_folders("anything", ["INBOX", "Archive"], limit=10)
+
+        assert [(m["folder"], m["subject"]) for m in result["messages"]] == [
+            ("Archive", "Archive 9"),
+            ("INBOX", "INBOX 5"),
+            ("Archive", "Archive 3"),
+            ("INBOX", "INBOX 1"),
+        ]
+        assert (result["searched"], result["total"]) == (2, 2)
+
+    @patch("session._create_connection")
+    def test_star_searches_every_listed_folder(self, mock_create):
+        mock_create.side_effect = self._connect(self._server({"INBOX": [1], "Sent": [2]}))
+        session._sessions.clear()
+
+        result = search_folders("anything", "*", limit=10)
+
+        assert result["total"] == 3
+        assert {m["folder"] for m in result["messages"]} == {"INBOX", "Sent"}
+
+    @patch("session._create_connection")
+    def test_later_folder_with_newer_hits_not_dropped(self, mock_create):
+        """With one worker INBOX fills the limit first; newer hits in later folders still win the merge."""
+        mock_create.side_effect = self._connect(self._server({"INBOX": [1, 2], "A": [3], "B": [8, 9]}))
+        session._sessions.clear()
+        session.get_session(None).pool_size = 1
+
+        result = search_folders("anything", ["INBOX", "A", "B"], limit=2)
+
+        assert result["searched"] == 3
+        assert [m["subject"] for m in result["messages"]] == ["B 9", "B 8"]
+
+    @patch("session._create_connection")
+    def test_folder_errors_reported_per_folder(self, mock_create):
+        mock_create.side_effect = self._connect(self._server({"INBOX": [1]}))
+        session._sessions.clear()
+
+        result = search_folders("anything", ["INBOX", "Missing"], limit=10)
+
+        assert len(result["messages"]) == 1
+        assert result["errors"][0]["folder"] == "Missing"
+        assert result["searched"] == 1
+
+    @patch("session._create_connection")
+    def test_accounts_fan_out(self, mock_create):
+        mock_create.side_effect = self._connect(self._server({"INBOX": [1]}))
+        session._sessions.clear()
+
+        result = search_folders("anything", ["INBOX"], accounts=["work", "home"], limit=10)
+
+        assert sorted(m["account"] for m in result["messages"]) == ["home", "work"]
+        assert {call.args[0] for call in mock_create.call_args_list} == {"work", "home"}
+
+    def test_malformed_query_rejected_before_fan_out(self):
+        with pytest.raises(IMAPError, match="Invalid search query"):
+            search_folders("(", ["INBOX"])
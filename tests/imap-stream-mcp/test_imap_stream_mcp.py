@@ -1,9 +1,12 @@
 """Tests for imap_stream_mcp module."""
 
 import sys
+import threading
 from pathlib import Path
 from unittest.mock import patch
 
+import anyio
+import anyio.to_thread
 import pytest
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -87,6 +90,16 @@ class TestMailActionValidation:
         action = MailAction(action="list", folder="INBOX", preview=False)
         assert action.preview is False
 
+    @pytest.mark.parametrize("action", ["move", "flag", "draft", "read", "list"])
+    def test_account_rejected_outside_search(self, action):
+        """account must not be silently ignored, acting on the default mailbox instead."""
+        with pytest.raises(ValueError, match="only supported by search"):
+            MailAction(action=action, folder="INBOX", account="work", preview=False)
+
+    def test_account_accepted_for_search(self):
+        action = MailAction(action="search", folder="*", account="work", payload="from:x", preview=False)
+        assert action.account == "work"
+
     def test_read_without_preview_is_valid(self):
         """Non-list/search actions should not require preview."""
         action = MailAction(action="read", folder="INBOX", payload="123")
@@ -201,6 +214,37 @@ class TestListAndSearchAttachmentIndicator:
         assert "<|system|>" not in result
 
 
+class TestListPaging:
+    """Tests for before_uid cursor paging in list."""
+
+    @patch("imap_stream_mcp.list_messages")
+    async def test_before_uid_passed_through(self, mock_list):
+        mock_list.return_value = []
+
+        result = await use_mail(MailAction(action="list", folder="INBOX", preview=False, before_uid=500))
+
+        assert mock_list.call_args.kwargs["before_uid"] == 500
+        assert "before ID 500" in result
+
+    @patch("imap_stream_mcp.list_messages")
+    async def test_full_page_shows_next_cursor(self, mock_list):
+        mock_list.return_value = [
+            {"id": uid, "subject": f"m{uid}", "from": "a@b.com", "date": "", "flags": [], "attachment_count": 0} for uid in (9, 8)
+        ]
+
+        result = await use_mail(MailAction(action="list", folder="INBOX", preview=False, limit=2))
+
+        assert "Next page: before_uid=8" in result
+
+    @patch("imap_stream_mcp.list_messages")
+    async def test_short_page_has_no_cursor(self, mock_list):
+        mock_list.return_value = [{"id": 9, "subject": "m9", "from": "a@b.com", "date": "", "flags": [], "attachment_count": 0}]
+
+        result = await use_mail(MailAction(action="list", folder="INBOX", preview=False, limit=2))
+
+        assert "Next page" not in result
+
+
 class TestContextPoisoningProtection:
     """Tests for context poisoning protection."""
 
@@ -590,6 +634,49 @@ class TestReadActionWrapping:
         assert ":full" in result
 
 
+class TestDraftBatchPayload:
+    """Tests for draft action with a list of drafts."""
+
+    @patch("imap_stream_mcp.create_drafts")
+    async def test_list_payload_creates_batch(self, mock_create):
+        """Each item is converted and the batch reports per-draft results."""
+        mock_create.return_value = {
+            "folder": "Drafts",
+            "created": 1,
+            "drafts": [
+                {"status": "created", "to": "a@example.com", "subject": "Hi A", "message_id": "<a@y>"},
+                {"status": "error", "to": "b@example.com", "subject": "Hi B", "error": "File not found: '/tmp/x'"},
+            ],
+        }
+
+        result = await use_mail(
+            MailAction(
+                action="draft",
+                payload='[{"to":"a@example.com","subject":"Hi A","body":"**A**"},'
+                '{"to":"b@example.com","subject":"Hi B","body":"B","format":"plain","attachments":["/tmp/x"]}]',
+            )
+        )
+
+        drafts = mock_create.call_args.kwargs["drafts"]
+        assert "<strong>A</strong>" in drafts[0]["html"]
+        assert drafts[1]["html"] is None
+        assert drafts[1]["attachments"] == ["/tmp/x"]
+        assert "Drafts Created (1 of 2)" in result
+        assert "<a@y>" in result
+        assert "File not found" in result
+
+    @patch("imap_stream_mcp.create_drafts")
+    async def test_invalid_item_rejects_batch(self, mock_create):
+        """A malformed item fails the whole call before anything is uploaded."""
+        result = await use_mail(
+            MailAction(action="draft", payload='[{"to":"a@example.com","subject":"Hi","body":"x"},{"to":"b@example.com"}]')
+        )
+
+        assert "Error: draft 2" in result
+        assert "subject, body" in result
+        mock_create.assert_not_called()
+
+
 class TestDraftAttachmentPayload:
     """Tests for draft action attachment payload handling."""
 
@@ -878,3 +965,146 @@ class TestEditAction:
 
         assert "# Draft Created" in result
         mock_create.assert_called_once()
+
+
+class TestDispatchConcurrency:
+    """Blocking IMAP calls run off the event loop."""
+
+    async def test_read_completes_while_search_running(self):
+        """A read finishes while a slow search is still blocked in its worker."""
+        search_started = threading.Event()
+        release_search = threading.Event()
+        results = {}
+
+        def slow_search(*args, **kwargs):
+            search_started.set()
+            release_search.wait(timeout=5)
+            return []
+
+        read_data = {
+            "subject": "Quick one",
+            "from": ["sender@example.com"],
+            "to": ["recipient@example.com"],
+            "cc": [],
+            "date": "2024-01-15",
+            "message_id": "<123@example.com>",
+            "in_reply_to": None,
+            "body_text": "Read body arrived.",
+            "body_html": None,
+            "attachments": [],
+            "inline_images": [],
+        }
+
+        async def run_search():
+            results["search"] = await use_mail(MailAction(action="search", folder="INBOX", payload="invoice", preview=False))
+
+        with (
+            patch("imap_stream_mcp.search_messages", side_effect=slow_search),
+            patch("imap_stream_mcp.read_message", return_value=read_data),
+        ):
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(run_search)
+                assert await anyio.to_thread.run_sync(search_started.wait, 5)
+
+                with anyio.fail_after(2):
+                    read_result = await use_mail(MailAction(action="read", folder="INBOX", payload="123"))
+
+                assert "search" not in results  # Search still running
+                release_search.set()
+
+        assert "Read body arrived." in read_result
+        assert results["search"].startswith("No messages matching")
+
+    async def test_timeout_returns_error(self):
+        """A call exceeding the dispatch timeout is reported as an error."""
+        release = threading.Event()
+
+        def stuck_list(*args, **kwargs):
+            release.wait(timeout=5)
+            return []
+
+        try:
+            with patch("imap_stream_mcp.list_messages", side_effect=stuck_list), patch("dispatch.DISPATCH_TIMEOUT", 0.1):
+                result = await use_mail(MailAction(action="list", folder="INBOX", preview=False))
+        finally:
+            release.set()
+
+        assert result.startswith("Error:")
+        assert "timed out" in result
+
+
+class TestBulkActions:
+    """Tests for query-driven flag and move actions."""
+
+    @patch("imap_stream_mcp.modify_flags_by_query")
+    async def test_flag_by_query(self, mock_flags):
+        mock_flags.return_value = {"matched": 3, "modified": 3, "flags_added": ["Seen"], "flags_removed": [], "failed": []}
+
+        result = await use_mail(MailAction(action="flag", folder="INBOX", query="from:news@x.com", payload="+Seen"))
+
+        assert mock_flags.call_args.args[:4] == ("INBOX", "from:news@x.com", ["Seen"], [])
+        assert "matched 3 message(s)" in result
+
+    @patch("imap_stream_mcp.move_messages")
+    async def test_move_by_ids(self, mock_move):
+        mock_move.return_value = {"matched": 2, "moved": 2, "target": "Archive", "method": "MOVE", "expunged": True, "failed": []}
+
+        result = await use_mail(MailAction(action="move", folder="INBOX", target="Archive", payload="1,2"))
+
+        assert mock_move.call_args.kwargs["message_ids"] == [1, 2]
+        assert "Moved 2 of 2 message(s) to 'Archive'" in result
+
+    async def test_move_requires_target(self):
+        result = await use_mail(MailAction(action="move", folder="INBOX", payload="1"))
+
+        assert "target" in result.lower()
+
+    async def test_move_rejects_ids_and_query(self):
+        result = await use_mail(MailAction(action="move", folder="INBOX", target="Archive", payload="1", query="from:a"))
+
+        assert "Error" in result
+
+
+class TestMultiFolderSearch:
+    """Tests for search across folders and accounts."""
+
+    RESULT = {
+        "messages": [
+            {"id": 9, "subject": "Contract", "from": "a@b.com", "date": "2026-01-09", "flags": [], "account": None, "folder": "Archive"},
+            {"id": 4, "subject": "Re: Contract", "from": "c@d.com", "date": "2026-01-04", "flags": [], "account": None, "folder": "INBOX"},
+        ],
+        "searched": 2,
+        "total": 3,
+        "errors": [],
+    }
+
+    @patch("imap_stream_mcp.search_folders")
+    async def test_folder_list_fans_out(self, mock_search):
+        mock_search.return_value = self.RESULT
+
+        result = await use_mail(MailAction(action="search", folder=["INBOX", "Archive", "Sent"], payload="contract", preview=False))
+
+        assert mock_search.call_args.args[1:3] == (["INBOX", "Archive", "Sent"], None)
+        assert "Found 2 in 2 of 3 folder(s)" in result
+        assert "In: Archive" in result
+
+    @patch("imap_stream_mcp.search_folders")
+    async def test_all_accounts_with_single_folder(self, mock_search):
+        mock_search.return_value = self.RESULT
+
+        await use_mail(MailAction(action="search", folder="INBOX", account="*", payload="contract", preview=False))
+
+        assert mock_search.call_args.args[1:3] == (["INBOX"], "*")
+
+    @patch("imap_stream_mcp.search_messages")
+    async def test_single_account_uses_plain_search(self, mock_search):
+        mock_search.return_value = []
+
+        await use_mail(MailAction(action="search", folder="INBOX", account="work", payload="contract", preview=False))
+
+        assert mock_search.call_args.args[3] == "work"
+
+    async def test_folder_list_rejected_for_other_actions(self):
+        result = await use_mail(MailAction(action="list", folder=["INBOX", "Sent"], preview=False))
+
+        assert "only supported for search" in result
@@ -171,6 +171,37 @@ class TestConvertBody:
             convert_body("Hello", format_type="HTML")
 
 
+class TestConverterReuse:
+    """convert_body reuses one Markdown instance per thread."""
+
+    def test_reused_converter_matches_fresh_instance(self):
+        from bench_convert_body import drafts, reference_convert_body
+
+        for body in drafts(12):
+            assert convert_body(body) == reference_convert_body(body)
+
+    def test_state_does_not_leak_between_drafts(self):
+        convert_body("See [docs][1].\n\n[1]: https://example.com/docs")
+
+        html, _ = convert_body("See [docs][1].")
+
+        assert "href" not in html
+
+    def test_one_converter_per_thread(self):
+        import threading
+
+        from markdown_utils import _markdown
+
+        main = _markdown()
+        other = []
+        thread = threading.Thread(target=lambda: other.append(_markdown()))
+        thread.start()
+        thread.join()
+
+        assert _markdown() is main
+        assert other[0] is not main
+
+
 class TestMarkdownConstants:
     """Tests for markdown configuration constants."""
 
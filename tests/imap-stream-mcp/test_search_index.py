@@ -0,0 +1,81 @@
+"""Tests for the local full-text search index."""
+
+import search_index
+from search_index import IndexState, SearchIndex, get_search_index
+
+DOCS = [
+    {"id": 1, "subject": "Invoice March", "sender": "Alice <alice@shop.com>", "recipients": "me@x.com", "body": "Total due: 40 EUR"},
+    {"id": 2, "subject": "Lunch", "sender": "Bob <bob@x.com>", "recipients": "me@x.com", "body": "Invoices attached for April"},
+    {"id": 3, "subject": "Out of office", "sender": "Carol <carol@x.com>", "recipients": "team@x.com", "body": "Back on Monday"},
+]
+
+
+class TestSearchIndex:
+    def test_substring_match_is_case_insensitive(self, tmp_path):
+        index = SearchIndex(tmp_path / "i.sqlite3")
+        index.add("acct", "INBOX", 1, DOCS)
+
+        assert index.search("acct", "INBOX", 1, '{subject body} : "invoice"') == [1, 2]
+
+    def test_column_filter_and_not(self, tmp_path):
+        index = SearchIndex(tmp_path / "i.sqlite3")
+        index.add("acct", "INBOX", 1, DOCS)
+
+        assert index.search("acct", "INBOX", 1, 'sender : "alice"') == [1]
+        assert index.search("acct", "INBOX", 1, '(recipients : "me@x") NOT ({subject body} : "lunch")') == [1]
+
+    def test_scoped_to_folder_and_uidvalidity(self, tmp_path):
+        index = SearchIndex(tmp_path / "i.sqlite3")
+        index.add("acct", "INBOX", 1, DOCS)
+        index.add("acct", "Archive", 1, DOCS[:1])
+
+        assert index.search("acct", "Archive", 1, '"invoice"') == [1]
+        assert index.search("acct", "INBOX", 2, '"invoice"') == []
+
+    def test_add_skips_indexed_uids(self, tmp_path):
+        index = SearchIndex(tmp_path / "i.sqlite3")
+        index.add("acct", "INBOX", 1, DOCS)
+        index.add("acct", "INBOX", 1, [{**DOCS[0], "body": "changed"}])
+
+        assert index.search("acct", "INBOX", 1, '"changed"') == []
+        assert index.indexed_uids("acct", "INBOX", 1, [1, 3, 9]) == {1, 3}
+
+    def test_coverage_advances_monotonically(self, tmp_path):
+        index = SearchIndex(tmp_path / "i.sqlite3")
+        index.reset("acct", "INBOX", 5)
+        index.advance("acct", "INBOX", 5, 40)
+        index.advance("acct", "INBOX", 5, 20)
+        index.advance("acct", "INBOX", 6, 90)  # Stale UIDVALIDITY is ignored
+
+        assert index.state("acct", "INBOX") == IndexState(5, 40)
+        assert index.covers("acct", "INBOX", 5, 40)
+        assert not index.covers("acct", "INBOX", 5, 41)
+        assert not index.covers("acct", "INBOX", 6, 40)
+
+    def test_reset_drops_documents(self, tmp_path):
+        index = SearchIndex(tmp_path / "i.sqlite3")
+        index.add("acct", "INBOX", 1, DOCS)
+        index.reset("acct", "INBOX", 2)
+
+        assert index.search("acct", "INBOX", 1, '"invoice"') == []
+        assert index.state("acct", "INBOX") == IndexState(2, 1)
+
+    def test_bad_expression_returns_none(self, tmp_path):
+        index = SearchIndex(tmp_path / "i.sqlite3")
+        index.add("acct", "INBOX", 1, DOCS)
+
+        assert index.search("acct", "INBOX", 1, "nosuchcolumn : x") is None
+
+
+class TestGetSearchIndex:
+    def test_disabled_by_default(self):
+        assert get_search_index() is None
+
+    def test_enabled_by_env(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("IMAP_STREAM_CACHE_DIR", str(tmp_path))
+        monkeypatch.setenv("IMAP_STREAM_SEARCH_INDEX", "1")
+
+        index = get_search_index()
+
+        assert index is get_search_index()
+        assert index.path == tmp_path / search_index.INDEX_FILENAME
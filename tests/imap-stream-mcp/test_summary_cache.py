@@ -0,0 +1,129 @@
+"""Tests for the persistent summary cache."""
+
+import sqlite3
+
+import summary_cache
+from summary_cache import SCHEMA_VERSION, StoredFolder, SummaryCache, get_summary_cache
+
+MESSAGES = [
+    {
+        "id": 7,
+        "subject": "Newest",
+        "from": "a@b.com",
+        "date": "2025-01-02 10:00",
+        "size": 4096,
+        "flags": ["Seen"],
+        "attachment_count": 2,
+        "snippet": "Hello there",
+    },
+    {
+        "id": 3,
+        "subject": "Older",
+        "from": "c@d.com",
+        "date": "2025-01-01 09:00",
+        "size": 512,
+        "flags": [],
+        "attachment_count": 0,
+        "snippet": "",
+    },
+]
+
+
+class TestSummaryCache:
+    def test_round_trip_preserves_order_and_fields(self, tmp_path):
+        cache = SummaryCache(tmp_path / "s.sqlite3")
+        cache.store("acct", "INBOX", 1, 8, 2, MESSAGES, highestmodseq=900)
+
+        assert cache.load("acct", "INBOX", 1) == StoredFolder(8, 2, 900, MESSAGES)
+
+    def test_survives_reopen(self, tmp_path):
+        path = tmp_path / "s.sqlite3"
+        cache = SummaryCache(path)
+        cache.store("acct", "INBOX", 1, 8, 2, MESSAGES)
+        cache.close()
+
+        assert SummaryCache(path).load("acct", "INBOX", 1).messages == MESSAGES
+
+    def test_other_uidvalidity_or_account_is_miss(self, tmp_path):
+        cache = SummaryCache(tmp_path / "s.sqlite3")
+        cache.store("acct", "INBOX", 1, 8, 2, MESSAGES)
+
+        assert cache.load("acct", "INBOX", 2) is None
+        assert cache.load("other", "INBOX", 1) is None
+        assert cache.load("acct", "Drafts", 1) is None
+
+    def test_new_uidvalidity_drops_old_rows(self, tmp_path):
+        cache = SummaryCache(tmp_path / "s.sqlite3")
+        cache.store("acct", "INBOX", 1, 8, 2, MESSAGES)
+        cache.store("acct", "INBOX", 2, 4, 1, MESSAGES[:1])
+
+        with sqlite3.connect(cache.path) as db:
+            rows = db.execute("SELECT uidvalidity, uid FROM summaries").fetchall()
+        assert rows == [(2, 7)]
+
+    def test_invalidate_forces_miss(self, tmp_path):
+        cache = SummaryCache(tmp_path / "s.sqlite3")
+        cache.store("acct", "INBOX", 1, 8, 2, MESSAGES)
+        cache.invalidate("acct", "INBOX")
+
+        assert cache.load("acct", "INBOX", 1) is None
+
+    def test_update_flags(self, tmp_path):
+        cache = SummaryCache(tmp_path / "s.sqlite3")
+        cache.store("acct", "INBOX", 1, 8, 2, MESSAGES)
+        cache.update_flags("acct", "INBOX", 3, ["Flagged"])
+
+        assert cache.load("acct", "INBOX", 1).messages[1]["flags"] == ["Flagged"]
+
+    def test_missing_state_values_not_stored(self, tmp_path):
+        """Servers without UIDNEXT cannot be validated, so nothing is persisted."""
+        cache = SummaryCache(tmp_path / "s.sqlite3")
+        cache.store("acct", "INBOX", 1, None, 2, MESSAGES)
+
+        assert cache.load("acct", "INBOX", 1) is None
+
+    def test_schema_change_resets_cache(self, tmp_path):
+        path = tmp_path / "s.sqlite3"
+        SummaryCache(path).store("acct", "INBOX", 1, 8, 2, MESSAGES)
+        with sqlite3.connect(path) as db:
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+
+        assert SummaryCache(path).load("acct", "INBOX", 1) is None
+
+    def test_snippets_round_trip_per_uidvalidity(self, tmp_path):
+        cache = SummaryCache(tmp_path / "s.sqlite3")
+        cache.store_snippets("acct", "INBOX", 1, {7: "hello", 8: ""})
+
+        assert cache.load_snippets("acct", "INBOX", 1, [7, 8, 9]) == {7: "hello", 8: ""}
+        assert cache.load_snippets("acct", "INBOX", 2, [7]) == {}
+
+        cache.store_snippets("acct", "INBOX", 2, {7: "new"})
+        assert cache.load_snippets("acct", "INBOX", 1, [7, 8]) == {}
+
+    def test_closed_database_behaves_as_empty(self, tmp_path):
+        cache = SummaryCache(tmp_path / "s.sqlite3")
+        cache.close()
+
+        cache.store("acct", "INBOX", 1, 8, 2, MESSAGES)
+        assert cache.load("acct", "INBOX", 1) is None
+
+
+class TestGetSummaryCache:
+    def test_shared_per_location(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("IMAP_STREAM_CACHE_DIR", str(tmp_path))
+
+        cache = get_summary_cache()
+
+        assert cache is get_summary_cache()
+        assert cache.path == tmp_path / summary_cache.CACHE_FILENAME
+
+    def test_disabled_by_env(self, monkeypatch):
+        monkeypatch.setenv("IMAP_STREAM_DISK_CACHE", "0")
+
+        assert get_summary_cache() is None
+
+    def test_xdg_cache_home(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("IMAP_STREAM_CACHE_DIR")
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+        assert summary_cache.cache_dir() == tmp_path / "imap-stream"